@@ -9,58 +9,53 @@ Usage:
 """
 
 from manim import *
-import numpy as np
-import json
 import os
+import sys
 import difflib
 
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from audio_timeline import AudioTimeline
+from subtitle_track import soft_subtitles
+from subtitle_layout import wrap_text
+from subtitle_atlas import SubtitleAtlas
+from audio_index import load_audio_map
+from themes import get_theme
+from shapes import Gear
+from asset_cache import memoize_mobject
+from image_assets import load_image
+
 config.sound = True
 
 # ============================================================================
 # テーマカラー & スタイル
 # ============================================================================
-BG_COLOR = "#f5f5f5"
-TEXT_MAIN = "#1a1a2e"        # メインテキスト（濃紺）
-ACCENT_RED = "#d6336c"       # 深めローズ
-ACCENT_YELLOW = "#e8590c"    # ディープオレンジ
-ACCENT_BLUE = "#1971c2"      # ディープブルー
-ACCENT_GREEN = "#099268"     # ディープグリーン
-ACCENT_PURPLE = "#7048e8"    # ディープパープル
-ACCENT_CYAN = "#0c8599"      # ディープシアン
-TEXT_DIM = "#868e96"         # 薄めグレー
-CHAR_METAN = "#d6336c"       # めたんの色
-CHAR_ZUNDA = "#099268"       # ずんだもんの色
-
-# 音声マップ読み込み
-AUDIO_MAP = {}
-map_path = "projects/api_basics_yt/media/audio/audio_map.json"
-if os.path.exists(map_path):
-    try:
-        with open(map_path, "r", encoding="utf-8") as f:
-            AUDIO_MAP = json.load(f)
-    except Exception as e:
-        print(f"Failed to load audio map: {e}")
+# VIBE_THEME でテーマを切り替えられる (tools/themes.json)
+THEME = get_theme("light")
+BG_COLOR = THEME.BG_COLOR
+TEXT_MAIN = THEME.TEXT_MAIN          # メインテキスト（濃紺）
+ACCENT_RED = THEME.ACCENT_RED        # 深めローズ
+ACCENT_YELLOW = THEME.ACCENT_YELLOW  # ディープオレンジ
+ACCENT_BLUE = THEME.ACCENT_BLUE      # ディープブルー
+ACCENT_GREEN = THEME.ACCENT_GREEN    # ディープグリーン
+ACCENT_PURPLE = THEME.ACCENT_PURPLE  # ディープパープル
+ACCENT_CYAN = THEME.ACCENT_CYAN      # ディープシアン
+TEXT_DIM = THEME.TEXT_DIM            # 薄めグレー
+CHAR_METAN = THEME.CHAR_METAN        # めたんの色
+CHAR_ZUNDA = THEME.CHAR_ZUNDA        # ずんだもんの色
+
+# 音声マップ読み込み (ファイルの存在確認は読み込み時に1回だけ)
+AUDIO_MAP = load_audio_map(os.path.dirname(os.path.abspath(__file__)))
 
 # ============================================================================
 # ヘルパー関数
 # ============================================================================
 
-def wrap_text(text, max_chars=28):
-    """長いテキストを自動改行する"""
-    if len(text) <= max_chars:
-        return text
-    mid = len(text) // 2
-    for offset in range(min(mid, 12)):
-        for pos in [mid + offset, mid - offset]:
-            if 0 < pos < len(text) and text[pos] in '、。！？ ,. ':
-                return text[:pos + 1] + '\n' + text[pos + 1:]
-    return text[:mid] + '\n' + text[mid:]
-
 def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     """字幕VGroupを作成"""
     name = Text(speaker, font="Noto Sans JP", font_size=20,
                 color=speaker_color, weight=BOLD)
-    wrapped = wrap_text(text)
+    wrapped = wrap_text(text, font_size=24)
     line = Text(wrapped, font="Noto Sans JP", font_size=24, color=TEXT_MAIN, line_spacing=1.2)
     content = VGroup(name, line).arrange(DOWN, buff=0.15, center=True)
     
@@ -68,13 +63,16 @@ def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     bg = RoundedRectangle(
         corner_radius=0.1,
         width=content.get_width() + 1.0, height=content.get_height() + 0.5,
-        fill_color=WHITE, fill_opacity=0.9, stroke_color="#dee2e6", stroke_width=1
+        fill_color=THEME.SURFACE, fill_opacity=0.9, stroke_color=THEME.BORDER, stroke_width=1
     )
     bg.move_to(content)
     result = VGroup(bg, content)
     result.to_edge(DOWN, buff=0.5)
     return result
 
+# 事前に描いた字幕の吹き出し (python tools/subtitle_atlas.py api_basics_yt)
+SUBTITLE_ATLAS = SubtitleAtlas(os.path.dirname(os.path.abspath(__file__)), get_subtitle, THEME)
+
 def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, prev_sub=None):
     """字幕表示＋音声同期"""
     if not hasattr(scene, "speech_index"):
@@ -110,20 +108,32 @@ def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, p
             print(f"Audio error: {e}")
 
     wait_time = duration
+    timeline = AudioTimeline.attach(scene)
+    start = scene.renderer.time
     
     if audio_data:
-        file_path = audio_data["file"]
-        if os.path.exists(file_path):
-            scene.add_sound(file_path)
-            wait_time = audio_data["duration"]
-
-    sub = get_subtitle(speaker, text, speaker_color)
-    anims = [FadeIn(sub, shift=UP * 0.2)]
-    if prev_sub is not None:
-        anims.append(FadeOut(prev_sub))
-    
-    scene.play(*anims, run_time=0.3)
-    scene.wait(wait_time + 0.1)
+        start = timeline.add(scene, audio_data["file"])
+        wait_time = audio_data["duration"]
+
+    # 音声の長さだけ表示する (少し余韻)。終わりはフレーム境界に揃える
+    end = timeline.frame_ceil(start + 0.3 + wait_time + 0.1)
+    timeline.add_cue(speaker, text, start, end, speaker_color, line_id=(audio_data or {}).get("id"))
+
+    if soft_subtitles():
+        # 字幕は焼き込まず字幕ファイルだけに出す (尺は焼き込む場合と同じ)
+        sub = VGroup()
+        scene.wait(0.3)
+    else:
+        sub = SUBTITLE_ATLAS.get(speaker, text, speaker_color)
+        if sub is None:
+            sub = get_subtitle(speaker, text, speaker_color)
+        anims = [FadeIn(sub, shift=UP * 0.2)]
+        if prev_sub is not None:
+            anims.append(FadeOut(prev_sub))
+        scene.play(*anims, run_time=0.3)
+    hold = timeline.hold_time(scene, end)
+    if hold > 0:
+        scene.wait(hold)
     
     return sub
 
@@ -134,10 +144,10 @@ def get_image(name, scale=1.0):
     if not name.endswith(".png") and not name.endswith(".jpg"):
         name += ".png"
         
-    path = os.path.join("projects", "api_basics_yt", "media", "images", name)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media", "images", name)
     if os.path.exists(path):
-        img = ImageMobject(path).scale(scale)
-        return img
+        # 出力解像度に合わせて縮小・キャッシュした画像 (tools/image_assets.py)
+        return load_image(path, scale)
     
     # フォールバック図形描画
     if key_name == "vending_machine":
@@ -154,6 +164,7 @@ def get_image(name, scale=1.0):
     )
     return placeholder
 
+@memoize_mobject
 def draw_vending_machine():
     body = RoundedRectangle(width=2, height=3.5, corner_radius=0.2, color=RED, fill_opacity=1)
     window = Rectangle(width=1.6, height=1.5, color=WHITE, fill_opacity=0.3).move_to(body.get_top() + DOWN*1)
@@ -161,6 +172,7 @@ def draw_vending_machine():
     outlet = Rectangle(width=1.2, height=0.4, color=BLACK, fill_opacity=0.8).move_to(body.get_bottom() + UP*0.5)
     return VGroup(body, window, drinks, outlet)
 
+@memoize_mobject
 def draw_waiter():
     face = Circle(radius=0.3, color=WHITE, fill_opacity=1).move_to(UP*0.5)
     body = Polygon(UP*0.2, RIGHT*0.5+DOWN*0.5, LEFT*0.5+DOWN*0.5, color=BLACK, fill_opacity=1)
@@ -168,6 +180,7 @@ def draw_waiter():
     tray = Line(LEFT*0.6, RIGHT*0.8, color=SILVER).move_to(RIGHT*0.6 + UP*0.3)
     return VGroup(face, body, bowtie, tray).move_to(ORIGIN)
 
+@memoize_mobject
 def draw_knife():
     blade = Polygon(ORIGIN, UP*0.5, RIGHT*2+UP*0.5, RIGHT*2.5, RIGHT*2, fill_opacity=1, color=SILVER).set_stroke(width=0)
     handle = RoundedRectangle(width=1, height=0.4, corner_radius=0.1, color=BROWN, fill_opacity=1).move_to(LEFT*0.5 + UP*0.25)
@@ -178,7 +191,7 @@ def draw_knife():
 # ============================================================================
 class Scene01_Intro(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         # タイトルアニメーション
         t1 = Text("API", font_size=120, color=ACCENT_BLUE, weight=BOLD).move_to(UP*0.5)
@@ -213,7 +226,7 @@ class Scene01_Intro(Scene):
 # ============================================================================
 class Scene02_WhatIs(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "まず結論から。APIは「Application Programming Interface」の略です。", CHAR_METAN)
         
@@ -243,7 +256,7 @@ class Scene02_WhatIs(Scene):
 # ============================================================================
 class Scene03_Vending(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "もう一つ、身近な例を出しましょう。自動販売機です。", CHAR_METAN)
         
@@ -261,7 +274,7 @@ class Scene03_Vending(Scene):
         sub4 = show_subtitle(self, "ずんだもん", "当たり前なのだ。", CHAR_ZUNDA, prev_sub=sub3)
         sub5 = show_subtitle(self, "めたん", "でも、中の冷却装置や在庫管理の仕組みは知らなくていい。", CHAR_METAN, prev_sub=sub4)
         
-        gears = VGroup(*[Gear(8).scale(0.5).set_color(GREY) for _ in range(3)]).arrange(RIGHT).move_to(machine)
+        gears = VGroup(*[Gear(8, inner_radius=1.0).scale(0.5).set_color(GREY) for _ in range(3)]).arrange(RIGHT).move_to(machine)
         self.play(machine.animate.set_opacity(0.5), FadeIn(gears))
         self.play(Rotate(gears[0]), Rotate(gears[1], -1), Rotate(gears[2]), run_time=2)
         
@@ -279,7 +292,7 @@ class Scene03_Vending(Scene):
 # ============================================================================
 class Scene04_Restaurant(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "もう一つだけ例えを。レストランに行った時を考えてください。", CHAR_METAN)
         
@@ -327,7 +340,7 @@ class Scene04_Restaurant(Scene):
 # ============================================================================
 class Scene05_Interface(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "ところで「Interface」って言葉、API以外でも使われていますわ。", CHAR_METAN)
         
@@ -360,7 +373,7 @@ class Scene05_Interface(Scene):
 # ============================================================================
 class Scene06_Daily(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "実は皆さん、毎日APIを使っていますわよ。", CHAR_METAN)
         sub2 = show_subtitle(self, "ずんだもん", "え？ プログラミングなんてしてないのだ。", CHAR_ZUNDA, prev_sub=sub1)
@@ -393,7 +406,7 @@ class Scene06_Daily(Scene):
 # ============================================================================
 class Scene07_Web(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "ここからは少し技術的な話。「Web API」の仕組みです。", CHAR_METAN)
         
@@ -432,7 +445,7 @@ class Scene07_Web(Scene):
 # ============================================================================
 class Scene08_Methods(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "HTTPリクエストには「メソッド」という種類があります。", CHAR_METAN)
         sub2 = show_subtitle(self, "ずんだもん", "メソッド？ 必殺技みたいなのだ？", CHAR_ZUNDA, prev_sub=sub1)
@@ -479,7 +492,7 @@ class Scene08_Methods(Scene):
 # ============================================================================
 class Scene09_JSON(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "APIから返ってくるデータは、通常「JSON」という形式です。", CHAR_METAN)
         sub2 = show_subtitle(self, "ずんだもん", "ジェイソン？ ホラー映画の？", CHAR_ZUNDA, prev_sub=sub1)
@@ -508,22 +521,6 @@ class Scene09_JSON(Scene):
 
         self.play(*[FadeOut(m) for m in self.mobjects], run_time=1)
 
-# Gear クラス (Scene03で必要)
-class Gear(VMobject):
-    def __init__(self, n_teeth=8, **kwargs):
-        super().__init__(**kwargs)
-        angle = TAU / n_teeth
-        points = []
-        for i in range(n_teeth):
-            points.extend([
-                (np.cos(i * angle), np.sin(i * angle), 0),
-                (np.cos(i * angle + angle / 4), np.sin(i * angle + angle / 4), 0),
-                (np.cos(i * angle + angle * 3/4), np.sin(i * angle + angle * 3/4), 0),
-                (np.cos((i + 1) * angle), np.sin((i + 1) * angle), 0),
-            ])
-        self.set_points_as_corners(points)
-        self.close_path()
-
 # StackedRectangle (Scene07で必要)
 class StackedRectangle(VGroup):
     def __init__(self, n=3, **kwargs):
@@ -537,7 +534,7 @@ class StackedRectangle(VGroup):
 # ============================================================================
 class Scene10_Status(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "サーバーは結果と一緒に「ステータスコード」という番号も返します。", CHAR_METAN)
         
@@ -580,7 +577,7 @@ class Scene10_Status(Scene):
 # ============================================================================
 class Scene11_ApiKey(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "ところで、APIは誰でも自由に使えるわけではありません。", CHAR_METAN)
         sub2 = show_subtitle(self, "ずんだもん", "え、使えないの？ ケチなのだ！", CHAR_ZUNDA, prev_sub=sub1)
@@ -616,7 +613,7 @@ class Scene11_ApiKey(Scene):
 # ============================================================================
 class Scene12_RateLimit(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "もう一つ大事な概念、「レートリミット」を紹介しますわ。", CHAR_METAN)
         
@@ -656,7 +653,7 @@ class Scene12_RateLimit(Scene):
 # ============================================================================
 class Scene13_REST(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "ここでプルスウルトラ！ 「REST API」について触れましょう。", CHAR_METAN)
         
@@ -691,7 +688,7 @@ class Scene13_REST(Scene):
 # ============================================================================
 class Scene14_Examples(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "では実際に使われているAPIを見てみましょう。", CHAR_METAN)
         
@@ -724,7 +721,7 @@ class Scene14_Examples(Scene):
 # ============================================================================
 class Scene15_GraphQL(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "余談ですがRESTの次世代として注目されている「GraphQL」も紹介しますわ。", CHAR_METAN)
         
@@ -763,7 +760,7 @@ class Scene15_GraphQL(Scene):
 # ============================================================================
 class Scene16_Try(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "実際にAPIを試してみたくなりましたか？", CHAR_METAN)
         sub2 = show_subtitle(self, "ずんだもん", "試したいのだ！ でもどうやるのだ？", CHAR_ZUNDA, prev_sub=sub1)
@@ -796,7 +793,7 @@ class Scene16_Try(Scene):
 # ============================================================================
 class Scene17_Fail(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "最後に、初心者がやりがちな失敗を紹介しますわ。", CHAR_METAN)
         
@@ -833,7 +830,7 @@ class Scene17_Fail(Scene):
 # ============================================================================
 class Scene18_End(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         sub1 = show_subtitle(self, "めたん", "さあ、今日のまとめをしましょう。", CHAR_METAN)
         
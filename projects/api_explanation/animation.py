@@ -10,64 +10,56 @@ Usage:
 
 from manim import *
 import numpy as np
-import json
 import os
+import sys
 import difflib
 
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from audio_timeline import AudioTimeline
+from subtitle_track import soft_subtitles
+from subtitle_layout import wrap_text
+from subtitle_atlas import SubtitleAtlas
+from audio_index import load_audio_map
+from themes import get_theme
+
 config.sound = True
 
 # ============================================================================
 # カラー定数（ホワイトテーマ）
 # ============================================================================
-BG_COLOR = "#f5f5f5"
-TEXT_MAIN = "#1a1a2e"        # メインテキスト（濃紺）
-ACCENT_RED = "#d6336c"       # 深めローズ
-ACCENT_YELLOW = "#e8590c"    # ディープオレンジ
-ACCENT_BLUE = "#1971c2"      # ディープブルー
-ACCENT_GREEN = "#099268"     # ディープグリーン
-ACCENT_PURPLE = "#7048e8"    # ディープパープル
-ACCENT_CYAN = "#0c8599"      # ディープシアン
-TEXT_DIM = "#868e96"         # 薄めグレー
-CHAR_METAN = "#d6336c"       # めたんの色（ローズピンク）
-CHAR_ZUNDA = "#099268"       # ずんだもんの色（ディープグリーン）
-
-# 音声マップ読み込み
-AUDIO_MAP = {}
-map_path = "projects/api_explanation/media/audio/audio_map.json"
-if os.path.exists(map_path):
-    try:
-        with open(map_path, "r", encoding="utf-8") as f:
-            AUDIO_MAP = json.load(f)
-    except Exception as e:
-        print(f"Failed to load audio map: {e}")
+# VIBE_THEME でテーマを切り替えられる (tools/themes.json)
+THEME = get_theme("light")
+BG_COLOR = THEME.BG_COLOR
+TEXT_MAIN = THEME.TEXT_MAIN          # メインテキスト（濃紺）
+ACCENT_RED = THEME.ACCENT_RED        # 深めローズ
+ACCENT_YELLOW = THEME.ACCENT_YELLOW  # ディープオレンジ
+ACCENT_BLUE = THEME.ACCENT_BLUE      # ディープブルー
+ACCENT_GREEN = THEME.ACCENT_GREEN    # ディープグリーン
+ACCENT_PURPLE = THEME.ACCENT_PURPLE  # ディープパープル
+ACCENT_CYAN = THEME.ACCENT_CYAN      # ディープシアン
+TEXT_DIM = THEME.TEXT_DIM            # 薄めグレー
+CHAR_METAN = THEME.CHAR_METAN        # めたんの色（ローズピンク）
+CHAR_ZUNDA = THEME.CHAR_ZUNDA        # ずんだもんの色（ディープグリーン）
+
+# 音声マップ読み込み (ファイルの存在確認は読み込み時に1回だけ)
+AUDIO_MAP = load_audio_map(os.path.dirname(os.path.abspath(__file__)))
 
 # ============================================================================
 # ヘルパー関数
 # ============================================================================
 
-def wrap_text(text, max_chars=28):
-    """長いテキストを自動改行する。句読点やスペース付近で折り返す"""
-    if len(text) <= max_chars:
-        return text
-    mid = len(text) // 2
-    for offset in range(min(mid, 12)):
-        for pos in [mid + offset, mid - offset]:
-            if 0 < pos < len(text) and text[pos] in '、。！？ ,. ':
-                return text[:pos + 1] + '\n' + text[pos + 1:]
-    return text[:mid] + '\n' + text[mid:]
-
-
 def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     """字幕を返す。話者名（上段）+ セリフ（下段）を中央揃えで配置"""
     name = Text(speaker, font="Noto Sans JP", font_size=20,
                 color=speaker_color, weight=BOLD)
-    wrapped = wrap_text(text)
+    wrapped = wrap_text(text, font_size=24)
     line = Text(wrapped, font="Noto Sans JP", font_size=22, color=TEXT_MAIN)
     content = VGroup(name, line).arrange(DOWN, buff=0.15, center=True)
     bg = RoundedRectangle(
         corner_radius=0.1,
         width=content.get_width() + 0.8, height=content.get_height() + 0.4,
-        fill_color=WHITE, fill_opacity=0.85, stroke_color="#dee2e6", stroke_width=1
+        fill_color=THEME.SURFACE, fill_opacity=0.85, stroke_color=THEME.BORDER, stroke_width=1
     )
     bg.move_to(content)
     result = VGroup(bg, content)
@@ -76,6 +68,9 @@ def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     return result
 
 
+# 事前に描いた字幕の吹き出し (python tools/subtitle_atlas.py api_explanation)
+SUBTITLE_ATLAS = SubtitleAtlas(os.path.dirname(os.path.abspath(__file__)), get_subtitle, THEME)
+
 def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, prev_sub=None):
     """字幕を表示し、前の字幕があれば消す (音声があれば再生: ファジーマッチング)"""
     # シーンごとの音声インデックス管理
@@ -122,24 +117,33 @@ def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, p
             print(f"Audio lookup error: {e}")
 
     wait_time = duration
+    timeline = AudioTimeline.attach(scene)
+    start = scene.renderer.time
     
     # 音声再生
     if audio_data:
-        file_path = audio_data["file"]
-        if os.path.exists(file_path):
-            # Manimでのパス解決のために相対パスに変換
-            rel_path = os.path.relpath(file_path, os.getcwd())
-            scene.add_sound(rel_path)
-            wait_time = audio_data["duration"]
-
-    sub = get_subtitle(speaker, text, speaker_color)
-    anims = [FadeIn(sub, shift=UP * 0.1)]
-    if prev_sub is not None:
-        anims.append(FadeOut(prev_sub))
-    
-    scene.play(*anims, run_time=0.4)
-    # 音声の長さだけ待つ (少し余韻)
-    scene.wait(wait_time + 0.2)
+        start = timeline.add(scene, audio_data["file"])
+        wait_time = audio_data["duration"]
+
+    # 音声の長さだけ表示する (少し余韻)。終わりはフレーム境界に揃える
+    end = timeline.frame_ceil(start + 0.4 + wait_time + 0.2)
+    timeline.add_cue(speaker, text, start, end, speaker_color, line_id=(audio_data or {}).get("id"))
+
+    if soft_subtitles():
+        # 字幕は焼き込まず字幕ファイルだけに出す (尺は焼き込む場合と同じ)
+        sub = VGroup()
+        scene.wait(0.4)
+    else:
+        sub = SUBTITLE_ATLAS.get(speaker, text, speaker_color)
+        if sub is None:
+            sub = get_subtitle(speaker, text, speaker_color)
+        anims = [FadeIn(sub, shift=UP * 0.1)]
+        if prev_sub is not None:
+            anims.append(FadeOut(prev_sub))
+        scene.play(*anims, run_time=0.4)
+    hold = timeline.hold_time(scene, end)
+    if hold > 0:
+        scene.wait(hold)
     
     return sub
 
@@ -161,7 +165,7 @@ def get_labeled_box(label, color, width=2.5, height=1.0, font_size=24):
 
 class Scene01_Intro(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
 
         # タイトル表示
         title = Text("API とは何か？", font="Noto Sans JP", font_size=48, color=TEXT_MAIN, weight=BOLD)
@@ -237,7 +241,7 @@ class Scene01_Intro(Scene):
 
 class Scene02_Restaurant(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("APIの役割 = ウェイター", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -349,7 +353,7 @@ class Scene02_Restaurant(Scene):
 
 class Scene03_Interface(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("Interface = 接点・境界面", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -410,7 +414,7 @@ class Scene03_Interface(Scene):
 
 class Scene04_WebAPI(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("Web APIの仕組み", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -499,7 +503,7 @@ class Scene04_WebAPI(Scene):
 
 class Scene05_JSON(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("JSON (JavaScript Object Notation)", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -559,7 +563,7 @@ class Scene05_JSON(Scene):
 
 class Scene06_StatusCode(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("Status Code (ステータスコード)", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -617,7 +621,7 @@ class Scene06_StatusCode(Scene):
 
 class Scene07_WhyAPI(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("Why API? (APIのメリット)", font="Noto Sans JP", font_size=32, color=ACCENT_RED, weight=BOLD)
         section.to_edge(UP, buff=0.5)
@@ -9,6 +9,12 @@ manim render -qm scenes/diffusion_model_animation.py -a
 
 from manim import *
 import numpy as np
+import os
+import sys
+
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from asset_cache import memoize_mobject
 
 # ============================================================================
 # カラー定数（ホワイトテーマ）
@@ -58,8 +64,12 @@ def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, p
     return sub
 
 
+@memoize_mobject(cacheable=lambda args: args["seed"] is not None, rng=True)
 def get_noise_grid(rows, cols, cell_size=0.35, noise_level=1.0, seed=None):
-    """ノイズレベルに応じたグリッドを返す（0=きれい, 1=完全ノイズ）"""
+    """ノイズレベルに応じたグリッドを返す（0=きれい, 1=完全ノイズ）
+
+    seed を指定した呼び出しはキャッシュのコピーを返す (tools/asset_cache.py)
+    """
     if seed is not None:
         np.random.seed(seed)
     import colorsys
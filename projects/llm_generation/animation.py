@@ -8,6 +8,13 @@ manim render -qm scenes/llm_generation_animation.py -a
 from manim import *
 import numpy as np
 import random
+import os
+import sys
+
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from asset_cache import memoize_mobject
+from network_diagram import NetworkDiagram, ActivationFlow
 
 # ============================================================================
 # カラー定数
@@ -25,8 +32,9 @@ TEXT_DIM = "#888888"
 # ヘルパー関数
 # ============================================================================
 
+@memoize_mobject
 def get_token_box(text, color=ACCENT_BLUE, font_size=28, width=None, height=0.55):
-    """トークンを視覚化するボックスを返す"""
+    """トークンを視覚化するボックスを返す (同じ引数ならキャッシュのコピー)"""
     label = Text(text, font="Noto Sans JP", font_size=font_size, color=WHITE)
     w = width or (label.get_width() + 0.4)
     box = RoundedRectangle(
@@ -380,6 +388,21 @@ class Scene04_Transformer(Scene):
         self.play(FadeIn(interpret), run_time=0.8)
         self.wait(1.5)
 
+        # 層を重ねるたびに、全トークンの情報が密に混ざり合う
+        self.play(*[FadeOut(mob) for mob in [attn_title, target_rect, focus_label,
+                                             arcs, weight_labels, interpret]], run_time=0.5)
+        network = NetworkDiagram(
+            [5, 16, 16, 16, 5], neuron_radius=0.09, layer_buff=1.4, neuron_buff=0.08, seed=4,
+            positive_color=ACCENT_BLUE, negative_color=ACCENT_RED,
+        )
+        network.scale_to_fit_height(3.6).next_to(token_boxes, DOWN, buff=0.4)
+        layers_label = Text("これを何層も重ねる", font="Noto Sans JP",
+                            font_size=18, color=TEXT_DIM)
+        layers_label.next_to(network, DOWN, buff=0.2)
+        self.play(FadeIn(network), FadeIn(layers_label), run_time=0.8)
+        self.play(ActivationFlow(network, color=ACCENT_YELLOW), run_time=2)
+        self.wait(0.5)
+
         self.play(*[FadeOut(mob) for mob in self.mobjects], run_time=0.8)
 
 
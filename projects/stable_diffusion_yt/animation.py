@@ -1,7 +1,17 @@
 from manim import *
 import os
+import sys
 import difflib
-import json
+
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from audio_timeline import AudioTimeline
+from subtitle_track import soft_subtitles
+from subtitle_layout import wrap_text
+from audio_index import load_audio_map
+from shapes import StarShape, rune_ring
+from asset_cache import memoize_mobject
+from image_assets import load_image
 
 # Setup
 config.background_color = "#1e1e1e" # Darker background for "Dark side" theme
@@ -15,45 +25,20 @@ ACCENT_WARN = "#ff4b4b" # Red for danger/errors
 CHAR_ZUNDA = "#34eb7d" # Zundamon Green
 CHAR_METAN = "#ff7ae2" # Metan Pink
 
-# Helper Functions (Copied/Adapted)
-def wrap_text(text, max_chars=28):
-    if len(text) <= max_chars:
-        return text
-    
-    parts = []
-    current_part = ""
-    for char in text:
-        current_part += char
-        if len(current_part) >= max_chars:
-            parts.append(current_part)
-            current_part = ""
-            
-    if current_part:
-        parts.append(current_part)
-        
-    return "\n".join(parts)
+# Audio map (validated once; entries carry resolved "file" paths)
+AUDIO_MAP = load_audio_map(os.path.dirname(os.path.abspath(__file__)))
 
+# Helper Functions (Copied/Adapted)
 def get_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, prev_sub=None):
     # Remove previous subtitle if exists
     if prev_sub:
         scene.remove(prev_sub)
         
-    # Create new subtitle
-    wrapped = wrap_text(text)
-    line = Text(wrapped, font="Noto Sans JP", font_size=28, color=TEXT_MAIN, line_spacing=1.2)
-    
-    # Speaker label
-    label = Text(speaker, font="Noto Sans JP", font_size=24, color=speaker_color, weight=BOLD)
-    label.next_to(line, UP, buff=0.2, aligned_edge=LEFT)
-    
-    # Background for readability
-    bg = BackgroundRectangle(VGroup(label, line), color=BLACK, fill_opacity=0.7, buff=0.2)
-    
-    group = VGroup(bg, label, line).to_edge(DOWN, buff=0.5)
-    scene.add(group)
-    
     # Audio sync
     wait_time = 2.0 # Default
+    line_id = None
+    timeline = AudioTimeline.attach(scene)
+    start = scene.renderer.time
     
     if hasattr(scene, "audio_map") and scene.audio_map:
         # Find matching audio
@@ -67,14 +52,38 @@ def get_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, prev_sub=None):
                 best_match = item
         
         if best_match and highest_ratio > 0.6:
-            audio_file = best_match["file"]
-            if os.path.exists(audio_file):
-                scene.add_sound(audio_file)
-                wait_time = best_match["duration"]
+            start = timeline.add(scene, best_match["file"])
+            wait_time = best_match["duration"]
+            line_id = best_match.get("id")
+    
+    # 終わりはフレーム境界に揃える (字幕ファイルの表示区間も同じ)
+    end = timeline.frame_ceil(start + 0.3 + wait_time + 0.2)
+    timeline.add_cue(speaker, text, start, end, speaker_color, line_id=line_id)
     
-    # Text animation
-    scene.play(Write(line), run_time=0.3)
-    scene.wait(wait_time + 0.2)
+    if soft_subtitles():
+        # 字幕は焼き込まず字幕ファイルだけに出す (尺は焼き込む場合と同じ)
+        group = VGroup()
+        scene.wait(0.3)
+    else:
+        # Create new subtitle
+        wrapped = wrap_text(text, font_size=28)
+        line = Text(wrapped, font="Noto Sans JP", font_size=28, color=TEXT_MAIN, line_spacing=1.2)
+        
+        # Speaker label
+        label = Text(speaker, font="Noto Sans JP", font_size=24, color=speaker_color, weight=BOLD)
+        label.next_to(line, UP, buff=0.2, aligned_edge=LEFT)
+        
+        # Background for readability
+        bg = BackgroundRectangle(VGroup(label, line), color=BLACK, fill_opacity=0.7, buff=0.2)
+        
+        group = VGroup(bg, label, line).to_edge(DOWN, buff=0.5)
+        scene.add(group)
+        
+        # Text animation
+        scene.play(Write(line), run_time=0.3)
+    hold = timeline.hold_time(scene, end)
+    if hold > 0:
+        scene.wait(hold)
     
     return group
 
@@ -84,9 +93,10 @@ def get_image(name, scale=1.0):
     if not name.endswith((".png", ".jpg")):
         name += ".png"
         
-    path = os.path.join("projects", "stable_diffusion_yt", "media", "images", name)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media", "images", name)
     if os.path.exists(path):
-        return ImageMobject(path).scale(scale)
+        # 出力解像度に合わせて縮小・キャッシュした画像 (tools/image_assets.py)
+        return load_image(path, scale)
     
     # Fallbacks
     if "noise" in key_name:
@@ -101,6 +111,7 @@ def get_image(name, scale=1.0):
     return Text(key_name, color=GREY).scale(0.5)
 
 # Custom Drawings
+# draw_noise は呼ぶたびに違う点を打つのでメモ化しない
 def draw_noise():
     # Simulated noise with dots
     dots = VGroup()
@@ -114,6 +125,7 @@ def draw_noise():
         dots.add(d)
     return dots
 
+@memoize_mobject
 def draw_robot():
     head = RoundedRectangle(width=1, height=0.8, corner_radius=0.2, color=ACCENT_COLOR, fill_opacity=0.5)
     eyes = VGroup(
@@ -128,13 +140,12 @@ def draw_robot():
     )
     return VGroup(head, eyes, antennas)
 
+@memoize_mobject
 def draw_magic_circle():
     c1 = Circle(radius=1.5, color=PURPLE)
     c2 = Circle(radius=1.2, color=PURPLE)
-    star = Star(n=5, outer_radius=1.2, inner_radius=0.5, color=PURPLE)
-    runes = VGroup(*[Text(char, font="Consolas", color=PURPLE).scale(0.5).move_to(
-        1.35 * np.array([np.cos(theta), np.sin(theta), 0])
-    ) for i, char in enumerate("STABLEDIFFUSION") for theta in [i * 2 * PI / 15]])
+    star = StarShape(n=5, outer_radius=1.2, inner_radius=0.5, color=PURPLE)
+    runes = rune_ring("STABLEDIFFUSION", radius=1.35, font="Consolas", color=PURPLE, scale=0.5)
     return VGroup(c1, c2, star, runes)
 
 # ============================================================================
@@ -144,21 +155,16 @@ class BaseScene(Scene):
     def setup(self):
         self.camera.background_color = "#1e1e1e"
         
-        # Load audio map
-        map_path = os.path.join("projects", "stable_diffusion_yt", "media", "audio", "audio_map.json")
+        # Audio map (loaded and validated once at import time)
         scene_name = self.__class__.__name__
         # Normalize scene name for map lookup (e.g. Scene01_Intro -> Scene01)
         # Use simple prefix matching
         
         self.audio_map = []
-        if os.path.exists(map_path):
-            with open(map_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # Try to find matching key
-                for key in data.keys():
-                    if key in scene_name: # e.g. "Scene01" in "Scene01_Intro"
-                        self.audio_map = data[key]
-                        break
+        for key in AUDIO_MAP.keys():
+            if key in scene_name: # e.g. "Scene01" in "Scene01_Intro"
+                self.audio_map = AUDIO_MAP[key]
+                break
 
 # ============================================================================
 # Scenes
@@ -10,62 +10,53 @@ Usage:
 
 from manim import *
 import numpy as np
+import os
+import sys
+
+# 共通モジュール (tools/) の読み込み
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from audio_timeline import AudioTimeline
+from subtitle_track import soft_subtitles
+from subtitle_layout import wrap_text
+from subtitle_atlas import SubtitleAtlas
+from audio_index import load_audio_map
+from themes import get_theme
 
 # ============================================================================
 # カラー・スタイル
 # ============================================================================
-BG_COLOR = "#f5f5f5"
-TEXT_MAIN = "#1a1a2e"
-ACCENT_BLUE = "#1971c2"
-ACCENT_GREEN = "#099268"
-ACCENT_RED = "#d6336c"
-ACCENT_YELLOW = "#e8590c"
-ACCENT_PURPLE = "#9c36b5"
-TEXT_DIM = "#868e96"
-
-CHAR_ZUNDA = "#099268"
-CHAR_METAN = "#d6336c"
-
-import json
-import os
-
-# 音声マップ読み込み
-AUDIO_MAP = {}
-map_path = "projects/svae_explanation/media/audio/audio_map.json"
-if os.path.exists(map_path):
-    try:
-        with open(map_path, "r", encoding="utf-8") as f:
-            AUDIO_MAP = json.load(f)
-    except Exception as e:
-        print(f"Failed to load audio map: {e}")
+# VIBE_THEME でテーマを切り替えられる (tools/themes.json)
+THEME = get_theme("light", ACCENT_PURPLE="#9c36b5")
+BG_COLOR = THEME.BG_COLOR
+TEXT_MAIN = THEME.TEXT_MAIN
+ACCENT_BLUE = THEME.ACCENT_BLUE
+ACCENT_GREEN = THEME.ACCENT_GREEN
+ACCENT_RED = THEME.ACCENT_RED
+ACCENT_YELLOW = THEME.ACCENT_YELLOW
+ACCENT_PURPLE = THEME.ACCENT_PURPLE
+TEXT_DIM = THEME.TEXT_DIM
+
+CHAR_ZUNDA = THEME.CHAR_ZUNDA
+CHAR_METAN = THEME.CHAR_METAN
+
+# 音声マップ読み込み (ファイルの存在確認は読み込み時に1回だけ)
+AUDIO_MAP = load_audio_map(os.path.dirname(os.path.abspath(__file__)))
 
 # ============================================================================
 # ヘルパー関数
 # ============================================================================
 
-def wrap_text(text, max_chars=28):
-    """長いテキストを自動改行する。句読点やスペース付近で折り返す"""
-    if len(text) <= max_chars:
-        return text
-    mid = len(text) // 2
-    for offset in range(min(mid, 12)):
-        for pos in [mid + offset, mid - offset]:
-            if 0 < pos < len(text) and text[pos] in '、。！？ ,. ':
-                return text[:pos + 1] + '\n' + text[pos + 1:]
-    return text[:mid] + '\n' + text[mid:]
-
-
 def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     """字幕を返す"""
     name = Text(speaker, font="Noto Sans JP", font_size=20,
                 color=speaker_color, weight=BOLD)
-    wrapped = wrap_text(text)
+    wrapped = wrap_text(text, font_size=24)
     line = Text(wrapped, font="Noto Sans JP", font_size=22, color=TEXT_MAIN)
     content = VGroup(name, line).arrange(DOWN, buff=0.15, center=True)
     bg = RoundedRectangle(
         corner_radius=0.1,
         width=content.get_width() + 0.8, height=content.get_height() + 0.4,
-        fill_color=WHITE, fill_opacity=0.85, stroke_color="#dee2e6", stroke_width=1
+        fill_color=THEME.SURFACE, fill_opacity=0.85, stroke_color=THEME.BORDER, stroke_width=1
     )
     bg.move_to(content)
     result = VGroup(bg, content)
@@ -73,6 +64,9 @@ def get_subtitle(speaker, text, speaker_color=TEXT_MAIN):
     result.set_x(0)
     return result
 
+# 事前に描いた字幕の吹き出し (python tools/subtitle_atlas.py svae_explanation)
+SUBTITLE_ATLAS = SubtitleAtlas(os.path.dirname(os.path.abspath(__file__)), get_subtitle, THEME)
+
 def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, prev_sub=None):
     """字幕を表示 (音声があれば再生)"""
     # シーンごとの音声インデックス管理
@@ -96,22 +90,33 @@ def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, p
             print(f"Audio lookup error: {e}")
 
     wait_time = duration
+    timeline = AudioTimeline.attach(scene)
+    start = scene.renderer.time
     
     # 音声再生
     if audio_data:
-        file_path = audio_data["file"]
-        if os.path.exists(file_path):
-            scene.add_sound(file_path)
-            wait_time = audio_data["duration"]
-    
-    sub = get_subtitle(speaker, text, speaker_color)
-    anims = [FadeIn(sub, shift=UP * 0.1)]
-    if prev_sub is not None:
-        anims.append(FadeOut(prev_sub))
+        start = timeline.add(scene, audio_data["file"])
+        wait_time = audio_data["duration"]
     
-    scene.play(*anims, run_time=0.4)
-    # 音声の長さだけ待つ (少し余韻)
-    scene.wait(wait_time + 0.2)
+    # 音声の長さだけ表示する (少し余韻)。終わりはフレーム境界に揃える
+    end = timeline.frame_ceil(start + 0.4 + wait_time + 0.2)
+    timeline.add_cue(speaker, text, start, end, speaker_color, line_id=(audio_data or {}).get("id"))
+
+    if soft_subtitles():
+        # 字幕は焼き込まず字幕ファイルだけに出す (尺は焼き込む場合と同じ)
+        sub = VGroup()
+        scene.wait(0.4)
+    else:
+        sub = SUBTITLE_ATLAS.get(speaker, text, speaker_color)
+        if sub is None:
+            sub = get_subtitle(speaker, text, speaker_color)
+        anims = [FadeIn(sub, shift=UP * 0.1)]
+        if prev_sub is not None:
+            anims.append(FadeOut(prev_sub))
+        scene.play(*anims, run_time=0.4)
+    hold = timeline.hold_time(scene, end)
+    if hold > 0:
+        scene.wait(hold)
     
     return sub
 
@@ -121,7 +126,7 @@ def show_subtitle(scene, speaker, text, speaker_color=TEXT_MAIN, duration=3.0, p
 
 class Scene01_Intro(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
 
         title = Text("SVAE: 構造化変分オートエンコーダ", font="Noto Sans JP", font_size=36, color=TEXT_MAIN, weight=BOLD)
         title.to_edge(UP, buff=0.2)
@@ -198,7 +203,7 @@ class Scene01_Intro(Scene):
 
 class Scene02_Review(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
 
         section = Text("VAEの復習と限界", font="Noto Sans JP", font_size=32, color=ACCENT_BLUE, weight=BOLD)
         section.to_edge(UP, buff=0.2)
@@ -277,7 +282,7 @@ class Scene02_Review(Scene):
 
 class Scene03_Core(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
 
         section = Text("SVAEの核心 (Deep Learning + PGM)", font="Noto Sans JP", font_size=32, color=ACCENT_PURPLE, weight=BOLD)
         section.to_edge(UP, buff=0.2)
@@ -362,7 +367,7 @@ class Scene03_Core(Scene):
 
 class Scene04_App(Scene):
     def construct(self):
-        self.camera.background_color = BG_COLOR
+        THEME.apply(self)
         
         section = Text("応用: カオス時系列予測", font="Noto Sans JP", font_size=32, color=ACCENT_YELLOW, weight=BOLD)
         section.to_edge(UP, buff=0.2)
@@ -0,0 +1,70 @@
+"""apply_theme.py が api_basics_yt の図形や塗りの上の文字を書き換えないこと"""
+
+import os
+import ast
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from apply_theme import PROJECTS_DIR, load_themes, collect_edits, theme_file
+
+API_BASICS = os.path.join(PROJECTS_DIR, "api_basics_yt", "animation.py")
+
+# 意図して WHITE にしている図形と、塗りのあるボタンの上の文字
+UNTOUCHED = [
+    'face = Circle(radius=0.3, color=WHITE, fill_opacity=1)',
+    'Rectangle(width=0.4, height=0.6, color=WHITE, fill_opacity=1)',
+    'window = Rectangle(width=1.6, height=1.5, color=WHITE, fill_opacity=0.3)',
+    'screen = Rectangle(width=1.8, height=3, color=WHITE, fill_opacity=1)',
+    'btn_txt = Text("Send", font_size=16, color=WHITE).move_to(btn)',
+]
+
+
+def read_source():
+    with open(API_BASICS, "r", encoding="utf-8-sig") as f:
+        return f.read()
+
+
+def test_api_basics_is_skipped_on_its_own_theme():
+    result = theme_file((API_BASICS, "light", load_themes()["light"], True))
+    assert result["skipped"]
+    assert result["edits"] == 0
+
+
+def test_shapes_and_text_on_filled_shapes_are_untouched():
+    source = read_source()
+    lines = source.splitlines()
+    edited = {lineno for lineno, *_ in collect_edits(ast.parse(source), load_themes()["light"])}
+    for snippet in UNTOUCHED:
+        linenos = [i + 1 for i, line in enumerate(lines) if snippet in line]
+        assert linenos, snippet
+        assert not edited & set(linenos), snippet
+
+
+def test_text_colour_is_still_rewritten():
+    source = (
+        "TEXT_MAIN = '#1a1a2e'\n"
+        "def f():\n"
+        "    title = Text('a', color=WHITE)\n"
+        "    box = Rectangle(color=WHITE, fill_opacity=1)\n"
+        "    label = Text('b', color=WHITE).move_to(box)\n"
+    )
+    edits = collect_edits(ast.parse(source), load_themes()["light"])
+    assert [(lineno, text) for lineno, _, _, _, text, _ in edits] == [(3, "TEXT_MAIN")]
+
+
+def test_crlf_is_kept_and_multi_line_values_are_reported(tmp_path):
+    path = tmp_path / "animation.py"
+    path.write_bytes(
+        b"BG_COLOR = '#000000'\r\n"
+        b"TEXT_MAIN = ('#ffff'\r\n"
+        b"             'ff')\r\n"
+    )
+    result = theme_file((str(path), "light", load_themes()["light"], False))
+    assert result["edits"] == 1
+    assert result["skipped_edits"] == ['line 2: "#1a1a2e"']
+    assert path.read_bytes() == (
+        b'BG_COLOR = "#f5f5f5"\r\n'
+        b"TEXT_MAIN = ('#ffff'\r\n"
+        b"             'ff')\r\n"
+    )
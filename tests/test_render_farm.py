@@ -0,0 +1,84 @@
+"""render_farm.py のコーディネーターとワーカーを localhost でつなぎ、MP4 と付随ファイルが届くこと"""
+
+import os
+import sys
+import socket
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import render_farm
+
+SIDECARS = {".srt": b"1\n00:00:00,000 --> 00:00:01,000\nA\n", ".subtitles.json": b"{}", ".timeline.json": b"{}"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_worker_uploads_video_and_sidecars(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_farm, "PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(render_farm, "HEARTBEAT_INTERVAL", 0.1)
+    monkeypatch.setattr(render_farm, "POLL_INTERVAL", 0.1)
+
+    def fake_render(project, scene, quality):
+        video = render_farm.video_path_for({"project": project, "scene": scene, "quality": quality})
+        os.makedirs(os.path.dirname(video), exist_ok=True)
+        with open(video, "wb") as f:
+            f.write(b"mp4")
+        for suffix, data in SIDECARS.items():
+            with open(os.path.splitext(video)[0] + suffix, "wb") as f:
+                f.write(data)
+        return "SUCCESS"
+
+    monkeypatch.setattr(render_farm, "run_render", fake_render)
+    # 同じマシンなので出力先は同じ。コーディネーターが書き込んだものを記録する
+    stored = {}
+    write_atomic = render_farm._write_atomic
+
+    def spy(dest, data):
+        stored[os.path.basename(dest)] = data
+        write_atomic(dest, data)
+
+    monkeypatch.setattr(render_farm, "_write_atomic", spy)
+
+    coordinator = render_farm.Coordinator.for_project("demo", "-ql", ["Scene01", "Scene02"])
+    port = free_port()
+    result = {}
+    server = threading.Thread(target=lambda: result.update(jobs=render_farm.serve(coordinator, "127.0.0.1", port)))
+    server.start()
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            threading.Event().wait(0.05)
+
+    render_farm.run_worker(f"http://127.0.0.1:{port}", "test")
+    server.join(timeout=10)
+
+    assert [job["status"] for job in result["jobs"]] == ["done", "done"]
+    for scene in ("Scene01", "Scene02"):
+        assert stored[f"{scene}.mp4"] == b"mp4"
+        for suffix, data in SIDECARS.items():
+            assert stored[scene + suffix] == data
+
+
+def test_stale_sidecars_are_removed_on_completion(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_farm, "PROJECTS_DIR", str(tmp_path))
+    coordinator = render_farm.Coordinator.for_project("demo", "-ql", ["Scene01"])
+    video = render_farm.video_path_for(coordinator.jobs["0"])
+    stale = os.path.splitext(video)[0] + ".vtt"
+    os.makedirs(os.path.dirname(video))
+    with open(stale, "w") as f:
+        f.write("WEBVTT\n")
+
+    coordinator.claim("w")
+    assert not coordinator.store_sidecar("0", "w", "/../../escape", b"x")
+    assert coordinator.store_sidecar("0", "w", ".srt", b"srt")
+    assert coordinator.store_video("0", "w", b"mp4")
+    assert coordinator.complete("0", "w", "SUCCESS", 1.0)
+    assert not os.path.exists(stale)
+    assert os.path.exists(os.path.splitext(video)[0] + ".srt")
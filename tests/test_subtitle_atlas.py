@@ -0,0 +1,50 @@
+"""subtitle_atlas.py の吹き出しが manim の ImageMobject として画素等倍で置かれること"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from subtitle_atlas import pixel_center
+
+FRAME_HEIGHT = 8.0
+RESOLUTIONS = [(854, 480), (1280, 720), (1920, 1080), (2560, 1440)]
+
+
+def displayed_box(center, w, h, width, height):
+    """manim の ImageMobject(scale_to_resolution=height) の表示位置と大きさ
+
+    ImageMobject.reset_points と Camera.display_image_mobject / points_to_pixel_coords の計算をなぞる。
+    """
+    frame_width = FRAME_HEIGHT * width / height
+    mob_height = h / height * FRAME_HEIGHT
+    mob_width = mob_height * w / h
+    cx, cy = center
+    corners = np.array([
+        [cx - mob_width / 2, cy + mob_height / 2],  # UL
+        [cx + mob_width / 2, cy + mob_height / 2],  # UR
+        [cx - mob_width / 2, cy - mob_height / 2],  # DL
+    ])
+    pixels = np.zeros((3, 2))
+    pixels[:, 0] = corners[:, 0] * (width / frame_width) + width / 2
+    pixels[:, 1] = corners[:, 1] * -(height / FRAME_HEIGHT) + height / 2
+    ul, ur, dl = pixels.astype("int")
+    size = (max(int(np.linalg.norm(ur - ul)), 1), max(int(np.linalg.norm(dl - ul)), 1))
+    center_coords = ul + ((ur - ul) + (dl - ul)) / 2
+    paste = (center_coords - np.array(size) / 2).astype(int)
+    return tuple(int(v) for v in paste), size
+
+
+def test_sprite_round_trips_pixel_exact():
+    rng = np.random.default_rng(0)
+    for width, height in RESOLUTIONS:
+        frame_width = FRAME_HEIGHT * width / height
+        for _ in range(2000):
+            w = int(rng.integers(40, width // 2))
+            h = int(rng.integers(20, height // 3))
+            x0 = int(rng.integers(0, width - w))
+            y0 = int(rng.integers(0, height - h))
+            center = pixel_center(x0, y0, w, h, width, height, frame_width, FRAME_HEIGHT)
+            assert displayed_box(center, w, h, width, height) == ((x0, y0), (w, h)), (width, x0, y0, w, h)
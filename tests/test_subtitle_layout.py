@@ -0,0 +1,59 @@
+"""subtitle_layout.py の禁則・英単語・行のバランス・収まらない段落"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from subtitle_layout import NO_START, NO_END, text_width, wrap_text
+
+# 存在しないフォント名にして、環境に関係なく概算の送り幅で測る
+FONT = "Vibe Test Font"
+FONT_SIZE = 24
+EM = FONT_SIZE / 72
+
+
+def wrap(text, max_chars):
+    lines = wrap_text(text, max_chars, FONT_SIZE, FONT).split("\n")
+    assert "".join(lines).replace(" ", "") == text.replace(" ", "")
+    return lines
+
+
+def test_no_punctuation_or_small_kana_at_line_start():
+    text = "これは、とても長い字幕です。ちょっと待ってください！「引用」もあります。ッと小さい文字も。"
+    for max_chars in range(6, 16):
+        for line in wrap(text, max_chars)[1:]:
+            assert line[0] not in NO_START, (max_chars, line)
+
+
+def test_no_opening_bracket_at_line_end():
+    text = "ずんだもんは「枝豆の妖精」で（本人いわく）『とても偉い』のだ。【重要】です。"
+    for max_chars in range(6, 16):
+        for line in wrap(text, max_chars)[:-1]:
+            assert line[-1] not in NO_END, (max_chars, line)
+
+
+def test_latin_words_are_not_split():
+    text = "今日はOpenAIのGPT-4とREST APIとJSON形式のレスポンスについて説明するのだ。"
+    words = ["OpenAI", "GPT-4", "REST", "API", "JSON"]
+    for max_chars in range(8, 20):
+        lines = wrap(text, max_chars)
+        for word in words:
+            assert any(word in line for line in lines), (max_chars, word, lines)
+
+
+def test_two_lines_are_balanced():
+    text = "APIはアプリケーション同士が会話するための窓口のようなものなのだ。"
+    lines = wrap(text, 28)
+    assert len(lines) == 2
+    widths = [text_width(line, FONT_SIZE, FONT) for line in lines]
+    # 前が詰まった 1 行 + 残りにはせず、幅の差は数文字分に収める
+    assert abs(widths[0] - widths[1]) < 6 * EM
+    assert max(widths) <= 28 * EM
+
+
+def test_paragraph_with_too_few_break_points_does_not_crash():
+    # 切れる位置が 1 か所しかない (英字の並びは途中で切らない)
+    lines = wrap("あ" + "A" * 200, 28)
+    assert lines == ["あ", "A" * 200]
+    assert wrap("A" * 200, 28) == ["A" * 200]
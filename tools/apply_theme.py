@@ -1,22 +1,316 @@
+"""
+テーマ一括適用ツール
+====================
+
+tools/themes.json に宣言したテーマを projects/*/animation.py に適用する。
+各ファイルを ast で 1 回だけ解析し、該当するノードの位置だけを書き換える
+(単純な文字列置換のように無関係な箇所を壊さない)。
+
+テーマの書式:
+  palette  モジュール直下の色定数の値      例: BG_COLOR = "#f5f5f5"
+  names    文字色の引数に渡している名前の置き換え 例: Text(..., color=WHITE) -> color=TEXT_MAIN
+           (speaker_color のキーワード引数と引数の既定値、Text / MarkupText の color が対象。
+            塗りのある図形 (fill_opacity > 0) や、その上に move_to で置いた文字、
+            fill_color などの面の色は触らない。置き換え先の定数がファイルに定義されていない場合は書き換えない)
+
+すでにそのテーマを使っているプロジェクト (get_theme("<テーマ名>") を呼んでいるか、
+色定数がすべてテーマの値と同じもの) は書き換えない。
+
+書き込みは一時ファイル + os.replace でアトミックに行い、ファイル単位で並列処理する。
+変更の影響を受ける Scene クラスを報告するので、それだけを再レンダリングすればよい。
+
+Usage:
+  python tools/apply_theme.py light                         # 全プロジェクト
+  python tools/apply_theme.py dark fourier_transform --dry-run
+  python tools/apply_theme.py light api_basics_yt --report changed.json
+"""
+
+import io
 import os
+import ast
+import json
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+THEMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes.json")
+
+# names の置き換え対象になる引数名 (どの呼び出し・引数の既定値でも文字色のもの)
+TEXT_COLOR_ARGS = {"speaker_color"}
+# color= を文字色として置き換える呼び出し
+TEXT_CALLS = {"Text", "MarkupText"}
+# 文字を図形の上に置くメソッド
+PLACE_METHODS = {"move_to"}
+
+
+def load_themes(path=THEMES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_scene_classes(tree):
+    """モジュール直下の Scene クラス名 (ファイル内の基底クラス経由も含む)"""
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    scenes = set()
+
+    def base_names(node):
+        for base in node.bases:
+            if isinstance(base, ast.Name):
+                yield base.id
+            elif isinstance(base, ast.Attribute):
+                yield base.attr
+
+    changed = True
+    while changed:
+        changed = False
+        for name, node in classes.items():
+            if name in scenes:
+                continue
+            if any(b in scenes or (b not in classes and "Scene" in b) for b in base_names(node)):
+                scenes.add(name)
+                changed = True
+    # 基底クラスとしてのみ使われるもの (例: BaseScene) は除く
+    used_as_base = {b for node in classes.values() for b in base_names(node)}
+    return [n for n in classes if n in scenes and n not in used_as_base]
+
+
+def top_level_symbols(tree):
+    """モジュール直下の シンボル名 -> ノード"""
+    symbols = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            symbols[node.name] = node
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    symbols[target.id] = node
+    return symbols
+
+
+def is_filled(call):
+    """fill_opacity > 0 を指定した呼び出しか (値がわからなければ塗りありとみなす)"""
+    for kw in call.keywords:
+        if kw.arg == "fill_opacity":
+            value = kw.value
+            if isinstance(value, ast.Constant) and isinstance(value.value, (int, float)):
+                return value.value > 0
+            return True
+    return False
+
+
+def filled_names(node):
+    """塗りのある図形を代入した変数名"""
+    names = set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Assign) and any(isinstance(c, ast.Call) and is_filled(c) for c in ast.walk(sub.value)):
+            names.update(t.id for t in sub.targets if isinstance(t, ast.Name))
+    return names
+
+
+def placed_on_filled(call, parents, filled):
+    """Text(...).move_to(btn) のように、塗りのある図形の上に置いているか"""
+    node = call
+    while True:
+        attr = parents.get(node)
+        method = parents.get(attr)
+        if not (isinstance(attr, ast.Attribute) and isinstance(method, ast.Call) and method.func is attr):
+            return False
+        if attr.attr in PLACE_METHODS and any(
+                isinstance(n, ast.Name) and n.id in filled for arg in method.args for n in ast.walk(arg)):
+            return True
+        node = method
+
+
+def text_color_targets(node, parents, filled):
+    """node が文字色として受け取る色の式"""
+    if isinstance(node, ast.Call):
+        targets = [kw.value for kw in node.keywords if kw.arg in TEXT_COLOR_ARGS]
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name in TEXT_CALLS and not is_filled(node) and not placed_on_filled(node, parents, filled):
+            targets += [kw.value for kw in node.keywords if kw.arg == "color"]
+        return targets
+    if isinstance(node, (ast.FunctionDef, ast.Lambda)):
+        args = node.args
+        positional = args.posonlyargs + args.args
+        defaults = list(zip(positional[len(positional) - len(args.defaults):], args.defaults))
+        defaults += [(a, d) for a, d in zip(args.kwonlyargs, args.kw_defaults) if d is not None]
+        return [d for a, d in defaults if a.arg in TEXT_COLOR_ARGS]
+    return []
+
+
+def uses_theme(tree, theme_name, theme):
+    """すでにそのテーマの配色になっているか"""
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "get_theme"
+                and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value == theme_name):
+            return True
+    palette = theme.get("palette", {})
+    values = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id in palette and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)):
+            values[node.targets[0].id] = node.value.value.lower()
+    return bool(values) and all(values[name] == palette[name].lower() for name in values)
+
+
+def collect_edits(tree, theme):
+    """書き換え (lineno, col, end_lineno, end_col, 新しいテキスト, シンボル名) のリスト"""
+    palette = theme.get("palette", {})
+    names = theme.get("names", {})
+    symbols = top_level_symbols(tree)
+    edits = []
+
+    # palette: モジュール直下の NAME = "..." の値
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)):
+            continue
+        name = node.targets[0].id
+        value = node.value
+        if name in palette and isinstance(value, ast.Constant) and isinstance(value.value, str):
+            if value.value.lower() != palette[name].lower():
+                edits.append((value, json.dumps(palette[name]), name))
+
+    # names: 色引数に渡された名前 (置き換え先が定義済みのものだけ)
+    mapping = {old: new for old, new in names.items() if new in symbols}
+    if mapping:
+        parents = {child: parent for parent in ast.walk(tree) for child in ast.iter_child_nodes(parent)}
+        for owner, node in symbols.items():
+            filled = filled_names(node)
+            for sub in ast.walk(node):
+                for value in text_color_targets(sub, parents, filled):
+                    if isinstance(value, ast.Name) and value.id in mapping:
+                        edits.append((value, mapping[value.id], owner))
+
+    # 同じノードが複数回拾われないようにする
+    unique = {}
+    for node, text, owner in edits:
+        unique[(node.lineno, node.col_offset)] = (node.lineno, node.col_offset,
+                                                  node.end_lineno, node.end_col_offset, text, owner)
+    return sorted(unique.values())
+
+
+def affected_scenes(tree, changed_symbols):
+    """変更されたシンボルを (間接的に) 参照している Scene クラス"""
+    symbols = top_level_symbols(tree)
+    deps = {
+        name: {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and n.id in symbols and n.id != name}
+        for name, node in symbols.items()
+    }
+
+    def depends(name, seen):
+        if name in changed_symbols:
+            return True
+        seen.add(name)
+        return any(depends(d, seen) for d in deps.get(name, ()) if d not in seen)
+
+    return [name for name in find_scene_classes(tree) if depends(name, set())]
+
+
+def apply_edits(source, edits):
+    """ast の位置 (UTF-8 バイトオフセット) に従って書き換え、(新しいソース, 適用した編集, 飛ばした編集) を返す
+
+    複数行にまたがるノードは書き換えずに飛ばす。改行コード (CRLF / LF) はそのまま残す。
+    """
+    lines = io.StringIO(source, newline="").readlines()
+    encoded = [line.encode("utf-8") for line in lines]
+    applied, skipped = [], []
+    for edit in reversed(edits):
+        lineno, col, end_lineno, end_col, text, _ = edit
+        if lineno != end_lineno:
+            skipped.append(edit)
+            continue
+        line = encoded[lineno - 1]
+        encoded[lineno - 1] = line[:col] + text.encode("utf-8") + line[end_col:]
+        applied.append(edit)
+    return b"".join(encoded).decode("utf-8"), applied[::-1], skipped[::-1]
+
+
+def write_atomic(path, content):
+    """同じディレクトリの一時ファイルに書いてから置き換える"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def theme_file(args):
+    """1 ファイルにテーマを適用し、結果の dict を返す (プロセスプール用)"""
+    path, theme_name, theme, dry_run = args
+    # 改行コードを変えずに書き戻すため、読み込み時に変換しない
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        source = f.read()
+    # BOM 付きのファイルは BOM を保ったまま書き戻す
+    bom = "\ufeff" if source.startswith("\ufeff") else ""
+    source = source[len(bom):]
+    tree = ast.parse(source)
+    result = {"file": path, "edits": 0, "skipped_edits": [], "scenes": [],
+              "skipped": uses_theme(tree, theme_name, theme)}
+    if result["skipped"]:
+        return result
+    edits = collect_edits(tree, theme)
+    if not edits:
+        return result
+
+    new_source, applied, skipped = apply_edits(source, edits)
+    result["edits"] = len(applied)
+    result["skipped_edits"] = [f"line {lineno}: {text}" for lineno, _, _, _, text, _ in skipped]
+    if not applied:
+        return result
+    ast.parse(new_source)  # 壊れた結果は書き込まない
+    result["scenes"] = affected_scenes(tree, {owner for *_, owner in applied})
+    if not dry_run:
+        write_atomic(path, bom + new_source)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a declarative colour theme to project animation.py files")
+    parser.add_argument("theme", help="Theme name in tools/themes.json")
+    parser.add_argument("projects", nargs="*", help="Project names (default: all in 'projects/')")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    parser.add_argument("--report", help="Write {project: [changed scenes]} as JSON to this path")
+    args = parser.parse_args()
+
+    themes = load_themes()
+    if args.theme not in themes:
+        print(f"Unknown theme '{args.theme}'. Available: {', '.join(themes)}")
+        return
+    theme = themes[args.theme]
+
+    names = args.projects or sorted(os.listdir(PROJECTS_DIR))
+    paths = [os.path.join(PROJECTS_DIR, n, "animation.py") for n in names]
+    paths = [p for p in paths if os.path.exists(p)]
 
-file_path = r"d:\Program Projects\python\manim\scenes\diffusion_model_animation.py"
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(theme_file, [(p, args.theme, theme, args.dry_run) for p in paths]))
 
-with open(file_path, "r", encoding="utf-8") as f:
-    content = f.read()
+    report = {}
+    for result in results:
+        project = os.path.basename(os.path.dirname(result["file"]))
+        report[project] = result["scenes"]
+        if result["skipped"]:
+            print(f"{project}: already on '{args.theme}'")
+            continue
+        print(f"{project}: {result['edits']} edits")
+        for skipped in result["skipped_edits"]:
+            print(f"  Skipped multi-line value at {skipped}")
+        if result["scenes"]:
+            print(f"  Changed scenes: {' '.join(result['scenes'])}")
 
-# 置換ルール
-replacements = [
-    ("color=WHITE", "color=TEXT_MAIN"),
-    ("color=GREY_B", "color=TEXT_DIM"),
-    ("color=GREY_A", "color=TEXT_DIM"),
-    ("speaker_color=WHITE", "speaker_color=TEXT_MAIN"),
-]
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
 
-for old, new in replacements:
-    content = content.replace(old, new)
+    print("Dry run: no files written." if args.dry_run else "Theme applied successfully.")
 
-with open(file_path, "w", encoding="utf-8") as f:
-    f.write(content)
 
-print("Theme applied successfully.")
+if __name__ == "__main__":
+    main()
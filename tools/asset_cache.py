@@ -0,0 +1,155 @@
+"""
+手続き的に作るモブジェクトのメモ化
+==================================
+
+get_noise_grid(6, 6, seed=42) や get_token_box("今日") のように、同じ引数なら同じ形になる
+ヘルパーは、シーンをまたいで何度も同じモブジェクトを組み立て直している。
+@memoize_mobject を付けると、既定値を補った全引数 (seed を含む) をキーに最初の結果を
+プロトタイプとして保持し、2 回目以降はその deep copy を返す。
+
+  - キャッシュは全ヘルパーで共有する LRU で、点列の合計バイト数が上限を超えたら古いものから捨てる
+  - seed=None のように毎回結果が変わる呼び出しは cacheable で除外する
+  - rng=True のヘルパーは np.random の状態も保存し、キャッシュから返すときに
+    実際に組み立てた直後と同じ状態に戻す (後続の乱数列が変わらない)
+  - cache_stats() でヘルパーごとのヒット・ミス数を確認できる
+
+Usage (animation.py):
+  from asset_cache import memoize_mobject
+
+  @memoize_mobject(cacheable=lambda args: args["seed"] is not None, rng=True)
+  def get_noise_grid(rows, cols, cell_size=0.35, noise_level=1.0, seed=None):
+      ...
+"""
+
+import inspect
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+# キャッシュに保持するプロトタイプの点列の合計 (bytes)
+MAX_BYTES = 64 * 2**20
+
+
+def point_bytes(mobject):
+    """モブジェクトとその子孫の点列のバイト数"""
+    return sum(member.points.nbytes for member in mobject.get_family())
+
+
+class MobjectCache:
+    """点列のバイト数で上限を決める LRU"""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (prototype, nbytes, rng_state)
+        self.bytes = 0
+        self.counters = {}  # ヘルパー名 -> {"hits", "misses", "uncached"}
+        self.evictions = 0
+
+    def count(self, name, kind):
+        counter = self.counters.setdefault(name, {"hits": 0, "misses": 0, "uncached": 0})
+        counter[kind] += 1
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, prototype, rng_state=None):
+        nbytes = point_bytes(prototype)
+        if nbytes > self.max_bytes:
+            return
+        self.entries[key] = (prototype, nbytes, rng_state)
+        self.bytes += nbytes
+        while self.bytes > self.max_bytes:
+            _, (_, evicted, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        hits = sum(c["hits"] for c in self.counters.values())
+        misses = sum(c["misses"] for c in self.counters.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "by_function": {name: dict(c) for name, c in self.counters.items()},
+        }
+
+
+_cache = MobjectCache()
+
+
+def cache_stats():
+    """共有キャッシュのヒット・ミス数とサイズ"""
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _freeze(value):
+    """キーに使えるように dict / list を tuple にする (できなければ TypeError)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    hash(value)
+    return value
+
+
+def memoize_mobject(func=None, *, cacheable=None, rng=False, cache=None):
+    """同じ引数なら同じモブジェクトを返すヘルパーをメモ化するデコレーター
+
+    cacheable: 既定値を補った引数の dict を受け取り、キャッシュしてよいかを返す関数
+    rng: ヘルパーが np.random.seed() で乱数の状態を変える場合は True
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            target = cache or _cache
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if cacheable is not None and not cacheable(bound.arguments):
+                target.count(name, "uncached")
+                return func(*args, **kwargs)
+            try:
+                key = (name, _freeze(dict(bound.arguments)))
+            except TypeError:
+                target.count(name, "uncached")
+                return func(*args, **kwargs)
+
+            entry = target.lookup(key)
+            if entry is not None:
+                target.count(name, "hits")
+                prototype, _, rng_state = entry
+                if rng_state is not None:
+                    np.random.set_state(rng_state)
+                return prototype.copy()
+
+            target.count(name, "misses")
+            mobject = func(*args, **kwargs)
+            target.store(key, mobject.copy(), np.random.get_state() if rng else None)
+            return mobject
+
+        wrapper.cache_stats = lambda: (cache or _cache).counters.get(name, {"hits": 0, "misses": 0, "uncached": 0})
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
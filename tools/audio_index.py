@@ -0,0 +1,186 @@
+"""
+音声インデックス (audio_map.json)
+=================================
+
+generate_audio.py が合成直後のバイト列からメタデータを作り、
+各セリフのエントリに以下を記録する (WAV を開き直さない):
+
+  path         プロジェクトからの相対パス (例: media/audio/Scene01_000.wav)
+  size         ファイルサイズ (bytes)
+  samples      サンプル数
+  sample_rate  サンプリングレート
+  duration     再生時間 (秒)
+  loudness     RMS ラウドネス (dBFS)
+  sha1         内容ハッシュ
+
+animation.py 側は load_audio_map() で読み込み時に 1 回だけ検証し、
+"file" に絶対パスを解決済みのエントリだけを受け取る。
+レンダリング中 (construct 内) に個々の音声ファイルを stat する必要はない。
+
+Usage:
+  python tools/audio_index.py <project_name>   # 既存 WAV からインデックスを再構築
+"""
+
+import io
+import os
+import json
+import math
+import wave
+import hashlib
+import argparse
+import contextlib
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+
+AUDIO_SUBDIR = os.path.join("media", "audio")
+MAP_NAME = "audio_map.json"
+
+# 無音扱いのラウドネス下限
+SILENCE_DB = -96.0
+
+
+def describe_wav(data):
+    """WAV のバイト列からメタデータを作る"""
+    with contextlib.closing(wave.open(io.BytesIO(data), "rb")) as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        samples = f.getnframes()
+        frames = f.readframes(samples)
+
+    return {
+        "size": len(data),
+        "samples": samples,
+        "sample_rate": rate,
+        "duration": samples / float(rate),
+        "loudness": round(rms_dbfs(frames, width, channels), 2),
+        "sha1": hashlib.sha1(data).hexdigest(),
+    }
+
+
+def rms_dbfs(frames, width, channels):
+    """PCM フレーム列の RMS ラウドネス (dBFS)"""
+    if width != 2 or not frames:
+        return SILENCE_DB
+    pcm = np.frombuffer(frames[:len(frames) - len(frames) % 2], "<i2").astype(np.float64)
+    if not len(pcm):
+        return SILENCE_DB
+    mean_square = float(np.mean(pcm * pcm))
+    if mean_square <= 0:
+        return SILENCE_DB
+    return max(20 * math.log10(math.sqrt(mean_square) / 32768.0), SILENCE_DB)
+
+
+def map_path_for(project_dir):
+    return os.path.join(project_dir, AUDIO_SUBDIR, MAP_NAME)
+
+
+def relative_audio_path(filename):
+    """プロジェクト相対の音声パス (区切りは常に '/')"""
+    return "/".join(["media", "audio", filename])
+
+
+def save_audio_map(project_dir, audio_map):
+    """audio_map.json を一時ファイル経由で書き出す"""
+    map_path = map_path_for(project_dir)
+    tmp_path = map_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(audio_map, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, map_path)
+    return map_path
+
+
+def load_audio_map(project_dir):
+    """audio_map.json を読み込み、音声ディレクトリを 1 回だけ走査して検証する
+
+    戻り値はシーンキー -> エントリのリスト。各エントリの "file" には
+    実在が確認された絶対パスが入る。欠損・サイズ不一致のエントリは除外する。
+    """
+    map_path = map_path_for(project_dir)
+    if not os.path.exists(map_path):
+        return {}
+    try:
+        with open(map_path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except Exception as e:
+        print(f"Failed to load audio map: {e}")
+        return {}
+
+    audio_dir = os.path.join(project_dir, AUDIO_SUBDIR)
+    on_disk = {}
+    with os.scandir(audio_dir) as it:
+        for entry in it:
+            if entry.is_file():
+                on_disk[entry.name] = entry.stat().st_size
+
+    audio_map = {}
+    dropped = 0
+    for scene_key, entries in raw.items():
+        valid = []
+        for entry in entries:
+            # 旧形式 (絶対パスの "file" のみ) はファイル名で解決する
+            rel_path = entry.get("path") or relative_audio_path(
+                os.path.basename(entry.get("file", "").replace("\\", "/")))
+            name = rel_path.rsplit("/", 1)[-1]
+            size = on_disk.get(name)
+            if size is None or ("size" in entry and entry["size"] != size):
+                dropped += 1
+                continue
+            entry = dict(entry)
+            entry["path"] = rel_path
+            entry["file"] = os.path.join(audio_dir, name)
+            valid.append(entry)
+        audio_map[scene_key] = valid
+
+    if dropped:
+        print(f"Audio map: skipped {dropped} missing or stale entries in {map_path}")
+    return audio_map
+
+
+def rebuild_index(project_dir):
+    """既存の audio_map.json と WAV からインデックス項目を再計算する"""
+    map_path = map_path_for(project_dir)
+    with open(map_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    audio_dir = os.path.join(project_dir, AUDIO_SUBDIR)
+    rebuilt = {}
+    for scene_key, entries in raw.items():
+        rebuilt[scene_key] = []
+        for entry in entries:
+            rel_path = entry.get("path") or relative_audio_path(
+                os.path.basename(entry.get("file", "").replace("\\", "/")))
+            wav_path = os.path.join(audio_dir, rel_path.rsplit("/", 1)[-1])
+            if not os.path.exists(wav_path):
+                print(f"  Missing: {rel_path}")
+                continue
+            with open(wav_path, "rb") as f:
+                meta = describe_wav(f.read())
+            rebuilt[scene_key].append({
+                "index": entry.get("index", len(rebuilt[scene_key])),
+                "speaker": entry["speaker"],
+                "text": entry["text"],
+                "path": rel_path,
+                **meta,
+            })
+    return save_audio_map(project_dir, rebuilt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the audio index (audio_map.json) of a project")
+    parser.add_argument("project_name", help="Name of the project folder in 'projects/'")
+    args = parser.parse_args()
+
+    project_dir = os.path.join(PROJECTS_DIR, args.project_name)
+    if not os.path.exists(map_path_for(project_dir)):
+        print(f"Audio map not found: {map_path_for(project_dir)}")
+        return
+
+    print(f"Index rebuilt: {rebuild_index(project_dir)}")
+
+
+if __name__ == "__main__":
+    main()
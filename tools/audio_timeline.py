@@ -0,0 +1,230 @@
+"""
+字幕音声タイムライン
+====================
+
+show_subtitle から各セリフの開始時刻と音声ファイル (と字幕の表示区間) を記録し、
+シーン終了時にムービーの隣へ <SceneName>.timeline.json として書き出す。
+字幕の表示区間は subtitle_track.py が SRT / WebVTT / ASS に書き出す。
+render_parallel.py はそれを NumPy で 1 本の音声トラックにミックスし、
+ffmpeg 1 回で映像に mux する (manim の add_sound による音声合成・再エンコードを使わない)。
+
+Usage:
+  python tools/audio_timeline.py <video.mp4> <video.timeline.json> <output.mp4>
+"""
+
+import os
+import math
+import json
+import wave
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+import numpy as np
+
+# 出力音声トラックの設定
+SAMPLE_RATE = 48000
+CHANNELS = 2
+AUDIO_CODEC = ["-c:a", "aac", "-b:a", "192k"]
+
+
+class AudioTimeline:
+    """シーン内の音声配置 (フレーム境界に揃えた開始時刻 + ファイル) を記録する"""
+
+    def __init__(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.events = []
+        self.cues = []
+        self.duration = 0.0
+
+    @classmethod
+    def attach(cls, scene):
+        """シーンにタイムラインを取り付け、tear_down 時に書き出すようにする"""
+        timeline = getattr(scene, "audio_timeline", None)
+        if timeline is not None:
+            return timeline
+
+        timeline = cls(scene.camera.frame_rate)
+        scene.audio_timeline = timeline
+
+        original_tear_down = scene.tear_down
+
+        def tear_down():
+            original_tear_down()
+            timeline.duration = scene.renderer.time
+            path = sidecar_path(scene)
+            if path is not None:
+                timeline.save(path)
+
+        scene.tear_down = tear_down
+        return timeline
+
+    def frame_floor(self, t):
+        """時刻を直前のフレーム境界に丸める"""
+        return math.floor(t * self.frame_rate + 1e-6) / self.frame_rate
+
+    def frame_ceil(self, t):
+        """時刻を直後のフレーム境界に丸める"""
+        return math.ceil(t * self.frame_rate - 1e-6) / self.frame_rate
+
+    def add(self, scene, file_path):
+        """現在時刻に音声を配置し、その開始時刻を返す"""
+        start = self.frame_floor(scene.renderer.time)
+        self.events.append({"start": start, "file": os.path.abspath(file_path)})
+        return start
+
+    def add_cue(self, speaker, text, start, end, color=None, line_id=None):
+        """字幕の表示区間を記録する (color は話者名の色 "#RRGGBB")
+
+        line_id は台本のセリフ ID (audio_map のエントリの "id")。字幕ファイルを書き出し直すときに
+        台本の今の本文を引くのに使う。
+        """
+        cue = {
+            "start": start,
+            "end": end,
+            "speaker": speaker,
+            "text": text,
+            "color": str(color) if color is not None else None,
+        }
+        if line_id is not None:
+            cue["id"] = line_id
+        self.cues.append(cue)
+
+    def hold_time(self, scene, end):
+        """end 以降の最初のフレーム境界まで待つのに必要な秒数"""
+        return max(self.frame_ceil(end) - scene.renderer.time, 0.0)
+
+    def to_dict(self):
+        return {
+            "frame_rate": self.frame_rate,
+            "duration": self.duration,
+            "events": self.events,
+            "cues": self.cues,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+
+def sidecar_path(scene):
+    """シーンのムービーファイルに対応するタイムライン JSON のパス (ムービーを書かない場合は None)"""
+    movie_path = getattr(scene.renderer.file_writer, "movie_file_path", None)
+    if not movie_path:
+        return None
+    return timeline_path_for(str(movie_path))
+
+
+def timeline_path_for(video_path):
+    """動画パスからタイムライン JSON のパスを得る"""
+    return os.path.splitext(video_path)[0] + ".timeline.json"
+
+
+def read_wav(path):
+    """WAV を float32 の (samples, CHANNELS) 配列として読み、SAMPLE_RATE に揃える"""
+    with contextlib.closing(wave.open(str(path), "rb")) as f:
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        rate = f.getframerate()
+        raw = f.readframes(f.getnframes())
+
+    if width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"Unsupported sample width ({width} bytes): {path}")
+
+    data = data.reshape(-1, channels)
+    if channels == 1:
+        data = np.repeat(data, CHANNELS, axis=1)
+    elif channels > CHANNELS:
+        data = data[:, :CHANNELS]
+
+    if rate != SAMPLE_RATE and len(data) > 0:
+        n_out = int(round(len(data) * SAMPLE_RATE / rate))
+        src = np.arange(len(data)) / rate
+        dst = np.arange(n_out) / SAMPLE_RATE
+        data = np.stack(
+            [np.interp(dst, src, data[:, c]) for c in range(CHANNELS)], axis=1
+        ).astype(np.float32)
+
+    return data
+
+
+def build_track(timeline):
+    """タイムライン (dict) から全体の音声トラックを 1 回でミックスする"""
+    length = int(math.ceil(timeline["duration"] * SAMPLE_RATE))
+    track = np.zeros((length, CHANNELS), dtype=np.float32)
+
+    decoded = {}
+    for event in timeline["events"]:
+        path = event["file"]
+        if path not in decoded:
+            decoded[path] = read_wav(path)
+        clip = decoded[path]
+
+        offset = int(round(event["start"] * SAMPLE_RATE))
+        if offset >= length:
+            continue
+        end = min(length, offset + len(clip))
+        track[offset:end] += clip[:end - offset]
+
+    np.clip(track, -1.0, 1.0, out=track)
+    return track
+
+
+def write_wav(path, track):
+    """float32 トラックを 16bit PCM の WAV として保存"""
+    pcm = (track * 32767.0).astype("<i2")
+    with contextlib.closing(wave.open(str(path), "wb")) as f:
+        f.setnchannels(CHANNELS)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+
+
+def load_timeline(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mux(video_path, timeline_path, output_path):
+    """タイムラインの音声を 1 本にミックスし、映像はコピーのまま 1 パスで mux する"""
+    timeline = load_timeline(timeline_path)
+    if not timeline["events"]:
+        return False
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        track_path = os.path.join(tmp_dir, "track.wav")
+        write_wav(track_path, build_track(timeline))
+
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", video_path, "-i", track_path,
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", *AUDIO_CODEC,
+            output_path,
+        ]
+        subprocess.run(cmd, check=True)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mix a scene audio timeline and mux it into the video")
+    parser.add_argument("video", help="Rendered scene video (no audio)")
+    parser.add_argument("timeline", help="<SceneName>.timeline.json written during render")
+    parser.add_argument("output", help="Output video path")
+    args = parser.parse_args()
+
+    if mux(args.video, args.timeline, args.output):
+        print(f"Muxed audio into {args.output}")
+    else:
+        print("Timeline has no audio events; nothing to mux.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+台本と animation.py の字幕のずれチェッカー
+==========================================
+
+script.md のセリフと animation.py にハードコードされた show_subtitle(...) /
+get_subtitle(...) の文字列をシーンごとに突き合わせ、以下を報告する。
+
+  MISSING  台本にあるがアニメーションにないセリフ
+  EXTRA    アニメーションにあるが台本にないセリフ
+  LOW      対応はついたが類似度が低いセリフ (音声のファジーマッチが外れやすい)
+
+manim は import せず ast で静的に解析するので、projects/ 全体でも一瞬で終わる。
+想定尺は audio_map.json の duration (なければ duration= 引数か既定 3.0 秒)。
+
+Usage:
+  python tools/check_script.py                  # 全プロジェクト
+  python tools/check_script.py api_basics_yt -v # 一致したセリフも表示
+"""
+
+import os
+import re
+import ast
+import sys
+import json
+import time
+import difflib
+import argparse
+
+from script_ir import parse_lines, clean_text
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+
+# 字幕を出すヘルパー関数名
+SUBTITLE_FUNCS = {"show_subtitle", "get_subtitle"}
+SCENE_KEY_PATTERN = re.compile(r'^Scene0*(\d+)')
+
+# これ未満の類似度は対応づけない (show_subtitle のしきい値と同じ)
+MATCH_THRESHOLD = 0.4
+# 対応づいてもこれ未満なら LOW として報告
+LOW_SIMILARITY = 0.9
+DEFAULT_DURATION = 3.0
+
+
+def scene_key_for_class(class_name):
+    """Scene クラス名からキーを得る (Scene01_Intro -> Scene01)。対象外なら None"""
+    match = SCENE_KEY_PATTERN.match(class_name)
+    if not match:
+        return None
+    return f"Scene{int(match.group(1)):02d}"
+
+
+def literal_str(node):
+    """文字列リテラル (暗黙の連結を含む) なら値を返す"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def extract_subtitles(source):
+    """animation.py から シーンキー -> 字幕リスト を抽出する"""
+    tree = ast.parse(source)
+    scenes = {}
+
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        key = scene_key_for_class(node.name)
+        if key is None:
+            continue
+
+        calls = [n for n in ast.walk(node) if isinstance(n, ast.Call)
+                 and isinstance(n.func, ast.Name) and n.func.id in SUBTITLE_FUNCS]
+        calls.sort(key=lambda n: (n.lineno, n.col_offset))
+
+        subtitles = scenes.setdefault(key, [])
+        for call in calls:
+            # scene 引数の有無によらず、先頭 2 つの文字列リテラルを話者・本文とみなす
+            strings = [s for s in map(literal_str, call.args) if s is not None]
+            if len(strings) < 2:
+                continue
+            duration = None
+            for kw in call.keywords:
+                if kw.arg == "duration" and isinstance(kw.value, ast.Constant):
+                    duration = kw.value.value
+            subtitles.append({
+                "speaker": strings[0],
+                "text": clean_text(strings[1]),
+                "lineno": call.lineno,
+                "duration": duration,
+                "class": node.name,
+            })
+
+    return scenes
+
+
+def align(expected, actual):
+    """類似度の合計が最大になるように 2 つのセリフ列を順序を保って対応づける"""
+    n, m = len(expected), len(actual)
+    ratios = [[difflib.SequenceMatcher(None, e["text"], a["text"]).ratio() for a in actual]
+              for e in expected]
+    score = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        for j in range(m - 1, -1, -1):
+            best = max(score[i + 1][j], score[i][j + 1])
+            if ratios[i][j] >= MATCH_THRESHOLD:
+                best = max(best, score[i + 1][j + 1] + ratios[i][j])
+            score[i][j] = best
+
+    pairs = []
+    i = j = 0
+    while i < n and j < m:
+        if ratios[i][j] >= MATCH_THRESHOLD and score[i][j] == score[i + 1][j + 1] + ratios[i][j]:
+            pairs.append((i, j, ratios[i][j]))
+            i += 1
+            j += 1
+        elif score[i][j] == score[i + 1][j]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+
+def load_durations(project_dir):
+    """audio_map.json から シーンキー -> {本文: 秒} を作る (存在確認はしない)"""
+    map_path = os.path.join(project_dir, "media", "audio", "audio_map.json")
+    if not os.path.exists(map_path):
+        return {}
+    with open(map_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {key: {e["text"]: e["duration"] for e in entries} for key, entries in data.items()}
+
+
+def check_project(project_dir):
+    """1 プロジェクト分の問題のリストを返す"""
+    script_path = os.path.join(project_dir, "script.md")
+    anim_path = os.path.join(project_dir, "animation.py")
+    if not (os.path.exists(script_path) and os.path.exists(anim_path)):
+        return None
+
+    with open(script_path, "r", encoding="utf-8") as f:
+        script_scenes = {s["key"]: s["lines"] for s in parse_lines(f.read())}
+    with open(anim_path, "r", encoding="utf-8-sig") as f:
+        anim_scenes = extract_subtitles(f.read())
+    durations = load_durations(project_dir)
+
+    issues = []
+    for key in sorted(set(script_scenes) | set(anim_scenes)):
+        expected = script_scenes.get(key, [])
+        actual = anim_scenes.get(key, [])
+        scene_durations = durations.get(key, {})
+
+        def expected_duration(line):
+            return scene_durations.get(line["text"], DEFAULT_DURATION)
+
+        pairs = align(expected, actual)
+        matched_e = {i for i, _, _ in pairs}
+        matched_a = {j for _, j, _ in pairs}
+
+        for i, line in enumerate(expected):
+            if i not in matched_e:
+                issues.append((key, "MISSING", line["speaker"], line["text"],
+                               expected_duration(line), f"script.md:{line['source_line']}"))
+        for j, sub in enumerate(actual):
+            if j not in matched_a:
+                issues.append((key, "EXTRA", sub["speaker"], sub["text"],
+                               sub["duration"] or DEFAULT_DURATION, f"animation.py:{sub['lineno']}"))
+        for i, j, ratio in pairs:
+            kind = "LOW" if ratio < LOW_SIMILARITY else "OK"
+            issues.append((key, kind, actual[j]["speaker"], actual[j]["text"],
+                           expected_duration(expected[i]), f"animation.py:{actual[j]['lineno']} ({ratio:.2f})"))
+
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check script.md against the subtitles hard-coded in animation.py")
+    parser.add_argument("projects", nargs="*", help="Project names (default: all in 'projects/')")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Also list lines that match")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    names = args.projects or sorted(os.listdir(PROJECTS_DIR))
+    total_problems = 0
+
+    for name in names:
+        issues = check_project(os.path.join(PROJECTS_DIR, name))
+        if issues is None:
+            continue
+        problems = [i for i in issues if i[1] != "OK"]
+        total_problems += len(problems)
+        print(f"{name}: {len(issues) - sum(1 for i in issues if i[1] == 'EXTRA')} script lines, {len(problems)} issues")
+        for key, kind, speaker, text, duration, where in issues:
+            if kind == "OK" and not args.verbose:
+                continue
+            print(f"  {key} {kind:<7} {duration:5.1f}s  {speaker}: {text[:30]}  [{where}]")
+
+    print(f"Checked in {(time.time() - start_time) * 1000:.0f}ms")
+    if total_problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
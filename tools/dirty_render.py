@@ -0,0 +1,181 @@
+"""
+差分矩形レンダリング (dirty-rectangle mode)
+==========================================
+
+layered mode (layered_render.py) の拡張。字幕の FadeIn(sub, shift=UP*0.2) や
+SurroundingRectangle・GrowArrow のように、画面の一部しか変わらないアニメーションでは
+毎フレーム全体を描き直さず、前のフレームのうち変わった矩形だけを描き直す。
+
+  矩形      動くモブジェクトの点列を囲む矩形を、前のフレームと今のフレームで合わせたもの
+            (線幅の分だけ広げる)。前の位置を消し、今の位置に描くのに必要な範囲になる
+  描き直し  矩形の中を背景で塗り直し、矩形に掛かるモブジェクト・レイヤーだけを
+            Cairo のクリップ付きで描画順に描く。矩形の外は前のフレームのまま
+  全体描画  矩形がフレームの DIRTY_THRESHOLD を超えたとき、play() の最初のフレーム、
+            カメラのフレームが動いたとき、矩形に画像などの VMobject 以外が掛かるとき
+            (画像は Cairo のクリップが効かない) は layered mode と同じく全体を描く
+
+差分で描いたフレーム数と矩形の面積の割合は、layered mode の計測結果
+(media/logs/<SceneName>.layers.json) に追加で記録する。
+
+有効にするには環境変数 VIBE_RENDER_MODE=dirty を付けて tools/render_scene.py から起動する
+(render_parallel.py --render-mode dirty)。
+"""
+
+import math
+
+import numpy as np
+from manim import VMobject
+
+from layered_render import LayeredRenderer
+
+# 矩形の面積がフレームのこの割合を超えたら全体を描き直す
+DIRTY_THRESHOLD = 0.35
+# アンチエイリアスの分の余白 (px)
+AA_MARGIN = 2
+
+
+def pixel_rect(camera, mobjects):
+    """モブジェクトの点列を囲むピクセル矩形 (x0, y0, x1, y1)。点がなければ None
+
+    線は太さの 2 倍まで広げる (角の留め継ぎが線幅より外に出る分を含める)。
+    """
+    boxes = [(m.points.min(axis=0), m.points.max(axis=0)) for m in mobjects if len(m.points)]
+    if not boxes:
+        return None
+    low = np.min([b[0] for b in boxes], axis=0)
+    high = np.max([b[1] for b in boxes], axis=0)
+    stroke = 0.0
+    for m in mobjects:
+        for attr in ("stroke_width", "background_stroke_width"):
+            value = m.__dict__.get(attr)
+            if value is not None and np.size(value):
+                stroke = max(stroke, float(np.max(value)))
+
+    pw, ph = camera.pixel_width, camera.pixel_height
+    sx, sy = pw / camera.frame_width, ph / camera.frame_height
+    center = camera.frame_center
+    margin = stroke * camera.cairo_line_width_multiple * sx * 2 + AA_MARGIN
+    x0 = math.floor((low[0] - center[0]) * sx + pw / 2 - margin)
+    x1 = math.ceil((high[0] - center[0]) * sx + pw / 2 + margin)
+    y0 = math.floor((center[1] - high[1]) * sy + ph / 2 - margin)
+    y1 = math.ceil((center[1] - low[1]) * sy + ph / 2 + margin)
+    x0, x1 = max(0, x0), min(pw, x1)
+    y0, y1 = max(0, y0), min(ph, y1)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1, y1)
+
+
+def union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def intersects(a, b):
+    return a is not None and b is not None and a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class DirtyRectRenderer(LayeredRenderer):
+    """layered mode に加えて、変わった矩形だけを描き直す"""
+
+    def make_plan(self, scene):
+        plan = super().make_plan(scene)
+        camera = scene.renderer.camera
+        # 静止したものの矩形は play() の間変わらない
+        plan.rects = {}
+        for kind, mobjects, layer in plan.runs:
+            if kind == "moving":
+                continue
+            if kind == "layer":
+                plan.rects[id(layer)] = pixel_rect(camera, mobjects)
+            else:
+                for mob in mobjects:
+                    plan.rects[id(mob)] = pixel_rect(camera, [mob])
+        plan.moving = [mob for kind, mobjects, _ in plan.runs if kind == "moving" for mob in mobjects]
+        plan.frame = self.frame_key(camera)
+        self.previous_rect = None
+        return plan
+
+    def start_record(self, plan, setup_time=0.0):
+        super().start_record(plan, setup_time)
+        self.records[-1].update({"dirty_frames": 0, "full_frames": 0, "dirty_area": 0.0})
+
+    @staticmethod
+    def frame_key(camera):
+        return (camera.frame_width, camera.frame_height, tuple(np.asarray(camera.frame_center, dtype=float).tolist()))
+
+    def draw_frame(self, camera, full=True):
+        plan = self.plan
+        record = self.records[-1]
+        current = pixel_rect(camera, plan.moving)
+        rect = union(self.previous_rect, current)
+        first = record["dirty_frames"] + record["full_frames"] == 0
+        area = 0.0 if rect is None else (rect[2] - rect[0]) * (rect[3] - rect[1]) / (camera.pixel_width * camera.pixel_height)
+
+        if full or first or area > DIRTY_THRESHOLD or self.frame_key(camera) != plan.frame \
+                or not self.draw_region(camera, rect):
+            super().draw_frame(camera)
+            record["full_frames"] += 1
+        else:
+            record["dirty_frames"] += 1
+            record["dirty_area"] += area
+        self.previous_rect = current
+
+    def draw_region(self, camera, rect):
+        """rect の中だけを描き直す。画像などが掛かってクリップで描けないときは False"""
+        plan = self.plan
+        if rect is None:
+            # 動くものが何も描かれていない (前のフレームのまま)
+            return True
+
+        items = []
+        for kind, mobjects, layer in plan.runs:
+            if kind == "layer":
+                if intersects(plan.rects[id(layer)], rect):
+                    items.append(("layer", layer))
+                continue
+            if kind == "moving":
+                visible = [m for m in mobjects if intersects(pixel_rect(camera, [m]), rect)]
+            else:
+                visible = [m for m in mobjects if intersects(plan.rects[id(m)], rect)]
+            if any(not isinstance(m, VMobject) or m.get_background_image() for m in visible):
+                return False
+            if visible:
+                items.append(("draw", visible))
+
+        x0, y0, x1, y1 = rect
+        camera.pixel_array[y0:y1, x0:x1] = plan.background[y0:y1, x0:x1]
+        ctx = camera.get_cairo_context(camera.pixel_array)
+        ctx.save()
+        matrix = ctx.get_matrix()
+        ctx.identity_matrix()
+        ctx.rectangle(x0, y0, x1 - x0, y1 - y0)
+        ctx.clip()
+        ctx.set_matrix(matrix)
+        try:
+            for kind, item in items:
+                if kind == "layer":
+                    item.composite(camera)
+                else:
+                    camera.capture_mobjects(item, include_submobjects=False)
+        finally:
+            ctx.restore()
+        return True
+
+    def summary(self):
+        result = super().summary()
+        dirty = sum(r.get("dirty_frames", 0) for r in self.records)
+        full = sum(r.get("full_frames", 0) for r in self.records)
+        area = sum(r.get("dirty_area", 0.0) for r in self.records)
+        for record in self.records:
+            if record.get("dirty_frames"):
+                record["dirty_area"] = round(record["dirty_area"] / record["dirty_frames"], 4)
+        result.update({
+            "dirty_frames": dirty,
+            "full_frames": full,
+            "mean_dirty_area": round(area / dirty, 4) if dirty else None,
+        })
+        return result
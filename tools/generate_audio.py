@@ -1,15 +1,18 @@
 import os
-import re
 import json
 import argparse
 import requests
-import wave
-import contextlib
 from pathlib import Path
 
+from audio_index import describe_wav, relative_audio_path, map_path_for, save_audio_map
+from script_ir import parse_script_ir, update_project_ir, save_ir, with_audio_only, print_changes
+
 # Voicevox API設定
 BASE_URL = "http://127.0.0.1:50021"
 
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROJECTS_DIR = BASE_DIR / "projects"
+
 # Voicevox Speaker IDs
 # ずんだもん: 3 (ノーマル), 1 (あまあま)
 # 四国めたん: 2 (ノーマル), 0 (あまあま)
@@ -22,22 +25,15 @@ speaker_ids = {
     "春日部つむぎ": 8
 }
 
-def get_wav_duration(path):
-    """WAVファイルの再生時間を取得"""
-    with contextlib.closing(wave.open(str(path), 'r')) as f:
-        frames = f.getnframes()
-        rate = f.getframerate()
-        return frames / float(rate)
-
 def generate_wav(text, speaker_id, output_path):
-    """Voicevox APIを叩いてWAVを生成"""
+    """Voicevox APIを叩いてWAVを生成し、書き込んだバイト列を返す (失敗時は None)"""
     try:
         # 1. Audio Query
         params = {'text': text, 'speaker': speaker_id}
         response = requests.post(f"{BASE_URL}/audio_query", params=params)
         if response.status_code != 200:
             print(f"Error in audio_query: {response.text}")
-            return False
+            return None
         query_data = response.json()
         
         # 速度調整 (1.2倍)
@@ -51,73 +47,94 @@ def generate_wav(text, speaker_id, output_path):
         )
         if res2.status_code != 200:
             print(f"Error (Synthesis): {res2.text}")
-            return False
+            return None
 
         # Save
         with open(output_path, "wb") as f:
             f.write(res2.content)
-        return True
+        return res2.content
 
     except Exception as e:
         print(f"Exception connecting to Voicevox: {e}")
-        return False
-
-def parse_script(script_path):
-    """Markdown台本をパースしてシーンごとのセリフリストを返す"""
-    with open(script_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # シーン分割 (例: ### Scene 01: ...)
-    # 行頭の ### Scene ... で分割する
-    scene_pattern = re.compile(r'^#+\s*(Scene\s*\w+).*$', re.MULTILINE)
+        return None
+
+def parse_script(script_path, previous_ir=None):
+    """Markdown台本をパースしてシーンごとのセリフリストを返す
+
+    各セリフは {"id", "speaker", "text"}。ID は script_ir で前回の IR から引き継がれる。
+    """
+    ir = parse_script_ir(script_path, previous_ir)
+    return scenes_from_ir(ir)
+
+def scenes_from_ir(ir):
+    """IR をシーンキー -> セリフリストの dict に変換"""
+    return {
+        scene["key"]: [
+            {"id": line["id"], "speaker": line["speaker"], "text": line["text"]}
+            for line in scene["lines"]
+        ]
+        for scene in ir["scenes"]
+    }
+
+def synthesize_scene(scene_name, dialogues, audio_dir, previous_entries=None):
+    """1シーン分のセリフを合成し、audio_map 用のエントリリストを返す
+
+    previous_entries (前回の audio_map のエントリ) に同じ ID・話者・本文の音声があれば
+    合成せずに再利用する。並び替えだけのセリフも再合成しない。
+    """
+    print(f"Processing {scene_name}...")
+    entries = []
+    reusable = {e["id"]: e for e in (previous_entries or []) if "id" in e}
     
-    # セリフ抽出 (例: - **ずんだもん**: こんにちは)
-    # **Name**: Text
-    dialogue_pattern = re.compile(r'^\s*-\s*\*\*(.*?)\*\*\s*[:：]\s*(.*)$', re.MULTILINE)
-
-    scenes = {}
-    current_scene = "General"
-    
-    # 簡易的に行ごとに処理
-    lines = content.split('\n')
-    
-    for line in lines:
-        # Scene判定
-        scene_match = scene_pattern.match(line)
-        if scene_match:
-            # "Scene 01" のような正規化されたキーを作る
-            raw_scene_name = scene_match.group(1) # "Scene 01"
-            # 空白除去して "Scene01" にする
-            current_scene = raw_scene_name.replace(" ", "")
-            scenes[current_scene] = []
+    for i, diag in enumerate(dialogues):
+        speaker = diag["speaker"]
+        text = diag["text"]
+        
+        # ファイル名: セリフIDから (例: Scene01-3fa2b1c0.wav)。並び替えても変わらない
+        filename = f"{diag['id']}.wav"
+        filepath = Path(audio_dir) / filename
+        
+        old = reusable.get(diag["id"])
+        if old and old["speaker"] == speaker and old["text"] == text and filepath.exists():
+            entries.append({**old, "index": i})
+            continue
+        
+        # ID決定
+        sid = speaker_ids.get(speaker, 3) # デフォルトずんだもん
+        
+        # 生成 (追加・編集されたセリフのみ)
+        print(f"  Generating: {speaker}: {text[:10]}...")
+        data = generate_wav(text, sid, filepath)
+        if data is None:
+            print("  Failed to generate audio.")
             continue
-            
-        # Dialogue判定
-        diag_match = dialogue_pattern.match(line)
-        if diag_match:
-            speaker = diag_match.group(1)
-            text = diag_match.group(2)
-            
-            # カッコ書き（笑）などを除去
-            text = re.sub(r'（.*?）', '', text)
-            text = re.sub(r'\(.*?\)', '', text)
-            
-            if current_scene not in scenes:
-                scenes[current_scene] = []
-            
-            scenes[current_scene].append({
-                "speaker": speaker,
-                "text": text
-            })
-
-    return scenes
+        
+        # メタデータは合成結果のバイト列から作る (WAVを開き直さない)
+        entries.append({
+            "index": i,
+            "id": diag["id"],
+            "speaker": speaker,
+            "text": text,
+            "path": relative_audio_path(filename), # プロジェクトからの相対パス
+            **describe_wav(data),
+        })
+    
+    return entries
+
+def load_previous_audio_map(project_dir):
+    """前回の audio_map.json (再利用判定用の生データ)"""
+    map_path = map_path_for(project_dir)
+    if not os.path.exists(map_path):
+        return {}
+    with open(map_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("project_name", help="Name of the project")
     args = parser.parse_args()
 
-    project_dir = Path("d:/Program Projects/python/manim/projects") / args.project_name
+    project_dir = PROJECTS_DIR / args.project_name
     script_path = project_dir / "script.md"
     audio_dir = project_dir / "media" / "audio"
     
@@ -125,52 +142,26 @@ def main():
         print(f"Script not found: {script_path}")
         return
 
-    # 台本パース
+    # 台本パース (前回の IR と比較し、変わったセリフだけを合成する)
     print(f"Parsing script: {script_path}")
-    scenes_data = parse_script(script_path)
+    ir, changes = update_project_ir(project_dir, save=False)
+    print_changes(changes)
+    scenes_data = scenes_from_ir(ir)
     
     audio_dir.mkdir(parents=True, exist_ok=True)
     
     # 音声生成
+    previous_map = load_previous_audio_map(project_dir)
     audio_map = {}
     
     for scene_name, dialogues in scenes_data.items():
-        print(f"Processing {scene_name}...")
-        audio_map[scene_name] = []
-        
-        for i, diag in enumerate(dialogues):
-            speaker = diag["speaker"]
-            text = diag["text"]
-            
-            # ID決定
-            sid = speaker_ids.get(speaker, 3) # デフォルトずんだもん
-            
-            # ファイル名: Scene01_001.wav
-            filename = f"{scene_name}_{i:03d}.wav"
-            filepath = audio_dir / filename
-            
-            # 生成 (ファイルがあればスキップするか？今は上書き)
-            if not filepath.exists() or True: 
-                print(f"  Generating: {speaker}: {text[:10]}...")
-                success = generate_wav(text, sid, filepath)
-                if not success:
-                    print("  Failed to generate audio.")
-                    continue
-            
-            duration = get_wav_duration(filepath)
-            
-            audio_map[scene_name].append({
-                "index": i,
-                "speaker": speaker,
-                "text": text,
-                "file": str(filepath.absolute()), # Manimには絶対パスを渡すのが無難
-                "duration": duration
-            })
+        audio_map[scene_name] = synthesize_scene(
+            scene_name, dialogues, audio_dir, previous_map.get(scene_name))
 
     # マップ保存
-    map_path = audio_dir / "audio_map.json"
-    with open(map_path, 'w', encoding='utf-8') as f:
-        json.dump(audio_map, f, indent=2, ensure_ascii=False)
+    map_path = save_audio_map(project_dir, audio_map)
+    # IR は音声ができたセリフだけ保存する (合成に失敗したセリフは次回も差分として扱う)
+    save_ir(project_dir, with_audio_only(ir, audio_map))
     
     print(f"Done! Audio map saved to {map_path}")
 
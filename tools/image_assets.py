@@ -0,0 +1,247 @@
+"""
+画像アセットのパイプライン
+==========================
+
+media/images/ の PNG / JPG を、レンダリング解像度で実際に必要な画素数まで縮小してから
+ImageMobject にする。ImageMobject(path).scale(s) は毎回フル解像度の画像をデコードし、
+毎フレームその全画素を画面サイズにリサンプリングしている (-qm ではほとんどが捨てられる)。
+
+  縮小    表示サイズ (元画像の高さ / 1080 * scale) × 出力の縦の画素数 だけの行数にする
+          (元画像より大きくはしない)。画面上の位置・大きさは元の ImageMobject と同じ
+  キャッシュ  縮小済みの RGBA 配列を media/images/.cache/<name>.<rows>.npy に保存し、
+              メモリ上にも保持する。元画像が更新されたら作り直す
+  共有    .npy は読み取り専用でメモリマップするので、同じ画像の ImageMobject 同士や
+          並列レンダリングのプロセス同士で同じバッファを共有する。set_opacity() など
+          画素を書き換える操作のときだけ、そのモブジェクト用にコピーする
+
+あとから .animate.scale(2) などで拡大する画像は max_scale でその分の余裕を持たせる。
+
+Usage (animation.py):
+  from image_assets import load_image
+
+  img = load_image(path, scale=1.5)
+
+Usage (プリセットごとの縮小版を先に作っておく):
+  python tools/image_assets.py api_basics_yt                 # 全プリセット
+  python tools/image_assets.py api_basics_yt -q preview final
+"""
+
+import os
+import sys
+import ast
+import math
+import copy
+import argparse
+
+import numpy as np
+from PIL import Image
+
+# ImageMobject が画素等倍で表示される縦の解像度 (manim の scale_to_resolution の既定値)
+SOURCE_RESOLUTION = 1080
+# 縮小版を置くディレクトリ (media/images/ の下)
+CACHE_DIRNAME = ".cache"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# (path, mtime, size) -> 元画像の (幅, 高さ)
+_sizes = {}
+# 縮小版の .npy のパス -> 読み取り専用の配列
+_pixels = {}
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def source_size(path):
+    """元画像の (幅, 高さ)。ヘッダーだけ読んでデコードはしない"""
+    key = _source_key(path)
+    if key not in _sizes:
+        with Image.open(path) as image:
+            _sizes[key] = image.size
+    return _sizes[key]
+
+
+def target_rows(source_rows, scale=1.0, pixel_height=SOURCE_RESOLUTION, max_scale=1.0):
+    """出力解像度 pixel_height で必要な縦の画素数 (元画像の行数が上限)
+
+    ImageMobject の高さは source_rows / 1080 * frame_height * scale なので、
+    画面上の画素数は frame_height によらず source_rows * scale * pixel_height / 1080 になる。
+    """
+    rows = math.ceil(source_rows * abs(scale) * max_scale * pixel_height / SOURCE_RESOLUTION)
+    return max(1, min(source_rows, rows))
+
+
+def cache_path_for(path, rows):
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIRNAME, f"{filename}.{rows}.npy")
+
+
+def _build(path, rows, cache_path):
+    """元画像をデコードし、rows 行に縮小した RGBA 配列を .npy に書き出す"""
+    with Image.open(path) as image:
+        image = image.convert("RGBA")
+        width, height = image.size
+        if rows < height:
+            columns = max(1, round(width * rows / height))
+            image = image.resize((columns, rows), Image.Resampling.LANCZOS)
+        pixels = np.asarray(image, dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # 並列レンダリングの複数プロセスが同時に作っても一時ファイルがぶつからないようにする
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, pixels)
+    os.replace(tmp_path, cache_path)
+
+
+def load_pixels(path, rows):
+    """rows 行に縮小した読み取り専用の RGBA 配列 (メモリ → ディスク → 作成 の順に探す)"""
+    cache_path = cache_path_for(path, rows)
+    source_mtime = os.stat(path).st_mtime_ns
+    pixels = _pixels.get(cache_path)
+    if pixels is not None and getattr(pixels, "_vibe_source_mtime", None) == source_mtime:
+        return pixels
+
+    if not os.path.exists(cache_path) or os.stat(cache_path).st_mtime_ns < source_mtime:
+        _build(path, rows, cache_path)
+    pixels = np.load(cache_path, mmap_mode="r")
+    pixels._vibe_source_mtime = source_mtime
+    _pixels[cache_path] = pixels
+    return pixels
+
+
+_image_class = None
+
+
+def shared_image_class():
+    """SharedImageMobject クラス (manim は使うときだけ import する。CLI は manim なしで動く)"""
+    global _image_class
+    if _image_class is not None:
+        return _image_class
+
+    from manim import ImageMobject
+    from manim.mobject.types.image_mobject import AbstractImageMobject
+
+    class SharedImageMobject(ImageMobject):
+        """読み取り専用の画素配列をコピーせずに持つ ImageMobject"""
+
+        def __init__(self, pixels, scale_to_resolution=SOURCE_RESOLUTION, **kwargs):
+            # ImageMobject.__init__ は配列をコピーするので通さない
+            self.fill_opacity = 1
+            self.stroke_opacity = 1
+            self.invert_image = False
+            self.image_mode = "RGBA"
+            self.pixel_array = pixels
+            self.pixel_array_dtype = "uint8"
+            AbstractImageMobject.__init__(self, scale_to_resolution, **kwargs)
+
+        def _own_pixels(self):
+            """画素を書き換える前に、共有している配列を自分用にコピーする"""
+            if not self.pixel_array.flags.writeable:
+                self.pixel_array = np.array(self.pixel_array)
+
+        def set_color(self, color, alpha=None, family=True):
+            self._own_pixels()
+            return super().set_color(color, alpha, family)
+
+        def set_opacity(self, alpha):
+            self._own_pixels()
+            return super().set_opacity(alpha)
+
+        def __deepcopy__(self, clone_from_id):
+            # copy() でも共有の配列はそのまま使う
+            cls = self.__class__
+            result = cls.__new__(cls)
+            clone_from_id[id(self)] = result
+            for k, v in self.__dict__.items():
+                shared = k == "pixel_array" and isinstance(v, np.ndarray) and not v.flags.writeable
+                setattr(result, k, v if shared else copy.deepcopy(v, clone_from_id))
+            result.original_id = str(id(self))
+            return result
+
+    _image_class = SharedImageMobject
+    return _image_class
+
+
+def load_image(path, scale=1.0, max_scale=1.0, pixel_height=None):
+    """ImageMobject(path).scale(scale) と同じ位置・大きさの、縮小済み画像のモブジェクト
+
+    pixel_height を省略すると manim の現在の出力解像度 (config.pixel_height) に合わせる。
+    """
+    if pixel_height is None:
+        from manim import config
+        pixel_height = config.pixel_height
+    cls = shared_image_class()
+
+    width, height = source_size(path)
+    rows = target_rows(height, scale, pixel_height, max_scale)
+    pixels = load_pixels(path, rows)
+    # 縮小した分だけ scale_to_resolution を下げ、元画像と同じ高さで表示する
+    image = cls(pixels, scale_to_resolution=SOURCE_RESOLUTION * pixels.shape[0] / height)
+    image.path = os.path.abspath(path)
+    return image.scale(scale)
+
+
+def find_image_calls(source):
+    """animation.py から get_image("name.png", scale=...) の画像名と scale を集める (リテラルのみ)"""
+    calls = set()
+    for node in ast.walk(ast.parse(source)):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "get_image"):
+            continue
+        if not node.args or not isinstance(node.args[0], ast.Constant) or not isinstance(node.args[0].value, str):
+            continue
+        scale = 1.0
+        scale_node = node.args[1] if len(node.args) > 1 else next(
+            (kw.value for kw in node.keywords if kw.arg == "scale"), None)
+        if isinstance(scale_node, ast.Constant) and isinstance(scale_node.value, (int, float)):
+            scale = float(scale_node.value)
+        calls.add((node.args[0].value, scale))
+    return sorted(calls)
+
+
+def resolve_image(image_dir, name):
+    """get_image と同じく、拡張子がなければ .png を補う"""
+    if not name.lower().endswith(IMAGE_EXTENSIONS):
+        name += ".png"
+    return os.path.join(image_dir, name)
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from render_presets import load_presets, get_preset
+
+    parser = argparse.ArgumentParser(description="Pre-scale media/images/ for each render preset")
+    parser.add_argument("project_name", help="Name of the project directory in projects/")
+    parser.add_argument("-q", "--quality", nargs="+", default=None,
+                        help="Presets to build for (default: all presets in render_presets.json)")
+    args = parser.parse_args()
+
+    project_dir = os.path.join("projects", args.project_name)
+    image_dir = os.path.join(project_dir, "media", "images")
+    file_path = os.path.join(project_dir, "animation.py")
+    if not os.path.exists(file_path):
+        print(f"Error: {file_path} not found")
+        sys.exit(1)
+
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        calls = find_image_calls(f.read())
+    presets = [get_preset(q) for q in (args.quality or list(load_presets()))]
+
+    built = 0
+    for name, scale in calls:
+        path = resolve_image(image_dir, name)
+        if not os.path.exists(path):
+            print(f"  {name}: not found (uses the fallback drawing)")
+            continue
+        _, height = source_size(path)
+        for preset in presets:
+            rows = target_rows(height, scale, preset["height"])
+            load_pixels(path, rows)
+            built += 1
+            print(f"  {name} x{scale:g} @ {preset['name']}: {height} -> {rows} rows")
+    print(f"{built} image variants cached in {os.path.join(image_dir, CACHE_DIRNAME)}")
+
+
+if __name__ == "__main__":
+    main()
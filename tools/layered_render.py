@@ -0,0 +1,320 @@
+"""
+レイヤー合成レンダリング (layered mode)
+======================================
+
+manim の Cairo レンダラーは play() ごとに「最初に動くモブジェクトより前」を静止画として
+1 回描き、それより後ろは動かないものも含めて毎フレーム描き直す。さらに play() のたびに
+静止画を最初から描き直し、wait() では静止画の上に全モブジェクトをもう一度描いている。
+layered mode では play() ごとにシーンのモブジェクト (子孫単位、描画順) を次のように分ける。
+
+  背景      最初に動くものより前の静止したもの。描いた結果を内容のハッシュでキャッシュし、
+            次の play() でも同じなら描き直さない (字幕の切り替えなどで同じ背景が何度も出てくる)
+  動く      アニメーションの対象・アップデーターを持つもの・前面のもの。毎フレーム描く
+  上の静止  動くものより後ろにある静止したもの。パスが多い連続は透明なレイヤーに 1 回だけ描き、
+            毎フレームはそのレイヤーを重ねるだけにする (少ないものは普通に描く)
+
+速さは play() ごとに計測する。一部のフレーム (各 play の最初と BASELINE_EVERY フレームごと) で
+manim 本来の描き方の時間も測り、シーン全体を本来の描き方で描いた場合の時間を見積もって比べる。
+結果は projects/<project>/media/logs/<SceneName>.layers.json に書き出す。
+
+シーンにアップデーター (Scene.add_updater) がある場合は、何を書き換えるかわからないので
+その play() は manim 本来の描き方で描く。play() の途中でモブジェクトが追加・削除されたり
+(Succession で後から出てくるもの・アップデーターからの scene.add)、子孫が作り直されたり
+(DecimalNumber.set_value) して描くものの顔ぶれが分割したときと変わったフレームも、本来の描き方で描く。
+
+有効にするには環境変数 VIBE_RENDER_MODE=layered を付けて tools/render_scene.py から起動する
+(render_parallel.py --render-mode layered)。
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+
+import numpy as np
+from manim import VMobject, logger
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.iterables import list_update
+
+from render_presets import RENDER_MODE_ENV
+from raster_cache import FrozenLayer, layer_signature
+from memory_mode import scene_log_path
+
+# 背景のキャッシュ (1080p で 1 枚約 8MB)
+MAX_BACKGROUNDS = 4
+# 上の静止したものをレイヤーにする最小の点数 (これより少なければ普通に描く方が速い)
+LAYER_MIN_POINTS = 400
+# 1 回の play() で作るレイヤーの上限
+MAX_LAYERS = 4
+# manim 本来の描き方の時間を測る間隔 (フレーム)
+BASELINE_EVERY = 30
+
+
+def render_mode():
+    return os.environ.get(RENDER_MODE_ENV, "")
+
+
+def animated_mobjects(animations):
+    """アニメーションが書き換えるモブジェクト (AnimationGroup は中のアニメーションもたどる)"""
+    result = []
+    stack = list(animations or [])
+    while stack:
+        animation = stack.pop()
+        if animation.mobject is not None:
+            result.append(animation.mobject)
+        stack.extend(getattr(animation, "animations", []))
+    return result
+
+
+class Plan:
+    """1 回の play() の背景と、その上に毎フレーム重ねるもの"""
+
+    def __init__(self):
+        self.background = None
+        self.background_cached = False
+        self.background_cost = 0.0  # 背景を描くのにかかった秒数 (キャッシュなら前回の値)
+        self.runs = []              # [("moving" | "static" | "layer", [mobjects], FrozenLayer or None)]
+        self.layers_built = 0
+        self.counts = {}
+        self.key = None             # 分割したときに描くものの顔ぶれ (structure_key)
+
+
+class LayeredRenderer:
+    """play() ごとに背景・動くもの・上の静止レイヤーに分けて描く"""
+
+    def __init__(self, scene, report_path):
+        self.scene = scene
+        self.report_path = report_path
+        self.backgrounds = OrderedDict()  # ハッシュ -> (画像, 描くのにかかった秒数)
+        self.layers = {}                  # ハッシュ -> FrozenLayer (直前の play のもの)
+        self.plan = None
+        self.records = []
+        # 本来の描き方で描いた直後は、次のフレームを全体から描き直す
+        self.resync = False
+
+    @classmethod
+    def attach(cls, scene, report_path=None):
+        """シーンのレンダラーの save_static_frame_data / update_frame をフックする"""
+        existing = getattr(scene, "layered_renderer", None)
+        if existing is not None:
+            return existing
+
+        self = cls(scene, report_path or scene_log_path(scene, "layers.json"))
+        scene.layered_renderer = self
+        renderer = scene.renderer
+
+        original_save_static = renderer.save_static_frame_data
+        original_update_frame = renderer.update_frame
+        original_tear_down = scene.tear_down
+
+        def save_static_frame_data(scene_, static_mobjects):
+            self.plan = None
+            if scene_.updaters:
+                self.start_record(None)
+                return original_save_static(scene_, static_mobjects)
+            start = time.perf_counter()
+            self.plan = self.make_plan(scene_)
+            self.start_record(self.plan, time.perf_counter() - start)
+            renderer.static_image = self.plan.background
+            return renderer.static_image
+
+        def update_frame(scene_, mobjects=None, include_submobjects=True, ignore_skipping=True, **kwargs):
+            # 毎フレームの描画 (render / 静止した wait) は scene.moving_mobjects を渡してくる
+            if self.plan is None or mobjects is not scene_.moving_mobjects or kwargs:
+                return original_update_frame(scene_, mobjects, include_submobjects, ignore_skipping, **kwargs)
+            if renderer.skip_animations and not ignore_skipping:
+                return None
+            record = self.records[-1]
+            start = time.perf_counter()
+            if self.structure_key(scene_, renderer.camera) != self.plan.key:
+                # 分割したあとで顔ぶれが変わった (追加・削除・子孫の作り直し)
+                original_update_frame(scene_, mobjects, include_submobjects, ignore_skipping)
+                self.resync = True
+                record["fallback_frames"] += 1
+                record["time"] += time.perf_counter() - start
+                record["frames"] += 1
+                return None
+            check_time = time.perf_counter() - start
+            sampled = record["frames"] % BASELINE_EVERY == 0
+            if sampled:
+                start = time.perf_counter()
+                original_update_frame(scene_, mobjects, include_submobjects, ignore_skipping)
+                record["sampled_baseline"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            # 計測や本来の描き方でフレームを描き換えたときは全体を描き直す
+            self.draw_frame(renderer.camera, full=sampled or self.resync)
+            self.resync = False
+            record["time"] += check_time + time.perf_counter() - start
+            record["frames"] += 1
+            return None
+
+        def tear_down():
+            original_tear_down()
+            self.write_report()
+
+        renderer.save_static_frame_data = save_static_frame_data
+        renderer.update_frame = update_frame
+        scene.tear_down = tear_down
+        return self
+
+    # --- 分割 ---
+
+    @staticmethod
+    def structure_key(scene, camera):
+        """毎フレーム描くもの (moving_mobjects の子孫) とシーンのモブジェクトの顔ぶれ"""
+        members = extract_mobject_family_members(
+            scene.moving_mobjects, use_z_index=camera.use_z_index, only_those_with_points=True)
+        return tuple(id(m) for m in members), tuple(id(m) for m in scene.mobjects)
+
+    def make_plan(self, scene):
+        camera = scene.renderer.camera
+        self.resync = False
+        members = extract_mobject_family_members(
+            list_update(scene.mobjects, scene.foreground_mobjects),
+            use_z_index=camera.use_z_index,
+            only_those_with_points=True,
+        )
+        moving = set()
+        for mob in animated_mobjects(scene.animations) + list(scene.foreground_mobjects):
+            moving.update(id(m) for m in mob.get_family())
+        for mob in scene.get_mobject_family_members():
+            if mob.updaters:
+                moving.update(id(m) for m in mob.get_family())
+
+        first = next((i for i, mob in enumerate(members) if id(mob) in moving), len(members))
+        plan = Plan()
+        self.set_background(plan, camera, members[:first])
+
+        # 動くものより後ろを、動く / 静止の連続に分ける
+        runs = []
+        for mob in members[first:]:
+            is_moving = id(mob) in moving
+            if runs and runs[-1][0] == is_moving:
+                runs[-1][1].append(mob)
+            else:
+                runs.append((is_moving, [mob]))
+
+        layered = sorted(
+            (i for i, (is_moving, run) in enumerate(runs)
+             if not is_moving and all(isinstance(m, VMobject) for m in run)
+             and sum(len(m.points) for m in run) >= LAYER_MIN_POINTS),
+            key=lambda i: -sum(len(m.points) for m in runs[i][1]),
+        )[:MAX_LAYERS]
+
+        previous, self.layers = self.layers, {}
+        for i, (is_moving, run) in enumerate(runs):
+            if i not in layered:
+                plan.runs.append(("moving" if is_moving else "static", run, None))
+                continue
+            signature = layer_signature(camera, run)
+            layer = previous.pop(signature, None)
+            if layer is None:
+                layer = FrozenLayer()
+                layer.rasterize(camera, run, signature)
+                plan.layers_built += 1
+            self.layers[signature] = layer
+            plan.runs.append(("layer", run, layer))
+        for layer in previous.values():
+            layer.release(camera)
+
+        plan.key = self.structure_key(scene, camera)
+        plan.counts = {
+            "background": first,
+            "moving": sum(len(run) for is_moving, run in runs if is_moving),
+            "static_above": sum(len(run) for is_moving, run in runs if not is_moving),
+            "layers": len(layered),
+        }
+        return plan
+
+    def set_background(self, plan, camera, mobjects):
+        """静止した背景の画像 (同じ内容ならキャッシュから使う)"""
+        signature = layer_signature(camera, mobjects)
+        key = (signature, repr(camera.background_color), camera.background_opacity, camera.pixel_array.shape)
+        entry = self.backgrounds.get(key)
+        if entry is not None:
+            self.backgrounds.move_to_end(key)
+            plan.background, plan.background_cost = entry
+            plan.background_cached = True
+            return
+
+        start = time.perf_counter()
+        camera.reset()
+        camera.capture_mobjects(mobjects, include_submobjects=False)
+        plan.background = np.array(camera.pixel_array)
+        plan.background_cost = time.perf_counter() - start
+
+        self.backgrounds[key] = (plan.background, plan.background_cost)
+        while len(self.backgrounds) > MAX_BACKGROUNDS:
+            self.backgrounds.popitem(last=False)
+
+    # --- 描画 ---
+
+    def draw_frame(self, camera, full=True):
+        """背景の上に、動くもの・上の静止したもの・レイヤーを描画順に重ねる"""
+        camera.pixel_array[:] = self.plan.background
+        for kind, mobjects, layer in self.plan.runs:
+            if kind == "layer":
+                layer.composite(camera)
+            else:
+                camera.capture_mobjects(mobjects, include_submobjects=False)
+
+    # --- 計測 ---
+
+    def start_record(self, plan, setup_time=0.0):
+        record = {
+            "index": len(self.records),
+            "layered": plan is not None,
+            "frames": 0,
+            "fallback_frames": 0,
+            "time": setup_time,
+            "sampled_baseline": [],
+        }
+        if plan is not None:
+            record.update(plan.counts)
+            record["background_cached"] = plan.background_cached
+            record["layers_built"] = plan.layers_built
+            # manim 本来の描き方では play() のたびに背景を描き直す
+            record["baseline_static"] = plan.background_cost
+        self.records.append(record)
+
+    def summary(self):
+        layered_time = 0.0
+        baseline_time = 0.0
+        frames = 0
+        for record in self.records:
+            if not record["layered"]:
+                continue
+            samples = record["sampled_baseline"]
+            per_frame = sum(samples) / len(samples) if samples else 0.0
+            record["baseline"] = round(record["baseline_static"] + per_frame * record["frames"], 4)
+            layered_time += record["time"]
+            baseline_time += record["baseline"]
+            frames += record["frames"]
+        return {
+            "animations": len(self.records),
+            "layered_animations": sum(1 for r in self.records if r["layered"]),
+            "frames": frames,
+            "render_time": round(layered_time, 3),
+            "estimated_baseline_time": round(baseline_time, 3),
+            "speedup": round(baseline_time / layered_time, 2) if layered_time else None,
+            "backgrounds_cached": sum(1 for r in self.records if r.get("background_cached")),
+            "fallback_frames": sum(r["fallback_frames"] for r in self.records),
+        }
+
+    def write_report(self):
+        summary = self.summary()
+        for record in self.records:
+            record["time"] = round(record["time"], 4)
+            record["sampled_baseline"] = [round(t, 4) for t in record["sampled_baseline"]]
+            if "baseline_static" in record:
+                record["baseline_static"] = round(record["baseline_static"], 4)
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        tmp_path = self.report_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"scene": type(self.scene).__name__, "summary": summary, "animations": self.records},
+                      f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.report_path)
+
+        speedup = f"{summary['speedup']:.2f}x" if summary["speedup"] else "n/a"
+        logger.info(f"Layered: {summary['render_time']:.2f}s drawing vs ~{summary['estimated_baseline_time']:.2f}s "
+                    f"standard ({speedup}) over {summary['frames']} frames -> {self.report_path}")
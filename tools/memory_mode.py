@@ -0,0 +1,316 @@
+"""
+メモリ上限つきのシーン実行 (memory mode)
+========================================
+
+カードやグラフを積み重ねるシーン (toyota_analysis) やグリッドの連続 (diffusion_model) は、
+フェードアウトしたモブジェクトもシーンの終わりまでメモリに残り続ける。
+memory mode では play() / wait() ごとに以下を行う。
+
+  計測  シーン上のモブジェクト数・点列と色配列のバイト数・プロセスの RSS と
+        その時点までの最大 RSS (play の途中の一時的な山も含む) を記録する
+  解放  その play で画面から消えたモブジェクトについて、シーン側が持つ参照
+        (直前のアニメーションの開始状態のコピー・moving / static の一覧・
+        MathTex などの SVG キャッシュのコピー) を捨て、循環参照をその場で回収する
+  自動解放  release_on_removal() で印を付けたモブジェクトは、FadeOut などの remover
+            アニメーションで消えたあと、次の play() までにシーンへ戻されず、次の play() の
+            アニメーションにも使われていなければ release() する。construct のローカル変数
+            (cards など) が参照を持っていても点列・色配列は手放される
+
+自動解放は印を付けたものだけが対象 (FadeOut したあと wait() を挟んで FadeIn し直すような
+モブジェクトを消してしまわないため)。シーンや次のアニメーションがまだ使っている子孫は解放しない。
+release() は手動でも呼べる (wipe() のように Remove で全部を消す場面向け)。
+解放済みのモブジェクトをもう一度シーンに追加すると警告する。
+
+計測結果は projects/<project>/media/logs/<SceneName>.memory.json に書き出す。
+
+有効にするには環境変数 VIBE_MEMORY_MODE=1 を付けて tools/render_scene.py から起動する
+(render_parallel.py --memory-mode)。
+"""
+
+import gc
+import os
+import sys
+import json
+
+import numpy as np
+from manim import config, logger
+from manim.mobject.svg import svg_mobject
+from manim.utils.iterables import hash_obj
+
+from render_presets import MEMORY_ENV
+
+# バイト数に数える配列の属性 (VMobject の点列・色、ImageMobject の画素)
+ARRAY_ATTRS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas", "pixel_array")
+# 解放したモブジェクトの印
+RELEASED_ATTR = "_vibe_released"
+# 画面から消えたら自動解放するモブジェクトの印
+RELEASE_ON_REMOVAL_ATTR = "_vibe_release_on_removal"
+
+
+def scene_log_path(scene, suffix):
+    """projects/<project>/media/logs/<SceneName>.<suffix>"""
+    module = sys.modules.get(type(scene).__module__)
+    project_dir = os.path.dirname(os.path.abspath(module.__file__)) if module and hasattr(module, "__file__") \
+        else config.media_dir
+    return os.path.join(project_dir, "media", "logs", f"{type(scene).__name__}.{suffix}")
+
+
+def memory_enabled():
+    return os.environ.get(MEMORY_ENV, "") not in ("", "0")
+
+
+def current_rss():
+    """プロセスの RSS (bytes)。取れない環境では None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """プロセス開始からの最大 RSS (bytes)。取れない環境では None"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KB、macOS は bytes
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+    try:
+        import psutil
+        # Windows はピークのワーキングセットを持っている
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    except ImportError:
+        return None
+
+
+def family_of(mobjects):
+    """モブジェクトとその子孫 (重複なし、順序つき)"""
+    seen = {}
+    for mob in mobjects:
+        for member in mob.get_family():
+            seen.setdefault(id(member), member)
+    return seen
+
+
+def array_bytes(mobject):
+    total = 0
+    for attr in ARRAY_ATTRS:
+        value = mobject.__dict__.get(attr)
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+    return total
+
+
+def release(*mobjects, live=None):
+    """使い終わったモブジェクトの点列・色配列・アップデーターとコピーを解放する
+
+    解放後のモブジェクトは描画できない。画面から消したあと、二度と使わないものにだけ使う。
+    live (family_of の結果) に含まれる子孫は、まだ使われているので解放しない。
+    """
+    live = live or {}
+    released = 0
+    for member in family_of(mobjects).values():
+        if member.__dict__.get(RELEASED_ATTR) or id(member) in live:
+            continue
+        released += array_bytes(member)
+        member.clear_updaters()
+        for attr in ARRAY_ATTRS:
+            value = member.__dict__.get(attr)
+            if isinstance(value, np.ndarray):
+                setattr(member, attr, np.zeros((0,) + value.shape[1:], dtype=value.dtype))
+        for attr in ("target", "saved_state"):
+            member.__dict__.pop(attr, None)
+        member.submobjects = []
+        setattr(member, RELEASED_ATTR, True)
+    return released
+
+
+def release_on_removal(*mobjects):
+    """remover アニメーションで画面から消えたら自動解放するモブジェクトに印を付ける
+
+    二度とシーンに戻さないもの (使い捨てのカードやグラフ) にだけ付ける。
+    """
+    for mob in mobjects:
+        setattr(mob, RELEASE_ON_REMOVAL_ATTR, True)
+    return mobjects[0] if len(mobjects) == 1 else mobjects
+
+
+def animation_mobjects(animations):
+    """play() に渡したアニメーションが参照するモブジェクト (対象・変形先・.animate の元など)"""
+    from manim import Mobject
+
+    found = []
+    stack = list(animations)
+    seen = set()
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Mobject):
+            found.append(item)
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.extend(v for v in vars(item).values() if isinstance(v, (Mobject, list, tuple)))
+    return found
+
+
+def removed_by(animations):
+    """remover アニメーション (FadeOut など) が消すモブジェクト"""
+    from manim import Animation
+
+    removed = []
+    for anim in animations:
+        if isinstance(anim, Animation):
+            for sub in getattr(anim, "animations", None) or [anim]:
+                if getattr(sub, "remover", False) and sub.mobject is not None:
+                    removed.append(sub.mobject)
+    return removed
+
+
+def drop_svg_cache(mobjects):
+    """消えた SVG 系モブジェクトのキャッシュ済みコピーを SVG_HASH_TO_MOB_MAP から捨てる"""
+    cache = svg_mobject.SVG_HASH_TO_MOB_MAP
+    if not cache:
+        return 0
+    dropped = 0
+    for mob in mobjects:
+        if isinstance(mob, svg_mobject.SVGMobject):
+            try:
+                key = hash_obj(mob.hash_seed)
+            except Exception:
+                continue
+            if cache.pop(key, None) is not None:
+                dropped += 1
+    return dropped
+
+
+class MemoryMode:
+    """play() ごとにメモリを計測し、画面から消えたモブジェクトへの参照を手放す"""
+
+    def __init__(self, scene, report_path):
+        self.scene = scene
+        self.report_path = report_path
+        self.records = []
+        # remover で消えて、次の play() で解放するかを判断するモブジェクト
+        self.pending = []
+
+    @classmethod
+    def attach(cls, scene, report_path=None):
+        """シーンの play / add / tear_down をフックする"""
+        existing = getattr(scene, "memory_mode", None)
+        if existing is not None:
+            return existing
+
+        if report_path is None:
+            report_path = scene_log_path(scene, "memory.json")
+
+        self = cls(scene, report_path)
+        scene.memory_mode = self
+
+        original_play = scene.play
+        original_add = scene.add
+        original_tear_down = scene.tear_down
+
+        # wait() も内部で play() を呼ぶので、ここで両方を計測できる
+        def play(*args, **kwargs):
+            released = self.release_pending(args)
+            before = family_of(scene.mobjects + scene.foreground_mobjects)
+            result = original_play(*args, **kwargs)
+            self.after_play(before, removed_by(args), released)
+            return result
+
+        def add(*mobjects):
+            for mob in mobjects:
+                if mob.__dict__.get(RELEASED_ATTR):
+                    logger.warning(f"Memory mode: re-adding released {type(mob).__name__}; it will not render")
+            return original_add(*mobjects)
+
+        def tear_down():
+            original_tear_down()
+            self.write_report()
+
+        scene.play = play
+        scene.add = add
+        scene.tear_down = tear_down
+        return self
+
+    def release_pending(self, animations):
+        """前の play() で remover に消され、シーンにも今回のアニメーションにも戻っていないものを解放する"""
+        if not self.pending:
+            return 0
+        scene = self.scene
+        in_use = family_of(scene.mobjects + scene.foreground_mobjects + animation_mobjects(animations))
+        released = release(*[mob for mob in self.pending if id(mob) not in in_use], live=in_use)
+        self.pending = []
+        return released
+
+    def after_play(self, before, removers=(), released=0):
+        scene = self.scene
+        alive = family_of(scene.mobjects + scene.foreground_mobjects)
+        removed = [mob for key, mob in before.items() if key not in alive]
+        num_removed = len(removed)
+        before.clear()
+        self.pending = [mob for mob in removers
+                        if id(mob) not in alive and mob.__dict__.get(RELEASE_ON_REMOVAL_ATTR)]
+
+        dropped = 0
+        if removed:
+            # 直前のアニメーションは開始状態のコピーを持っている (次の play で作り直される)
+            scene.animations = None
+            scene.moving_mobjects = []
+            scene.static_mobjects = []
+            dropped = drop_svg_cache(removed)
+            # 手元の参照も外してから回収する
+            removed = None
+            gc.collect()
+
+        self.records.append({
+            "index": len(self.records),
+            "time": round(scene.renderer.time, 3),
+            "mobjects": len(alive),
+            "bytes": sum(array_bytes(mob) for mob in alive.values()),
+            "removed": num_removed,
+            "svg_cache_dropped": dropped,
+            "released_bytes": released,
+            "rss": current_rss(),
+            "peak_rss": peak_rss(),
+        })
+
+    def summary(self):
+        rss = [r["rss"] for r in self.records if r["rss"] is not None]
+        peaks = [r["peak_rss"] for r in self.records if r["peak_rss"] is not None]
+        return {
+            "animations": len(self.records),
+            "peak_mobjects": max((r["mobjects"] for r in self.records), default=0),
+            "peak_bytes": max((r["bytes"] for r in self.records), default=0),
+            "released_bytes": sum(r["released_bytes"] for r in self.records),
+            "peak_rss": max(peaks) if peaks else None,
+            "max_sampled_rss": max(rss) if rss else None,
+            "final_rss": rss[-1] if rss else None,
+        }
+
+    def write_report(self):
+        summary = self.summary()
+        # asset_cache.py を使うシーンはキャッシュのヒット数も残す
+        if "asset_cache" in sys.modules:
+            summary["asset_cache"] = sys.modules["asset_cache"].cache_stats()
+        os.makedirs(os.path.dirname(self.report_path), exist_ok=True)
+        tmp_path = self.report_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"scene": type(self.scene).__name__, "summary": summary, "animations": self.records},
+                      f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.report_path)
+
+        peak_rss = f"{summary['peak_rss'] / 2**20:.0f}MB" if summary["peak_rss"] else "n/a"
+        logger.info(f"Memory: peak {summary['peak_mobjects']} mobjects, "
+                    f"{summary['peak_bytes'] / 2**20:.1f}MB arrays, RSS {peak_rss} -> {self.report_path}")
@@ -0,0 +1,147 @@
+"""
+1 回の construct から複数解像度の動画を書き出す
+==============================================
+
+最も高い品質 (例: -qh 1080p60) でシーンをレンダリングしながら、各フレームを
+追加の出力 (例: 720p30) 用の ffmpeg にも流す。construct とアニメーション補間は 1 回だけで、
+追加の出力にかかるのはほぼエンコード時間だけになる。
+
+  フレームレート: 出力ごとのフレーム時計で間引く (60fps -> 30fps なら 2 フレームに 1 枚)
+  解像度:         ffmpeg の scale フィルタ (area) で縮小する
+
+追加の出力は manim と同じ命名の兄弟フォルダに書く:
+  media/videos/animation/1080p60/Scene01.mp4   (manim 本体)
+  media/videos/animation/720p30/Scene01.mp4    (追加の出力)
+
+出力の指定は環境変数 VIBE_EXTRA_OUTPUTS (render_presets のプリセット名・品質フラグ・
+"1280x720@30" をカンマ区切り)。エンコード設定は各プリセットのものを使う。
+tools/render_scene.py 経由で起動すると Scene.render に自動で取り付けられる。
+"""
+
+import os
+import math
+import subprocess
+
+import numpy as np
+
+from render_presets import get_preset, res_folder, encoder_args
+
+OUTPUTS_ENV = "VIBE_EXTRA_OUTPUTS"
+
+
+def output_presets():
+    """VIBE_EXTRA_OUTPUTS に指定された追加の出力のプリセットのリスト"""
+    value = os.environ.get(OUTPUTS_ENV, "")
+    return [get_preset(q.strip()) for q in value.split(",") if q.strip()]
+
+
+def extra_output_path(movie_path, preset):
+    """manim の出力パスから追加の出力のパスを得る (兄弟フォルダの同名ファイル)"""
+    movie_dir, name = os.path.split(str(movie_path))
+    return os.path.join(os.path.dirname(movie_dir), res_folder(preset), name)
+
+
+class ExtraOutput:
+    """1 つの追加の出力 (フレーム時計 + ffmpeg プロセス)"""
+
+    def __init__(self, path, preset, source_fps):
+        self.path = path
+        self.preset = preset
+        self.width, self.height, self.fps = preset["width"], preset["height"], preset["fps"]
+        self.source_fps = source_fps
+        self.source_frames = 0
+        self.frames = 0
+        self.process = None
+
+    def open(self, source_width, source_height):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{source_width}x{source_height}",
+            "-r", str(self.fps), "-i", "-",
+            "-vf", f"scale={self.width}:{self.height}:flags=area",
+            "-an", *encoder_args(self.preset),
+            self.path,
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame, num_frames):
+        """元のフレームを num_frames 枚進め、この出力の時計が進んだ分だけ書き出す"""
+        self.source_frames += num_frames
+        target = math.ceil(self.source_frames * self.fps / self.source_fps - 1e-9)
+        count = target - self.frames
+        if count <= 0:
+            return
+        if self.process is None:
+            height, width = frame.shape[:2]
+            self.open(width, height)
+        data = np.ascontiguousarray(frame).tobytes()
+        for _ in range(count):
+            self.process.stdin.write(data)
+        self.frames = target
+
+    def close(self):
+        if self.process is None:
+            return True
+        self.process.stdin.close()
+        return self.process.wait() == 0
+
+
+class MultiOutput:
+    """シーンのレンダラーに追加の出力を取り付ける"""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    @classmethod
+    def attach(cls, scene, presets=None):
+        """追加の出力があれば add_frame / tear_down に書き出しを差し込む"""
+        existing = getattr(scene, "multi_output", None)
+        if existing is not None:
+            return existing
+
+        presets = output_presets() if presets is None else presets
+        renderer = scene.renderer
+        movie_path = getattr(renderer.file_writer, "movie_file_path", None)
+        if not presets or not movie_path:
+            return None
+
+        source_fps = scene.camera.frame_rate
+        outputs = []
+        for preset in presets:
+            path = extra_output_path(movie_path, preset)
+            # manim 本体と同じ出力はスキップ
+            if os.path.abspath(path) != os.path.abspath(str(movie_path)):
+                outputs.append(ExtraOutput(path, preset, source_fps))
+        from manim import config
+
+        self = cls(outputs)
+        scene.multi_output = self
+
+        # キャッシュ済みの play はフレームを描かず add_frame を通らないので、追加の出力が短くなる
+        config.disable_caching = True
+
+        original_add_frame = renderer.add_frame
+        original_tear_down = scene.tear_down
+
+        def add_frame(frame, num_frames=1):
+            original_add_frame(frame, num_frames)
+            if not renderer.skip_animations:
+                self.write(frame, num_frames)
+
+        def tear_down():
+            original_tear_down()
+            self.close()
+
+        renderer.add_frame = add_frame
+        scene.tear_down = tear_down
+        return self
+
+    def write(self, frame, num_frames):
+        for output in self.outputs:
+            output.write(frame, num_frames)
+
+    def close(self):
+        for output in self.outputs:
+            if not output.close():
+                print(f"Warning: encoding {output.path} failed")
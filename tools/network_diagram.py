@@ -0,0 +1,297 @@
+"""
+高速なニューラルネットワーク図
+==============================
+
+reference/3b1b_patterns.md の create_neural_network はニューロンの組ごとに Line を 1 本作るので、
+8-16-16-4 程度でも数百、実際の規模では数千のモブジェクトになり、フレームレートが落ちる。
+
+NetworkDiagram は接続線をすべて 1 つの NetworkEdges にまとめる。
+
+  - 接続線の端点は VMobject の点列 (1 本につき直線の 3 次ベジェ 1 つ) として持つので、
+    shift / scale / next_to / FadeIn / Transform はそのまま使える
+  - 線の太さ・色・不透明度は 1 本ごとの配列 (edge_widths / edge_rgbas) で持ち、
+    重みからの変換も numpy でまとめて行う
+  - 描画は Cairo に直接描き、同じ見た目の線をまとめて 1 回の stroke で描く
+  - ActivationFlow (入力から出力へ流れる活性化) と UpdateWeights (重みの更新) は
+    全接続線を配列演算で更新する
+
+Usage (animation.py):
+  from network_diagram import NetworkDiagram, ActivationFlow, UpdateWeights
+
+  network = NetworkDiagram([8, 16, 16, 4], seed=42)
+  self.play(FadeIn(network))
+  self.play(ActivationFlow(network, color=YELLOW), run_time=2)
+  self.play(UpdateWeights(network, network.random_weights(seed=7)))
+
+Cairo レンダラー専用 (OpenGL レンダラーでは接続線は描かれない)。
+"""
+
+import numpy as np
+from manim import (
+    Animation, Camera, Circle, Group, ManimColor, VGroup, VMobject,
+    BLACK, BLUE, DOWN, RED, RIGHT, WHITE, YELLOW,
+)
+
+# Cairo に渡す色・太さをこの細かさで丸め、同じ値の線を 1 回の stroke にまとめる
+COLOR_LEVELS = 64
+WIDTH_LEVELS = 32
+
+
+class NetworkEdges(VMobject):
+    """多数の直線を 1 つのモブジェクトとして持ち、1 本ごとの太さ・色・不透明度で描く"""
+
+    def __init__(self, starts, ends, widths=1.0, colors=WHITE, opacities=1.0, **kwargs):
+        super().__init__(**kwargs)
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        self.set_edges(starts, ends)
+        self.edge_widths = np.broadcast_to(np.asarray(widths, dtype=float), (len(starts),)).copy()
+        self.edge_rgbas = np.zeros((len(starts), 4))
+        self.set_edge_colors(colors, opacities)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_widths)
+
+    def set_edges(self, starts, ends):
+        """端点から点列を作る (1 本につき 4 点の直線ベジェ)"""
+        delta = ends - starts
+        self.points = np.stack(
+            [starts, starts + delta / 3, starts + 2 * delta / 3, ends], axis=1,
+        ).reshape(-1, 3)
+        return self
+
+    def get_starts(self):
+        return self.points[0::4]
+
+    def get_ends(self):
+        return self.points[3::4]
+
+    def set_edge_colors(self, colors, opacities=None):
+        """色 (1 色、1 本ごとの色のリスト、(N, 3) の RGB 配列) と不透明度を設定する"""
+        if isinstance(colors, np.ndarray) and colors.ndim == 2:
+            rgb = colors[:, :3]
+        elif isinstance(colors, (list, tuple)) and len(colors) == self.num_edges:
+            rgb = np.array([ManimColor(c).to_rgb() for c in colors])
+        else:
+            rgb = np.tile(ManimColor(colors).to_rgb(), (self.num_edges, 1))
+        self.edge_rgbas[:, :3] = rgb
+        if opacities is not None:
+            self.edge_rgbas[:, 3] = opacities
+        return self
+
+    def set_edge_widths(self, widths):
+        self.edge_widths[:] = widths
+        return self
+
+    def set_color(self, color, family=True):
+        # 全体の色を変えるときは線ごとの色もそろえる (不透明度は保つ)
+        super().set_color(color, family=family)
+        if hasattr(self, "edge_rgbas"):
+            self.set_edge_colors(color)
+        return self
+
+    def interpolate_color(self, mobject1, mobject2, alpha):
+        super().interpolate_color(mobject1, mobject2, alpha)
+        if isinstance(mobject1, NetworkEdges) and isinstance(mobject2, NetworkEdges) \
+                and mobject1.num_edges == mobject2.num_edges == self.num_edges:
+            self.edge_widths = (1 - alpha) * mobject1.edge_widths + alpha * mobject2.edge_widths
+            self.edge_rgbas = (1 - alpha) * mobject1.edge_rgbas + alpha * mobject2.edge_rgbas
+
+    def draw_cairo(self, camera, ctx):
+        """接続線を見た目ごとにまとめて Cairo に描く"""
+        count = min(self.num_edges, len(self.points) // 4)
+        if count == 0:
+            return
+        starts = self.points[0:4 * count:4, :2]
+        ends = self.points[3:4 * count:4, :2]
+        rgbas = self.edge_rgbas[:count].copy()
+        # FadeIn / FadeOut はモブジェクト全体の stroke の不透明度として効かせる
+        rgbas[:, 3] *= self.get_stroke_opacity()
+        widths = self.edge_widths[:count]
+
+        visible = (rgbas[:, 3] > 0) & (widths > 0) & np.any(starts != ends, axis=1)
+        if not visible.any():
+            return
+        index = np.flatnonzero(visible)
+        styles = np.column_stack([
+            np.round(rgbas[index] * COLOR_LEVELS),
+            np.round(widths[index] * WIDTH_LEVELS),
+        ])
+        keys, groups = np.unique(styles, axis=0, return_inverse=True)
+        groups = groups.reshape(-1)
+        order = np.argsort(groups, kind="stable")
+        bounds = np.searchsorted(groups[order], np.arange(len(keys) + 1))
+
+        ctx.new_path()
+        for key, lo, hi in zip(keys, bounds[:-1], bounds[1:]):
+            r, g, b, a = key[:4] / COLOR_LEVELS
+            # manim のピクセル配列は RGBA、Cairo は BGRA で書くので順番を入れ替える
+            ctx.set_source_rgba(b, g, r, a)
+            ctx.set_line_width(key[4] / WIDTH_LEVELS * camera.cairo_line_width_multiple)
+            for i in index[order[lo:hi]]:
+                ctx.move_to(*starts[i])
+                ctx.line_to(*ends[i])
+            ctx.stroke()
+
+
+# NetworkEdges は VMobject として扱われるので、Camera の VMobject 描画の入口で振り分ける
+# (Camera.display_funcs は呼び出しごとに作り直されるので登録では差し込めない)
+if not getattr(Camera.display_vectorized, "_network_edges", False):
+    _original_display_vectorized = Camera.display_vectorized
+
+    def _display_vectorized(self, vmobject, ctx):
+        if isinstance(vmobject, NetworkEdges):
+            vmobject.draw_cairo(self, ctx)
+            return self
+        return _original_display_vectorized(self, vmobject, ctx)
+
+    _display_vectorized._network_edges = True
+    Camera.display_vectorized = _display_vectorized
+
+
+class NetworkDiagram(Group):
+    """層ごとのニューロン (Circle) と、まとめて描く接続線 (NetworkEdges)
+
+    weights を省略すると seed から正規分布の重みを作る。重みは絶対値で太さと不透明度、
+    符号で色 (正: positive_color、負: negative_color、0 に近いほど zero_color) に変換する。
+    """
+
+    def __init__(self, layer_sizes, neuron_radius=0.15, layer_buff=2.0, neuron_buff=0.3,
+                 weights=None, activations=None, seed=None,
+                 max_width=2.0, max_opacity=0.6,
+                 positive_color=BLUE, negative_color=RED, zero_color=BLACK,
+                 neuron_color=WHITE, neuron_stroke_width=1, **kwargs):
+        super().__init__(**kwargs)
+        self.layer_sizes = list(layer_sizes)
+        self.neuron_radius = neuron_radius
+        self.max_width = max_width
+        self.max_opacity = max_opacity
+        self.positive_rgb = ManimColor(positive_color).to_rgb()
+        self.negative_rgb = ManimColor(negative_color).to_rgb()
+        self.zero_rgb = ManimColor(zero_color).to_rgb()
+        rng = np.random.default_rng(seed)
+
+        if activations is None:
+            activations = [rng.random(size) * 0.8 for size in self.layer_sizes]
+        self.layers = VGroup()
+        for size, layer_activations in zip(self.layer_sizes, activations):
+            layer = VGroup(*[
+                Circle(radius=neuron_radius, stroke_color=neuron_color, stroke_width=neuron_stroke_width,
+                       fill_color=neuron_color, fill_opacity=opacity)
+                for opacity in layer_activations
+            ]).arrange(DOWN, buff=neuron_buff)
+            self.layers.add(layer)
+        self.layers.arrange(RIGHT, buff=layer_buff)
+
+        starts, ends, depths = self.edge_geometry()
+        self.edge_depths = depths
+        self.edges = NetworkEdges(starts, ends)
+        self.add(self.edges, self.layers)
+        self.set_weights(self.random_weights(rng) if weights is None else weights)
+
+    def edge_geometry(self):
+        """隣り合う層の全ニューロンの組の端点 (円周まで縮めたもの) と、0〜1 の深さ"""
+        centers = [np.array([n.get_center() for n in layer]) for layer in self.layers]
+        starts, ends, depths = [], [], []
+        num_gaps = max(len(centers) - 1, 1)
+        for k, (left, right) in enumerate(zip(centers, centers[1:])):
+            a = np.repeat(left, len(right), axis=0)
+            b = np.tile(right, (len(left), 1))
+            direction = b - a
+            length = np.linalg.norm(direction, axis=1, keepdims=True)
+            unit = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+            starts.append(a + unit * self.neuron_radius)
+            ends.append(b - unit * self.neuron_radius)
+            depths.append(np.full(len(a), (k + 0.5) / num_gaps))
+        if not starts:
+            return np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0)
+        return np.concatenate(starts), np.concatenate(ends), np.concatenate(depths)
+
+    @property
+    def num_edges(self):
+        return self.edges.num_edges
+
+    def random_weights(self, seed=None):
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        return rng.normal(size=self.num_edges)
+
+    def weight_style(self, weights):
+        """重みの配列から 太さ・RGB・不透明度 の配列を作る"""
+        weights = np.asarray(weights, dtype=float)
+        scale = np.abs(weights).max() if len(weights) else 0.0
+        magnitude = np.abs(weights) / scale if scale > 0 else np.zeros_like(weights)
+        target = np.where(weights[:, None] >= 0, self.positive_rgb, self.negative_rgb)
+        rgb = self.zero_rgb + (target - self.zero_rgb) * magnitude[:, None]
+        return magnitude * self.max_width, rgb, magnitude * self.max_opacity
+
+    def set_weights(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (self.num_edges,):
+            raise ValueError(f"Expected {self.num_edges} weights, got {weights.shape}")
+        self.weights = weights.copy()
+        widths, rgb, opacities = self.weight_style(weights)
+        self.edges.edge_widths = widths
+        self.edges.edge_rgbas = np.column_stack([rgb, opacities])
+        return self
+
+
+class ActivationFlow(Animation):
+    """入力層から出力層へ、活性化のパルスが接続線とニューロンを流れる"""
+
+    def __init__(self, network, color=YELLOW, pulse_width=0.3, width_boost=2.5, **kwargs):
+        self.color_rgb = ManimColor(color).to_rgb()
+        self.pulse_width = pulse_width
+        self.width_boost = width_boost
+        super().__init__(network, **kwargs)
+
+    def begin(self):
+        network = self.mobject
+        self.base_widths = network.edges.edge_widths.copy()
+        self.base_rgbas = network.edges.edge_rgbas.copy()
+        num_layers = len(network.layers)
+        self.neuron_depths = np.concatenate([
+            np.full(len(layer), k / max(num_layers - 1, 1)) for k, layer in enumerate(network.layers)
+        ])
+        self.neurons = [n for layer in network.layers for n in layer]
+        self.base_fills = [n.get_fill_rgbas().copy() for n in self.neurons]
+        super().begin()
+
+    def intensity(self, depths, alpha):
+        # パルスの中心は -w から 1 + w まで動くので、始まりと終わりは必ず 0 になる
+        w = self.pulse_width
+        center = -w + alpha * (1 + 2 * w)
+        return np.clip(1 - np.abs(depths - center) / w, 0, 1)
+
+    def interpolate_mobject(self, alpha):
+        network = self.mobject
+        edges = network.edges
+        level = self.intensity(network.edge_depths, self.rate_func(alpha))
+        edges.edge_widths = self.base_widths * (1 + (self.width_boost - 1) * level)
+        rgbas = self.base_rgbas.copy()
+        rgbas[:, :3] += (self.color_rgb - rgbas[:, :3]) * level[:, None]
+        rgbas[:, 3] = np.maximum(rgbas[:, 3], level)
+        edges.edge_rgbas = rgbas
+
+        neuron_level = self.intensity(self.neuron_depths, self.rate_func(alpha))
+        for neuron, base, lv in zip(self.neurons, self.base_fills, neuron_level):
+            fill = base.copy()
+            fill[:, :3] += (self.color_rgb - fill[:, :3]) * lv
+            fill[:, 3] = np.maximum(fill[:, 3], lv)
+            neuron.fill_rgbas = fill
+
+
+class UpdateWeights(Animation):
+    """重みを new_weights へ補間しながら、全接続線の太さ・色・不透明度を更新する"""
+
+    def __init__(self, network, new_weights, **kwargs):
+        self.new_weights = np.asarray(new_weights, dtype=float)
+        super().__init__(network, **kwargs)
+
+    def begin(self):
+        self.old_weights = self.mobject.weights.copy()
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        a = self.rate_func(alpha)
+        self.mobject.set_weights((1 - a) * self.old_weights + a * self.new_weights)
@@ -0,0 +1,104 @@
+"""
+ffmpeg への直接パイプエンコーダー
+================================
+
+manim 標準の書き出しは play() ごとに partial movie file をエンコードし、シーンの最後に
+それらを結合し直す。ここではレンダラーのフレームを 1 つの ffmpeg プロセスにそのまま流し、
+シーンの動画を 1 回のエンコードで書き出す (partial movie file は作らない)。
+
+エンコード設定 (codec / preset / tune / CRF / GOP / スレッド数 / pix_fmt) は
+tools/render_presets.json のプリセットから取る。スレッド数は render_parallel.py が
+並列数から割り当てた VIBE_ENCODER_THREADS を使い、プロセスプールとコアを取り合わないようにする。
+
+有効にするには環境変数 VIBE_PIPE_ENCODER=1 を付けて tools/render_scene.py から起動する
+(render_parallel.py は既定で有効)。partial movie file を使わないので manim のキャッシュは無効になる。
+"""
+
+import os
+import subprocess
+
+import numpy as np
+from manim import config, logger
+from manim.utils.file_ops import write_to_movie
+
+from render_presets import PIPE_ENV, current_preset, encoder_args, DEFAULT_ENCODER
+
+
+def pipe_enabled():
+    return os.environ.get(PIPE_ENV, "") not in ("", "0")
+
+
+class PipeEncoder:
+    """シーンのフレームを 1 つの ffmpeg プロセスで movie_file_path に書き出す"""
+
+    def __init__(self, path, preset, frame_rate):
+        self.path = path
+        self.preset = preset
+        self.frame_rate = frame_rate
+        self.process = None
+        self.frames = 0
+
+    @classmethod
+    def attach(cls, scene, preset=None):
+        """シーンのファイルライターの書き出しをパイプエンコーダーに置き換える"""
+        existing = getattr(scene, "pipe_encoder", None)
+        if existing is not None:
+            return existing
+
+        writer = scene.renderer.file_writer
+        movie_path = getattr(writer, "movie_file_path", None)
+        if not movie_path or not write_to_movie() or config.movie_file_extension != ".mp4":
+            return None
+
+        preset = preset or current_preset() or DEFAULT_ENCODER
+        self = cls(str(movie_path), preset, scene.camera.frame_rate)
+        scene.pipe_encoder = self
+
+        # partial movie file のキャッシュはこのエンコーダーでは使えない
+        config.disable_caching = True
+
+        original_finish = writer.finish
+
+        def finish():
+            self.close()
+            # 結合するものはないので、partial movie file の一覧を空にしてから後処理だけ行う
+            writer.partial_movie_files = []
+            original_finish()
+
+        writer.begin_animation = lambda allow_write=False, file_path=None: None
+        writer.end_animation = lambda allow_write=False: None
+        writer.write_frame = self.write_frame
+        writer.finish = finish
+        return self
+
+    def open(self, width, height):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}",
+            "-r", str(self.frame_rate), "-i", "-",
+            "-an", *encoder_args(self.preset),
+            "-movflags", "+faststart",
+            self.path,
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write_frame(self, frame, num_frames=1):
+        if not write_to_movie():
+            return
+        if self.process is None:
+            height, width = frame.shape[:2]
+            self.open(width, height)
+        data = np.ascontiguousarray(frame).tobytes()
+        for _ in range(num_frames):
+            self.process.stdin.write(data)
+        self.frames += num_frames
+
+    def close(self):
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed while encoding {self.path}")
+        self.process = None
+        logger.info(f"Encoded {self.frames} frames to {self.path}")
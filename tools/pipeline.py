@@ -0,0 +1,145 @@
+"""
+プロジェクト一括パイプライン: script.md → 音声 → レンダリング → 結合
+=====================================================================
+
+generate_audio.py / render_parallel.py / ffmpeg 結合を 1 コマンドで実行する。
+各段は前段の完了を待たずに流れる:
+
+  1. 台本をパースし、SceneNN ごとに VOICEVOX で音声を合成する (メインスレッド)
+  2. あるシーンの音声がそろった時点で audio_map.json を更新し、
+     対応する Scene クラスのレンダリングをプロセスプールに投入する
+  3. 最後のシーンのレンダリングが終わったら結合する
+
+TTS の待ち時間 (I/O) と CPU バウンドなレンダリングが重なる。
+台本に対応するセリフがない Scene (例: TitleScene) は最初から投入される。
+
+Usage:
+  python tools/pipeline.py <project_name>
+  python tools/pipeline.py <project_name> -q -qh
+  python tools/pipeline.py <project_name> --skip-audio   # 既存の音声でレンダリング + 結合のみ
+  python tools/pipeline.py <project_name> --changed-only # 台本が変わったシーンだけ再レンダリング
+                                                         (--skip-audio とは併用できない)
+"""
+
+import os
+import time
+import argparse
+import multiprocessing
+
+from audio_index import save_audio_map
+from generate_audio import scenes_from_ir, synthesize_scene, load_previous_audio_map
+from script_ir import update_project_ir, save_ir, with_audio_only, print_changes
+from render_presets import get_preset, res_folder
+from render_parallel import (
+    PROJECTS_DIR, get_scenes_from_file, get_output_dir, get_num_processes, get_encoder_threads, run_render,
+    concat_videos,
+)
+
+
+def scene_key(scene_name):
+    """Scene クラス名から音声マップのキーを得る (Scene01_Intro -> Scene01)"""
+    return scene_name.split("_")[0]
+
+
+def run_pipeline(project_name, quality, skip_audio=False, changed_only=False):
+    project_dir = os.path.join(PROJECTS_DIR, project_name)
+    file_path = os.path.join(project_dir, "animation.py")
+    script_path = os.path.join(project_dir, "script.md")
+    audio_dir = os.path.join(project_dir, "media", "audio")
+
+    scenes = get_scenes_from_file(file_path)
+    if not scenes:
+        print("No scenes found in animation.py")
+        return None
+
+    ir = None
+    scenes_data = {}
+    changes = {}
+    if not skip_audio and os.path.exists(script_path):
+        # 前回の IR と比較し、変わったセリフだけを合成する
+        print(f"Parsing script: {script_path}")
+        ir, changes = update_project_ir(project_dir, save=False)
+        print_changes(changes)
+        scenes_data = scenes_from_ir(ir)
+
+    if changed_only:
+        # 台本にセリフのないシーン (TitleScene など) は差分では選べないので、まだ動画がなければ描く
+        script_keys = {s["key"] for s in ir["scenes"]} if ir else set()
+        output_dir = get_output_dir(project_dir, res_folder(get_preset(quality)))
+        scenes = [scene for scene in scenes
+                  if scene_key(scene) in changes
+                  or (scene_key(scene) not in script_keys
+                      and not os.path.exists(os.path.join(output_dir, f"{scene}.mp4")))]
+
+    # 音声待ちのシーン: キー -> Scene クラス名のリスト
+    waiting = {}
+    ready = []
+    for scene in scenes:
+        key = scene_key(scene)
+        if key in scenes_data:
+            waiting.setdefault(key, []).append(scene)
+        else:
+            ready.append(scene)
+
+    print(f"Target Project: {project_name}")
+    print(f"Target Scenes ({len(scenes)}): {scenes}")
+    print(f"Quality: {quality}")
+    print("-" * 40)
+
+    start_time = time.time()
+    pending = {}
+
+    num_processes = get_num_processes(len(scenes))
+    encoder_threads = get_encoder_threads(num_processes)
+
+    with multiprocessing.Pool(processes=num_processes) as pool:
+        def submit(scene):
+            pending[scene] = pool.apply_async(run_render, (project_name, scene, quality),
+                                              {"encoder_threads": encoder_threads})
+
+        for scene in ready:
+            submit(scene)
+
+        # 音声合成はメインスレッドで順に行い、シーン単位でレンダリングへ流す
+        if scenes_data:
+            os.makedirs(audio_dir, exist_ok=True)
+            audio_map = load_previous_audio_map(project_dir)
+            for key, dialogues in scenes_data.items():
+                audio_map[key] = synthesize_scene(key, dialogues, audio_dir, audio_map.get(key))
+                save_audio_map(project_dir, audio_map)
+                for scene in waiting.pop(key, []):
+                    submit(scene)
+            # 合成に失敗したセリフは保存しない (次回もそのシーンを差分として再レンダリングする)
+            save_ir(project_dir, with_audio_only(ir, audio_map))
+
+        results = {scene: result.get() for scene, result in pending.items()}
+
+    print("-" * 40)
+    print("Results:", [results[scene] for scene in scenes if scene in results])
+    print(f"Render stage finished in {time.time() - start_time:.1f}s")
+
+    return concat_videos(project_name, quality)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Script -> audio -> render -> concat pipeline for a project")
+    parser.add_argument("project_name", help="Name of the project folder in 'projects/'")
+    parser.add_argument("--quality", "-q", default="-qm", help="Render preset (tools/render_presets.json) or manim flag")
+    parser.add_argument("--skip-audio", action="store_true", help="Use the existing audio_map.json instead of synthesising")
+    parser.add_argument("--changed-only", action="store_true", help="Render only scenes whose script lines changed since the last run")
+    args = parser.parse_args()
+
+    project_dir = os.path.join(PROJECTS_DIR, args.project_name)
+    if not os.path.exists(os.path.join(project_dir, "animation.py")):
+        print(f"Error: animation.py not found in {project_dir}")
+        return
+    if args.changed_only and args.skip_audio:
+        # 差分は音声合成のときに台本の IR と比べて求めるので、音声を飛ばすと何も選べない
+        parser.error("--changed-only cannot be combined with --skip-audio")
+
+    run_pipeline(args.project_name, args.quality, args.skip_audio, args.changed_only)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support() # Windowsでのmultiprocessing対策
+    main()
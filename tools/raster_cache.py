@@ -0,0 +1,83 @@
+"""
+静止したベクターグループのラスタライズ結果 (レイヤー)
+====================================================
+
+カードを並べたパネルやルーンの輪のように、パスの多いグループが画面に残ったまま
+別のアニメーションが進むと、Cairo のカメラは毎フレームすべてのベジェパスを塗り直す。
+layered_render.py / dirty_render.py は、play の間動かないグループを出力解像度の
+透明なレイヤーに 1 回だけラスタライズし、以降のフレームではそのレイヤーを重ねるだけにする。
+
+  FrozenLayer      1 つのグループのラスタライズ済みレイヤー (rasterize / composite / release)
+  layer_signature  グループの子孫の点列・色・線幅と、カメラのフレーム位置・解像度のハッシュ。
+                   同じハッシュならレイヤーを使い回せる
+
+レイヤーはフレームと同じ大きさの RGBA 配列なので、1080p で 1 グループあたり約 8MB 使う。
+"""
+
+import hashlib
+
+import cairo
+import numpy as np
+
+# ハッシュに含める描画に関わる属性
+STYLE_ATTRS = (
+    "points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas",
+    "stroke_width", "background_stroke_width", "sheen_factor", "sheen_direction",
+    "joint_type", "cap_style", "z_index", "pixel_array",
+)
+
+
+class FrozenLayer:
+    """1 つのグループのラスタライズ済みレイヤー"""
+
+    def __init__(self):
+        self.pixels = None
+        self.surface = None
+        self.signature = None  # レイヤーを作ったときのハッシュ
+
+    def release(self, camera=None):
+        if camera is not None and self.pixels is not None:
+            camera.pixel_array_to_cairo_context.pop(id(self.pixels), None)
+        self.pixels = None
+        self.surface = None
+        self.signature = None
+
+    def composite(self, camera):
+        """レイヤーをカメラのフレームに重ねる"""
+        ctx = camera.get_cairo_context(camera.pixel_array)
+        ctx.save()
+        ctx.identity_matrix()
+        ctx.set_source_surface(self.surface, 0, 0)
+        ctx.paint()
+        ctx.restore()
+
+    def rasterize(self, camera, members, signature):
+        if self.pixels is None or self.pixels.shape != camera.pixel_array.shape:
+            self.pixels = np.zeros_like(camera.pixel_array)
+        else:
+            self.pixels[:] = 0
+        # Cairo のコンテキストはフレームの変換込みで配列ごとにキャッシュされるので、作り直させる
+        camera.pixel_array_to_cairo_context.pop(id(self.pixels), None)
+        camera.display_multiple_vectorized_mobjects(members, self.pixels)
+        camera.pixel_array_to_cairo_context.pop(id(self.pixels), None)
+        height, width = self.pixels.shape[:2]
+        self.surface = cairo.ImageSurface.create_for_data(self.pixels, cairo.FORMAT_ARGB32, width, height)
+        self.signature = signature
+
+
+def layer_signature(camera, members):
+    """描画結果を決める値のハッシュ"""
+    digest = hashlib.blake2b(digest_size=16)
+    frame = (camera.pixel_width, camera.pixel_height, camera.frame_width, camera.frame_height,
+             tuple(np.asarray(camera.frame_center, dtype=float).tolist()))
+    digest.update(repr(frame).encode())
+    for member in members:
+        digest.update(type(member).__name__.encode())
+        for attr in STYLE_ATTRS:
+            value = member.__dict__.get(attr)
+            if isinstance(value, np.ndarray):
+                digest.update(repr(value.shape).encode())
+                digest.update(np.ascontiguousarray(value).tobytes())
+            else:
+                digest.update(repr(value).encode())
+    return digest.digest()
@@ -0,0 +1,421 @@
+"""
+レンダーファーム (コーディネーター / ワーカー)
+============================================
+
+render_parallel.py は 1 台のマシンの multiprocessing しか使えない。ここでは
+コーディネーターが (プロジェクト, シーン, プリセット) のジョブキューを HTTP で公開し、
+複数マシンのワーカーがジョブを取ってレンダリングし、MP4 と付随ファイル・所要時間を送り返す。
+
+  コーディネーター  ジョブの払い出し・ハートビート監視・失敗時の再投入・MP4 と付随ファイルの受け取り
+  ワーカー          ジョブを取得 -> run_render -> 付随ファイルと MP4 をアップロード -> 完了報告
+                    (レンダリング中は一定間隔でハートビートを送る)
+
+ハートビートが HEARTBEAT_TIMEOUT 秒途絶えたジョブ、またはワーカーが失敗を報告したジョブは
+MAX_ATTEMPTS 回まで再投入する。ワーカーは同じリポジトリ (projects/ と音声) を持っている前提。
+付随ファイル (字幕 .srt / .vtt / .ass、.subtitles.json、.timeline.json) も MP4 の隣に置くので、
+コーディネーター側の結合 (--concat) や字幕の書き直しはローカルでレンダリングしたときと同じように動く。
+
+プロトコル (JSON over HTTP):
+  POST /claim              {"worker"} -> {"job": {...}} / {"job": null} / {"done": true}
+  POST /jobs/<id>/heartbeat {"worker"}
+  PUT  /jobs/<id>/sidecar  付随ファイルのバイト列 (X-Worker, X-Sidecar: ".srt" などのヘッダー)
+  PUT  /jobs/<id>/video    MP4 のバイト列 (X-Worker ヘッダー)
+  POST /jobs/<id>/complete {"worker", "status", "elapsed"}
+  GET  /status             全ジョブの状態
+
+Usage:
+  python tools/render_farm.py coordinator <project_name> -q final --port 8765 --concat
+  python tools/render_farm.py worker http://<coordinator-host>:8765 --jobs 2
+  (1 台で試すときは両方を localhost で起動する)
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from render_parallel import (
+    PROJECTS_DIR, QUALITY, get_scenes_from_file, get_output_dir, run_render, concat_videos,
+)
+from render_presets import get_preset, res_folder
+from subtitle_track import SUBTITLE_FORMATS, CUES_SUFFIX
+
+DEFAULT_PORT = 8765
+# ワーカーがハートビートを送る間隔と、途絶えたとみなすまでの秒数
+HEARTBEAT_INTERVAL = 10
+HEARTBEAT_TIMEOUT = 60
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 2
+# MP4 と一緒に送る付随ファイル (<SceneName><suffix>)
+SIDECAR_SUFFIXES = (".timeline.json", CUES_SUFFIX) + tuple(f".{fmt}" for fmt in SUBTITLE_FORMATS)
+
+
+def video_path_for(job):
+    """ジョブの出力先 (render_parallel.py と同じ場所)"""
+    project_dir = os.path.join(PROJECTS_DIR, job["project"])
+    folder = res_folder(get_preset(job["quality"]))
+    return os.path.join(get_output_dir(project_dir, folder), f"{job['scene']}.mp4")
+
+
+def sidecar_paths(video_path):
+    """動画の隣の付随ファイル {suffix: path}"""
+    base_path = os.path.splitext(video_path)[0]
+    return {suffix: base_path + suffix for suffix in SIDECAR_SUFFIXES}
+
+
+class Coordinator:
+    """ジョブキューの状態を持つ。HTTP ハンドラーから複数スレッドで呼ばれる"""
+
+    def __init__(self, jobs, heartbeat_timeout=HEARTBEAT_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.jobs = {job["id"]: job for job in jobs}
+        self.order = [job["id"] for job in jobs]
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    @classmethod
+    def for_project(cls, project_name, quality, scenes=None, **kwargs):
+        file_path = os.path.join(PROJECTS_DIR, project_name, "animation.py")
+        scenes = scenes or get_scenes_from_file(file_path)
+        jobs = [{
+            "id": str(i),
+            "project": project_name,
+            "scene": scene,
+            "quality": quality,
+            "status": "queued",
+            "worker": None,
+            "attempts": 0,
+            "heartbeat": None,
+            "elapsed": None,
+            "received": False,
+            "sidecars": [],
+        } for i, scene in enumerate(scenes)]
+        return cls(jobs, **kwargs)
+
+    def claim(self, worker):
+        with self.lock:
+            self._requeue_stale()
+            for job_id in self.order:
+                job = self.jobs[job_id]
+                if job["status"] == "queued":
+                    job.update(status="running", worker=worker, heartbeat=time.time(),
+                               received=False, sidecars=[])
+                    job["attempts"] += 1
+                    print(f"[{job['scene']}] -> {worker} (attempt {job['attempts']})")
+                    return {"job": self._public(job)}
+            if self._all_finished():
+                return {"done": True}
+            return {"job": None}
+
+    def heartbeat(self, job_id, worker):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["worker"] != worker or job["status"] != "running":
+                return False
+            job["heartbeat"] = time.time()
+            return True
+
+    def store_video(self, job_id, worker, data):
+        """アップロードされた MP4 を出力先にアトミックに書き込む"""
+        job = self._running_job(job_id, worker)
+        if job is None:
+            return False
+        _write_atomic(video_path_for(job), data)
+        with self.lock:
+            job["received"] = True
+        return True
+
+    def store_sidecar(self, job_id, worker, suffix, data):
+        """アップロードされた付随ファイルを MP4 の隣にアトミックに書き込む"""
+        if suffix not in SIDECAR_SUFFIXES:
+            return False
+        job = self._running_job(job_id, worker)
+        if job is None:
+            return False
+        _write_atomic(sidecar_paths(video_path_for(job))[suffix], data)
+        with self.lock:
+            job["sidecars"].append(suffix)
+        return True
+
+    def _running_job(self, job_id, worker):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["worker"] != worker or job["status"] != "running":
+                return None
+            return job
+
+    def complete(self, job_id, worker, status, elapsed):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["worker"] != worker or job["status"] != "running":
+                return False
+            job["elapsed"] = elapsed
+            if status == "SUCCESS" and job["received"]:
+                job["status"] = "done"
+                # 今回送られてこなかった付随ファイルは前のレンダリングの残りなので消す
+                for suffix, path in sidecar_paths(video_path_for(job)).items():
+                    if suffix not in job["sidecars"] and os.path.exists(path):
+                        os.remove(path)
+                print(f"[{job['scene']}] done by {worker} in {elapsed:.1f}s")
+            else:
+                self._fail(job, f"{status} on {worker}")
+            if self._all_finished():
+                self.finished.set()
+            return True
+
+    def check(self):
+        """ハートビートの途絶えたジョブを再投入する (監視スレッドから呼ぶ)"""
+        with self.lock:
+            self._requeue_stale()
+            if self._all_finished():
+                self.finished.set()
+
+    def status(self):
+        with self.lock:
+            return [self._public(self.jobs[job_id]) for job_id in self.order]
+
+    def _requeue_stale(self):
+        now = time.time()
+        for job in self.jobs.values():
+            if job["status"] == "running" and now - job["heartbeat"] > self.heartbeat_timeout:
+                self._fail(job, f"heartbeat lost from {job['worker']}")
+
+    def _fail(self, job, reason):
+        if job["attempts"] < self.max_attempts:
+            job.update(status="queued", worker=None)
+            print(f"[{job['scene']}] requeued ({reason})")
+        else:
+            job["status"] = "failed"
+            print(f"[{job['scene']}] failed after {job['attempts']} attempts ({reason})")
+
+    def _all_finished(self):
+        return all(job["status"] in ("done", "failed") for job in self.jobs.values())
+
+    @staticmethod
+    def _public(job):
+        return {k: v for k, v in job.items() if k not in ("heartbeat", "received", "sidecars")}
+
+
+def _write_atomic(dest, data):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dest)
+
+
+class FarmHandler(BaseHTTPRequestHandler):
+    """コーディネーターの HTTP エンドポイント (self.server.coordinator を使う)"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, data, code=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_route(self):
+        """/jobs/<id>/<action> -> (id, action)"""
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "jobs":
+            return parts[1], parts[2]
+        return None, None
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send_json({"jobs": self.server.coordinator.status()})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        coordinator = self.server.coordinator
+        payload = json.loads(self._read_body() or b"{}")
+        if self.path == "/claim":
+            self._send_json(coordinator.claim(payload["worker"]))
+            return
+        job_id, action = self._job_route()
+        if action == "heartbeat":
+            ok = coordinator.heartbeat(job_id, payload["worker"])
+        elif action == "complete":
+            ok = coordinator.complete(job_id, payload["worker"], payload["status"], payload.get("elapsed") or 0.0)
+        else:
+            self._send_json({"error": "not found"}, 404)
+            return
+        self._send_json({"ok": ok}, 200 if ok else 409)
+
+    def do_PUT(self):
+        coordinator = self.server.coordinator
+        job_id, action = self._job_route()
+        worker = self.headers.get("X-Worker")
+        if action == "video":
+            ok = coordinator.store_video(job_id, worker, self._read_body())
+        elif action == "sidecar":
+            ok = coordinator.store_sidecar(job_id, worker, self.headers.get("X-Sidecar"), self._read_body())
+        else:
+            self._send_json({"error": "not found"}, 404)
+            return
+        self._send_json({"ok": ok}, 200 if ok else 409)
+
+
+def serve(coordinator, host="0.0.0.0", port=DEFAULT_PORT):
+    """全ジョブが終わるまでコーディネーターを動かし、ジョブの状態を返す"""
+    server = ThreadingHTTPServer((host, port), FarmHandler)
+    server.coordinator = coordinator
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Coordinator listening on {host}:{server.server_address[1]} ({len(coordinator.jobs)} jobs)")
+
+    try:
+        while not coordinator.finished.wait(HEARTBEAT_INTERVAL):
+            coordinator.check()
+        # ワーカーが {"done": true} を受け取って終了できるよう少し待つ
+        time.sleep(POLL_INTERVAL * 2)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return coordinator.status()
+
+
+# ============================================================================
+# ワーカー
+# ============================================================================
+
+def _request(url, data=None, method="POST", headers=None, timeout=30):
+    headers = dict(headers or {})
+    if isinstance(data, (dict, list)):
+        data = json.dumps(data).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(url, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b"{}")
+
+
+def work_on(base_url, worker, job):
+    """1 ジョブをレンダリングし、ハートビート・アップロード・完了報告を行う"""
+    job_url = f"{base_url}/jobs/{job['id']}"
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                _request(f"{job_url}/heartbeat", {"worker": worker})
+            except OSError:
+                pass
+
+    beater = threading.Thread(target=beat, daemon=True)
+    beater.start()
+    start_time = time.time()
+    try:
+        status = run_render(job["project"], job["scene"], job["quality"])
+    except Exception as e:
+        print(f"[{job['scene']}] {type(e).__name__}: {e}")
+        status = "FAILED"
+    finally:
+        stop.set()
+    elapsed = time.time() - start_time
+
+    if status == "SUCCESS":
+        video_path = video_path_for(job)
+        # 付随ファイルを先に送る (MP4 の受け取りが完了の条件なので最後に送る)
+        uploads = [(f"{job_url}/sidecar", path, {"X-Sidecar": suffix})
+                   for suffix, path in sidecar_paths(video_path).items() if os.path.exists(path)]
+        uploads.append((f"{job_url}/video", video_path, {"Content-Type": "video/mp4"}))
+        for url, path, headers in uploads:
+            with open(path, "rb") as f:
+                result = _request(url, f.read(), method="PUT", headers=dict(headers, **{"X-Worker": worker}),
+                                  timeout=300)
+            if not result.get("ok"):
+                status = "UPLOAD_REJECTED"
+                break
+    _request(f"{job_url}/complete", {"worker": worker, "status": status, "elapsed": elapsed})
+    return status
+
+
+def run_worker(base_url, name=None, jobs=1):
+    """コーディネーターのジョブがなくなるまでレンダリングする (jobs 個を並行)"""
+    base_url = base_url.rstrip("/")
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+
+    def loop(slot):
+        worker = f"{name}/{slot}"
+        while True:
+            try:
+                reply = _request(f"{base_url}/claim", {"worker": worker})
+            except OSError:
+                # コーディネーターが終了済み (または一時的に不通)
+                print(f"{worker}: coordinator unreachable, stopping")
+                return
+            if reply.get("done"):
+                return
+            job = reply.get("job")
+            if job is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            work_on(base_url, worker, job)
+
+    threads = [threading.Thread(target=loop, args=(slot,)) for slot in range(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinator/worker render farm for Manim projects")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    coord = sub.add_parser("coordinator", help="Serve the job queue for a project")
+    coord.add_argument("project_name", help="Name of the project folder in 'projects/'")
+    coord.add_argument("--quality", "-q", default=QUALITY, help="Render preset or manim flag")
+    coord.add_argument("--scenes", "-s", nargs="+", help="Specific scenes to render (default: all)")
+    coord.add_argument("--host", default="0.0.0.0")
+    coord.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coord.add_argument("--concat", action="store_true", help="Run ffmpeg concat when every job is done")
+
+    work = sub.add_parser("worker", help="Pull jobs from a coordinator and render them")
+    work.add_argument("coordinator", help="Coordinator URL, e.g. http://localhost:8765")
+    work.add_argument("--name", help="Worker name (default: <hostname>-<pid>)")
+    work.add_argument("--jobs", "-j", type=int, default=1, help="Jobs rendered concurrently on this worker")
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        run_worker(args.coordinator, args.name, args.jobs)
+        return
+
+    coordinator = Coordinator.for_project(args.project_name, args.quality, args.scenes)
+    if not coordinator.jobs:
+        print("No scenes found in animation.py")
+        return
+    start_time = time.time()
+    jobs = serve(coordinator, args.host, args.port)
+
+    print("-" * 40)
+    for job in jobs:
+        elapsed = f"{job['elapsed']:.1f}s" if job["elapsed"] is not None else "-"
+        print(f"{job['scene']:<24} {job['status']:<7} {elapsed:>8}  {job['worker'] or ''} (attempts {job['attempts']})")
+    print(f"Farm finished in {time.time() - start_time:.1f}s")
+
+    if args.concat and all(job["status"] == "done" for job in jobs):
+        concat_videos(args.project_name, args.quality)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,35 +4,125 @@ import multiprocessing
 import time
 import shutil
 import argparse
-import re
 import sys
+import glob
 
-# デフォルト設定
+from audio_timeline import mux, timeline_path_for
+from subtitle_track import export_scene, merge_scenes, write_tracks, script_lines, refresh_scene
+from themes import THEME_ENV, VARIANTS_ENV, variant_path_for
+from multi_output import OUTPUTS_ENV
+from render_presets import PRESET_ENV, THREADS_ENV, PIPE_ENV, MEMORY_ENV, RENDER_MODE_ENV, SUBTITLES_ENV, get_preset, res_folder, manim_args
+from scene_index import discover_scenes
+from subtitle_atlas import uses_atlas, build_atlas
+from run_manifest import (
+    load_manifest, save_manifest, log_path_for, file_sha1, is_transient, read_log_tail, scenes_to_resume,
+    render_settings,
+)
+
+# デフォルト設定 (tools/render_presets.json のプリセット名か manim の品質フラグ)
 QUALITY = "-qm"  # -qm: 720p30, -qh: 1080p60
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
 OUTPUTS_DIR = os.path.join(BASE_DIR, "outputs")
+# Scene.render にフックを差し込んでから manim を起動するラッパー
+RENDER_SCENE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_scene.py")
+# 一時的な失敗の再試行回数
+RETRIES = 2
+# 失敗時に表示するログの行数
+ERROR_LOG_LINES = 30
 
 def get_scenes_from_file(file_path):
-    """ファイル内のSceneクラス定義を正規表現で抽出する"""
-    scenes = []
-    if not os.path.exists(file_path):
-        return []
+    """ファイル内のSceneクラスをソース順に返す (ast で解析し、manim は import しない)"""
+    return [scene["name"] for scene in discover_scenes(file_path)]
+
+def order_by_runtime(file_path, scenes):
+    """推定尺の長いシーンから先に投入する (最後に長いシーンだけが残るのを防ぐ)"""
+    runtimes = {scene["name"]: scene["estimated_runtime"] for scene in discover_scenes(file_path)}
+    return sorted(scenes, key=lambda scene: -runtimes.get(scene, 0.0))
+
+def get_num_processes(num_jobs):
+    """並列レンダリングのプロセス数 (最大4)"""
+    return max(1, min(multiprocessing.cpu_count(), 4, num_jobs))
+
+def get_encoder_threads(num_processes):
+    """1 ジョブの ffmpeg に割り当てるスレッド数 (レンダリング自体の 1 コアを除いた残りを等分)"""
+    return max(1, multiprocessing.cpu_count() // num_processes - 1)
+
+def get_output_dir(project_dir, res_folder, theme=None):
+    """レンダリング結果の置き場所 (テーマ指定時はテーマ名のサブフォルダ)"""
+    output_dir = os.path.join(project_dir, "media", "videos", "animation", res_folder)
+    if theme:
+        output_dir = os.path.join(output_dir, theme)
+    return output_dir
+
+def move_output(src_video, timeline_path, dest_video):
+    """動画を出力先に移す。字幕音声のタイムラインがあれば 1 本のトラックにミックスして mux
+
+    タイムラインに字幕があれば、動画の隣に <SceneName>.srt / .vtt / .ass も書き出す。
+    """
+    os.makedirs(os.path.dirname(dest_video), exist_ok=True)
+    if os.path.exists(timeline_path) and mux(src_video, timeline_path, dest_video):
+        os.remove(src_video)
+    else:
+        shutil.move(src_video, dest_video)
+    export_scene(timeline_path, dest_video)
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-        # class SceneName(Scene): または class SceneName(MovingCameraScene): などを検出
-        # 継承元の括弧内に 'Scene' が含まれるものを対象とする
-        matches = re.findall(r"class\s+(\w+)\s*\(.*Scene.*\):", content)
-        scenes = matches
-    return scenes
+def find_rendered_video(temp_media_dir, scene_name, since, exclude_folders=()):
+    """manim が実際に書き出した動画を探す (partial_movie_files と追加の出力は除く)"""
+    pattern = os.path.join(temp_media_dir, "videos", "*", "*", f"{scene_name}.mp4")
+    candidates = [
+        path for path in glob.glob(pattern)
+        if os.path.basename(os.path.dirname(path)) not in exclude_folders
+        and os.path.getmtime(path) >= since
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
 
 def run_render_wrapper(args):
     """multiprocessing用のラッパー関数"""
-    return run_render(*args)
+    return render_with_retry(*args)
+
+def run_render(project_name, scene_name, quality, theme=None, variants=None, extras=None,
+               pipe=True, encoder_threads=None, memory=False, render_mode=None, soft_subtitles=False):
+    """単一のシーンをレンダリングし、ステータス文字列を返す"""
+    return render_scene(project_name, scene_name, quality, theme, variants, extras,
+                        pipe, encoder_threads, memory=memory, render_mode=render_mode,
+                        soft_subtitles=soft_subtitles)["status"]
+
+def render_with_retry(project_name, scene_name, quality, theme=None, variants=None, extras=None,
+                      pipe=True, encoder_threads=None, retries=RETRIES, memory=False, render_mode=None,
+                      soft_subtitles=False):
+    """一時的な失敗なら retries 回まで再試行し、マニフェスト用の結果を返す"""
+    for attempt in range(1, retries + 2):
+        record = render_scene(project_name, scene_name, quality, theme, variants, extras,
+                              pipe, encoder_threads, attempt, memory, render_mode, soft_subtitles)
+        if record["status"] == "SUCCESS" or attempt > retries or not is_transient(record):
+            break
+        print(f"Retrying: {scene_name} (attempt {attempt + 1}, transient {record['status']})")
+
+    record["attempts"] = attempt
+    record["sha1"] = file_sha1(record["output"]) if record["status"] == "SUCCESS" else None
+    record["extra_outputs"] = {path: file_sha1(path) for path in record["extra_outputs"]} \
+        if record["status"] == "SUCCESS" else {}
+    return record
+
+def render_scene(project_name, scene_name, quality, theme=None, variants=None, extras=None,
+                 pipe=True, encoder_threads=None, attempt=1, memory=False, render_mode=None,
+                 soft_subtitles=False):
+    """単一のシーンをレンダリングする関数 (結果の dict を返す)
 
-def run_render(project_name, scene_name, quality):
-    """単一のシーンをレンダリングする関数"""
+    theme: 使用するテーマ (tools/themes.json)。variants: 同じプロセスで追加で書き出すテーマ
+    quality / extras: render_presets のプリセット名・品質フラグ・"1280x720@30"
+    extras は同じ construct から追加で書き出す
+    pipe: フレームを ffmpeg に直接流す (False なら manim 標準の partial movie file)
+    encoder_threads: ffmpeg 1 プロセスあたりのスレッド数
+    memory: memory mode で実行する (計測結果は media/logs/<SceneName>.memory.json)
+    render_mode: "layered" なら静止した背景・レイヤーをキャッシュして描く (media/logs/<SceneName>.layers.json)
+                 "dirty" なら加えて変わった矩形だけを描き直す
+    soft_subtitles: 字幕を焼き込まず、字幕ファイル (.srt / .vtt / .ass) だけを書き出す
+    manim の出力は media/logs/<SceneName>.log に保存する (再試行時は追記)
+    """
     
     project_dir = os.path.join(PROJECTS_DIR, project_name)
     file_path = os.path.join(project_dir, "animation.py")
@@ -41,56 +131,127 @@ def run_render(project_name, scene_name, quality):
     temp_media_dir = os.path.join(project_dir, "temp_media", scene_name)
     os.makedirs(temp_media_dir, exist_ok=True)
     
+    preset = get_preset(quality)
+    extra_presets = [get_preset(q) for q in extras or []]
+    
     print(f"Starting: {scene_name}")
     start_time = time.time()
     
     # --media_dir を指定して完全に分離
-    cmd = ["manim", "render", quality, "--media_dir", temp_media_dir, file_path, scene_name]
+    cmd = [sys.executable, RENDER_SCENE, "render", *manim_args(preset),
+           "--media_dir", temp_media_dir, file_path, scene_name]
     
     # 既存の環境変数にMiKTeXパスを追加
     env = os.environ.copy()
     miktex_bin = r"C:\Users\81804\AppData\Local\Programs\MiKTeX\miktex\bin\x64"
     if miktex_bin not in env["PATH"]:
         env["PATH"] += f";{miktex_bin}"
+    # テーマはシーン側で tools/themes.py が環境変数から読む
+    if theme:
+        env[THEME_ENV] = theme
+    if variants:
+        env[VARIANTS_ENV] = ",".join(variants)
+    env[PRESET_ENV] = quality
+    env[PIPE_ENV] = "1" if pipe else "0"
+    if encoder_threads:
+        env[THREADS_ENV] = str(encoder_threads)
+    if extras:
+        env[OUTPUTS_ENV] = ",".join(extras)
+    if memory:
+        env[MEMORY_ENV] = "1"
+    if render_mode:
+        env[RENDER_MODE_ENV] = render_mode
+    if soft_subtitles:
+        env[SUBTITLES_ENV] = "1"
     
-    # 出力をリアルタイム表示
-    result = subprocess.run(cmd, env=env, capture_output=False, text=True)
+    # 出力はシーンごとのログファイルへ (並列実行で混ざらないように)
+    log_path = log_path_for(project_dir, scene_name)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "w" if attempt == 1 else "a", encoding="utf-8") as log:
+        log.write(f"=== attempt {attempt}: {' '.join(cmd)}\n")
+        log.flush()
+        result = subprocess.run(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
     
     elapsed = time.time() - start_time
     status = "SUCCESS" if result.returncode == 0 else "FAILED"
+    dest_video = None
+    extra_outputs = []
     
     if status == "SUCCESS":
         # 生成された動画を本来の場所に移動
         # 構造: temp_media/SceneName/videos/animation/720p30/SceneName.mp4
-        res_folder = "720p30" if quality == "-qm" else "1080p60"
-        
-        src_video = os.path.join(temp_media_dir, "videos", "animation", res_folder, f"{scene_name}.mp4")
+        # フォルダ名は決め打ちせず、manim が実際に書いたファイルから得る
+        extra_folders = {res_folder(p) for p in extra_presets} - {res_folder(preset)}
+        src_video = find_rendered_video(temp_media_dir, scene_name, start_time, extra_folders)
         
-        # プロジェクト内のmedia/videosに出力
-        # projects/<project_name>/media/videos/animation/<quality>
-        dest_dir = os.path.join(project_dir, "media", "videos", "animation", res_folder)
-        os.makedirs(dest_dir, exist_ok=True)
-        dest_video = os.path.join(dest_dir, f"{scene_name}.mp4")
-        
-        if os.path.exists(src_video):
-            shutil.move(src_video, dest_video)
+        if src_video is not None:
+            main_folder = os.path.basename(os.path.dirname(src_video))
+            # プロジェクト内のmedia/videosに出力
+            # projects/<project_name>/media/videos/animation/<quality>[/<theme>]
+            dest_video = os.path.join(get_output_dir(project_dir, main_folder, theme), f"{scene_name}.mp4")
+            
+            # 追加テーマの動画も同じ音声タイムラインで mux する
+            timeline_path = timeline_path_for(src_video)
+            for variant in variants or []:
+                variant_video = variant_path_for(src_video, variant)
+                if os.path.exists(variant_video):
+                    variant_dest = os.path.join(get_output_dir(project_dir, main_folder, variant), f"{scene_name}.mp4")
+                    move_output(variant_video, timeline_path, variant_dest)
+                    extra_outputs.append(variant_dest)
+            # 追加の解像度は manim と同じ命名の兄弟フォルダに書かれている
+            for extra_folder in extra_folders:
+                extra_video = os.path.join(os.path.dirname(os.path.dirname(src_video)), extra_folder, f"{scene_name}.mp4")
+                if os.path.exists(extra_video):
+                    extra_dest = os.path.join(get_output_dir(project_dir, extra_folder, theme), f"{scene_name}.mp4")
+                    move_output(extra_video, timeline_path, extra_dest)
+                    extra_outputs.append(extra_dest)
+            move_output(src_video, timeline_path, dest_video)
         else:
-            print(f"Warning: Video file not found at {src_video}")
+            print(f"Warning: No video for {scene_name} found under {temp_media_dir}")
             status = "MISSING_FILE"
 
     print(f"Finished: {scene_name} ({status}) in {elapsed:.1f}s")
     if result.returncode != 0:
-        print(f"--- Error Log for {scene_name} ---")
-        print(result.stderr)
+        print(f"--- Error Log for {scene_name} ({log_path}) ---")
+        print("\n".join(read_log_tail(log_path).splitlines()[-ERROR_LOG_LINES:]))
         print("--------------------------------")
     
-    return status
+    return {
+        "scene": scene_name,
+        "status": status,
+        "returncode": result.returncode,
+        **render_settings(quality, theme, render_mode, soft_subtitles, variants, extras),
+        "output": dest_video,
+        "extra_outputs": extra_outputs,
+        "log": log_path,
+        "elapsed": round(elapsed, 2),
+    }
 
 def main():
     parser = argparse.ArgumentParser(description="Parallel render script for Manim projects")
     parser.add_argument("project_name", help="Name of the project folder in 'projects/'")
-    parser.add_argument("--quality", "-q", default="-qm", help="Render quality (-qm or -qh)")
+    parser.add_argument("--quality", "-q", default=QUALITY,
+                        help="Render preset in tools/render_presets.json, a manim flag (-ql/-qm/-qh/-qp/-qk) or WxH@fps")
     parser.add_argument("--scenes", "-s", nargs="+", help="Specific scenes to render (default: all)")
+    parser.add_argument("--concat", action="store_true", help="Run ffmpeg concat after rendering")
+    parser.add_argument("--theme", help="Theme in tools/themes.json (default: the project's own)")
+    parser.add_argument("--variants", nargs="+", default=[], help="Extra themes rendered from the same construct")
+    parser.add_argument("--manim-encoder", action="store_true",
+                        help="Use manim's partial movie files instead of piping frames to ffmpeg")
+    parser.add_argument("--resume", action="store_true",
+                        help="Render only scenes that failed, are missing or changed since the last run")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retries for transient failures")
+    parser.add_argument("--extra-quality", "-x", nargs="+", default=[],
+                        help="Extra presets encoded from the same construct (e.g. -x preview alongside -q final)")
+    parser.add_argument("--memory-mode", action="store_true",
+                        help="Track memory per animation and drop references to faded-out mobjects")
+    parser.add_argument("--render-mode", choices=["standard", "layered", "dirty"], default="standard",
+                        help="layered: cache static backgrounds and layers across frames and report the speedup; "
+                             "dirty: layered plus redrawing only the changed rectangle")
+    parser.add_argument("--soft-subtitles", action="store_true",
+                        help="Do not burn subtitles into the video; only write .srt/.vtt/.ass next to it")
+    parser.add_argument("--refresh-subtitles", action="store_true",
+                        help="Rewrite the .srt/.vtt/.ass of rendered scenes from the current script.md without rendering")
     args = parser.parse_args()
 
     project_dir = os.path.join(PROJECTS_DIR, args.project_name)
@@ -104,6 +265,13 @@ def main():
         print(f"Error: animation.py not found in {project_dir}")
         return
 
+    if args.refresh_subtitles:
+        outputs = [(args.quality, None)] + [(q, res_folder(get_preset(q))) for q in args.extra_quality]
+        for theme in [args.theme] + args.variants:
+            for quality, tag in outputs:
+                refresh_subtitles(args.project_name, quality, theme, tag)
+        return
+
     # シーンの自動検出
     if args.scenes:
         scenes = args.scenes
@@ -113,45 +281,83 @@ def main():
             print("No scenes found in animation.py")
             return
 
+    manifest = load_manifest(project_dir)
+    if args.resume:
+        skipped = len(scenes)
+        render_mode = None if args.render_mode == "standard" else args.render_mode
+        scenes = scenes_to_resume(manifest, scenes, render_settings(
+            args.quality, args.theme, render_mode, args.soft_subtitles, args.variants, args.extra_quality))
+        print(f"Resume: {skipped - len(scenes)} scenes up to date")
+
     print(f"Target Project: {args.project_name}")
     print(f"Target Scenes ({len(scenes)}): {scenes}")
     print(f"Quality: {args.quality}")
+    if args.extra_quality:
+        print(f"Extra outputs: {args.extra_quality}")
+    if args.theme or args.variants:
+        print(f"Theme: {args.theme or '(project default)'}  Variants: {args.variants}")
     print("-" * 40)
 
     # 並列処理の実行
-    num_processes = min(multiprocessing.cpu_count(), 4)
-    if len(scenes) < num_processes:
-        num_processes = len(scenes)
+    num_processes = get_num_processes(len(scenes))
+    encoder_threads = get_encoder_threads(num_processes)
+
+    pool_args = [(args.project_name, scene, args.quality, args.theme, args.variants, args.extra_quality,
+                  not args.manim_encoder, encoder_threads, args.retries, args.memory_mode,
+                  None if args.render_mode == "standard" else args.render_mode, args.soft_subtitles)
+                 for scene in order_by_runtime(file_path, scenes)]
 
-    pool_args = [(args.project_name, scene, args.quality) for scene in scenes]
+    # 字幕の吹き出しを先にまとめて描いておく (追加テーマ・追加の解像度・dirty mode では使われない)
+    if pool_args and not (args.soft_subtitles or args.variants or args.extra_quality or args.render_mode == "dirty") \
+            and uses_atlas(project_dir):
+        build_atlas(args.project_name, [args.quality], args.theme)
 
-    with multiprocessing.Pool(processes=num_processes) as pool:
-        results = pool.map(run_render_wrapper, pool_args)
+    # 終わったシーンから順にマニフェストへ書き込む (途中で止まっても --resume できる)
+    results = {}
+    if pool_args:
+        with multiprocessing.Pool(processes=num_processes) as pool:
+            for record in pool.imap_unordered(run_render_wrapper, pool_args):
+                results[record["scene"]] = record
+                manifest.setdefault("scenes", {})[record["scene"]] = record
+                save_manifest(project_dir, manifest)
 
     print("-" * 40)
-    print("Results:", results)
+    print("Results:", [results[scene]["status"] for scene in scenes])
+    failed = [scene for scene in scenes if results[scene]["status"] != "SUCCESS"]
+    if failed:
+        print(f"Failed scenes ({len(failed)}): {failed}")
+        print(f"Logs: {os.path.dirname(log_path_for(project_dir, failed[0]))}  (re-run with --resume)")
     
-    create_concat_list(args.project_name, args.quality)
+    # 追加の出力は解像度をファイル名に付けて結合する (outputs/<project>_720p30.mp4)
+    outputs = [(args.quality, None)] + [(q, res_folder(get_preset(q))) for q in args.extra_quality]
+    for theme in [args.theme] + args.variants:
+        for quality, tag in outputs:
+            if args.concat:
+                concat_videos(args.project_name, quality, theme, tag)
+            else:
+                create_concat_list(args.project_name, quality, theme, tag)
 
-def create_concat_list(project_name, quality):
+def output_name(project_name, theme=None, tag=None):
+    """結合後のファイル名 (<project>[_<theme>][_<tag>].mp4)"""
+    return "_".join([project_name] + [part for part in (theme, tag) if part]) + ".mp4"
+
+def create_concat_list(project_name, quality, theme=None, tag=None):
     """結合用のリストファイルを作成し、ffmpegコマンドを表示する"""
-    res_folder = "720p30" if quality == "-qm" else "1080p60"
-    
-    # プロジェクト内の出力ディレクトリ: projects/<project_name>/media/videos/animation/<quality>
+    # プロジェクト内の出力ディレクトリ: projects/<project_name>/media/videos/animation/<quality>[/<theme>]
     project_dir = os.path.join(PROJECTS_DIR, project_name)
-    output_dir = os.path.join(project_dir, "media", "videos", "animation", res_folder)
+    output_dir = get_output_dir(project_dir, res_folder(get_preset(quality)), theme)
     concat_file = os.path.join(output_dir, "concat_list.txt")
     
     if not os.path.exists(output_dir):
         print(f"Directory not found: {output_dir}")
-        return
+        return None
 
     file_path = os.path.join(project_dir, "animation.py")
     all_scenes = get_scenes_from_file(file_path)
     
     if not all_scenes:
         print("No scenes found in animation.py, cannot create concat list.")
-        return
+        return None
 
     valid_scenes = []
     for scene in all_scenes:
@@ -161,7 +367,7 @@ def create_concat_list(project_name, quality):
     
     if not valid_scenes:
         print("No rendered videos found to concatenate.")
-        return
+        return None
 
     with open(concat_file, "w", encoding="utf-8") as f:
         for scene in valid_scenes:
@@ -170,13 +376,67 @@ def create_concat_list(project_name, quality):
     print(f"Concat list created at: {concat_file}")
     
     # 結合コマンドの表示
-    # outputsフォルダへの相対パス: ../../../../../outputs/<project_name>.mp4
-    # current: projects/project/media/videos/animation/720p30 (5階層下)
-    final_output_path = f"../../../../../outputs/{project_name}.mp4"
+    # outputsフォルダへの絶対パス (テーマ別フォルダでは階層が 1 つ深くなる)
+    final_output_path = os.path.join(OUTPUTS_DIR, output_name(project_name, theme, tag))
     
     print("\nTo concatenate all scenes, run:")
     print(f"cd \"{output_dir}\"")
     print(f"ffmpeg -y -f concat -safe 0 -i concat_list.txt -c copy \"{final_output_path}\"")
+    
+    return concat_file
+
+def concat_videos(project_name, quality, theme=None, tag=None):
+    """結合リストを作成し、ffmpeg で outputs/<project_name>.mp4 に結合する"""
+    concat_file = create_concat_list(project_name, quality, theme, tag)
+    if concat_file is None:
+        return None
+    
+    os.makedirs(OUTPUTS_DIR, exist_ok=True)
+    final_output = os.path.join(OUTPUTS_DIR, output_name(project_name, theme, tag))
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+           "-i", os.path.basename(concat_file), "-c", "copy", final_output]
+    result = subprocess.run(cmd, cwd=os.path.dirname(concat_file))
+    if result.returncode != 0:
+        print("Concatenation failed.")
+        return None
+    
+    print(f"Final video: {final_output}")
+    # 各シーンの字幕をシーンの尺だけずらしてつなげる (outputs/<project>.srt / .vtt / .ass)
+    output_dir = os.path.dirname(concat_file)
+    with open(concat_file, "r", encoding="utf-8") as f:
+        videos = [os.path.join(output_dir, line.strip()[len("file '"):-1]) for line in f if line.strip()]
+    cues = merge_scenes(videos)
+    if cues:
+        for path in write_tracks(cues, os.path.splitext(final_output)[0]):
+            print(f"Subtitles: {path}")
+    return final_output
+
+def refresh_subtitles(project_name, quality, theme=None, tag=None):
+    """レンダリング済みのシーンと結合後の字幕を今の台本の本文で書き出し直す (誤字の修正用)"""
+    project_dir = os.path.join(PROJECTS_DIR, project_name)
+    output_dir = get_output_dir(project_dir, res_folder(get_preset(quality)), theme)
+    if not os.path.exists(output_dir) or not os.path.exists(os.path.join(project_dir, "script.md")):
+        print(f"Nothing to refresh in {output_dir}")
+        return 0
+
+    lines_by_scene = script_lines(project_dir)
+    scenes = [s for s in get_scenes_from_file(os.path.join(project_dir, "animation.py"))
+              if os.path.exists(os.path.join(output_dir, f"{s}.mp4"))]
+    changed = 0
+    for scene in scenes:
+        count = refresh_scene(os.path.join(output_dir, f"{scene}.mp4"), lines_by_scene)
+        if count:
+            print(f"  {scene}: {count} cues updated")
+        changed += count
+
+    final_output = os.path.join(OUTPUTS_DIR, output_name(project_name, theme, tag))
+    if changed and os.path.exists(final_output):
+        cues = merge_scenes([os.path.join(output_dir, f"{scene}.mp4") for scene in scenes])
+        if cues:
+            for path in write_tracks(cues, os.path.splitext(final_output)[0]):
+                print(f"Subtitles: {path}")
+    print(f"Refreshed {changed} cues in {output_dir}")
+    return changed
 
 if __name__ == "__main__":
     multiprocessing.freeze_support() # Windowsでのmultiprocessing対策
@@ -0,0 +1,127 @@
+"""
+レンダリングプリセット
+======================
+
+tools/render_presets.json に解像度・フレームレート・コーデック・CRF/preset/tune・
+GOP・スレッド数・ピクセル形式をデータとして定義する。新しい品質 (例: 480p15 の動作確認用、4K60 の保存用) はコードを
+変えずに JSON に追加するだけでよい。
+
+--quality には次のどれでも渡せる:
+  プリセット名      preview / final / archive ...
+  manim の品質フラグ -ql / -qm / -qh / -qp / -qk (プリセットの "flag")
+  直接指定          1280x720@30 (コーデック設定は既定値)
+
+Usage:
+  python tools/render_presets.py        # プリセット一覧
+"""
+
+import os
+import json
+
+PRESETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_presets.json")
+
+# render_parallel.py がシーンのプロセスに渡すプリセット名・エンコーダーのスレッド数・
+# パイプエンコーダー・memory mode の有効/無効・描画モード・soft subtitles の有効/無効
+# (manim を import しない親プロセスからも参照する)
+PRESET_ENV = "VIBE_PRESET"
+THREADS_ENV = "VIBE_ENCODER_THREADS"
+PIPE_ENV = "VIBE_PIPE_ENCODER"
+MEMORY_ENV = "VIBE_MEMORY_MODE"
+RENDER_MODE_ENV = "VIBE_RENDER_MODE"
+SUBTITLES_ENV = "VIBE_SOFT_SUBTITLES"
+
+# プリセットで省略した項目の既定値 (manim 本体のエンコード設定と同じ)
+DEFAULT_ENCODER = {
+    "codec": "libx264",
+    "preset": "medium",
+    "tune": None,
+    "crf": 23,
+    "gop": None,
+    "threads": None,
+    "pix_fmt": "yuv420p",
+}
+
+_presets = None
+
+
+def load_presets(path=PRESETS_PATH):
+    global _presets
+    if _presets is None:
+        with open(path, "r", encoding="utf-8") as f:
+            _presets = json.load(f)
+    return _presets
+
+
+def _complete(name, preset):
+    result = dict(DEFAULT_ENCODER)
+    result.update(preset)
+    result["name"] = name
+    return result
+
+
+def get_preset(quality):
+    """プリセット名・manim の品質フラグ・"WxH@fps" のいずれかからプリセットを得る"""
+    presets = load_presets()
+    if quality in presets:
+        return _complete(quality, presets[quality])
+    for name, preset in presets.items():
+        if preset.get("flag") == quality:
+            return _complete(name, preset)
+    if "@" in quality and "x" in quality.lower():
+        size, fps = quality.split("@")
+        width, height = size.lower().split("x")
+        return _complete(quality, {"width": int(width), "height": int(height), "fps": int(fps)})
+    raise KeyError(f"Unknown render preset '{quality}'. Available: {', '.join(presets)}")
+
+
+def current_preset():
+    """VIBE_PRESET のプリセット (未設定なら None)"""
+    quality = os.environ.get(PRESET_ENV)
+    return get_preset(quality) if quality else None
+
+
+def res_folder(preset):
+    """manim と同じ出力フォルダ名 (<height>p<fps>)"""
+    return f"{preset['height']}p{preset['fps']}"
+
+
+def manim_args(preset):
+    """manim render に渡す解像度・フレームレートの引数"""
+    return ["-r", f"{preset['width']},{preset['height']}", "--fps", str(preset["fps"])]
+
+
+def encoder_threads(preset):
+    """エンコーダーのスレッド数 (プリセット > VIBE_ENCODER_THREADS > ffmpeg 任せ)"""
+    if preset.get("threads"):
+        return int(preset["threads"])
+    value = os.environ.get(THREADS_ENV)
+    return int(value) if value else None
+
+
+def encoder_args(preset):
+    """ffmpeg の映像エンコード引数"""
+    args = ["-c:v", preset["codec"], "-pix_fmt", preset["pix_fmt"]]
+    if preset.get("preset"):
+        args += ["-preset", str(preset["preset"])]
+    if preset.get("tune"):
+        args += ["-tune", str(preset["tune"])]
+    if preset.get("crf") is not None:
+        args += ["-crf", str(preset["crf"])]
+    if preset.get("gop"):
+        args += ["-g", str(preset["gop"])]
+    threads = encoder_threads(preset)
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+
+def main():
+    for name, preset in load_presets().items():
+        preset = _complete(name, preset)
+        flag = preset.get("flag", "")
+        print(f"{name:<10} {flag:<4} {res_folder(preset):<9} {preset['codec']} preset={preset['preset']} "
+              f"tune={preset['tune']} crf={preset['crf']} gop={preset['gop']}  {preset.get('description', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+manim render のラッパー
+======================
+
+manim の CLI をそのまま実行するが、その前に Scene.render にフックを差し込む。
+render_parallel.py はこのスクリプト経由で manim を起動する。
+
+  - PipeEncoder: VIBE_PIPE_ENCODER=1 なら partial movie file を使わず ffmpeg に直接書き出す
+  - MultiOutput: VIBE_EXTRA_OUTPUTS の追加解像度を同じ construct から書き出す
+  - MemoryMode: VIBE_MEMORY_MODE=1 なら play ごとにメモリを計測し、消えたモブジェクトの参照を手放す
+  - LayeredRenderer: VIBE_RENDER_MODE=layered なら静止した背景・レイヤーをキャッシュして描く
+  - DirtyRectRenderer: VIBE_RENDER_MODE=dirty なら layered に加えて変わった矩形だけを描き直す
+
+Usage:
+  python tools/render_scene.py render -qh projects/<project>/animation.py Scene01_Intro
+"""
+
+import sys
+
+from manim import Scene
+from manim.__main__ import main
+
+from multi_output import MultiOutput
+from pipe_encoder import PipeEncoder, pipe_enabled
+from memory_mode import MemoryMode, memory_enabled
+from layered_render import LayeredRenderer, render_mode
+from dirty_render import DirtyRectRenderer
+
+_original_render = Scene.render
+
+
+def render(self, preview=False):
+    if pipe_enabled():
+        PipeEncoder.attach(self)
+    MultiOutput.attach(self)
+    if memory_enabled():
+        MemoryMode.attach(self)
+    if render_mode() == "layered":
+        LayeredRenderer.attach(self)
+    elif render_mode() == "dirty":
+        DirtyRectRenderer.attach(self)
+    return _original_render(self, preview)
+
+
+Scene.render = render
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+レンダリング実行マニフェスト
+============================
+
+render_parallel.py の実行結果をシーンごとに projects/<project>/media/render_manifest.json に記録する。
+
+  status    SUCCESS / FAILED / MISSING_FILE
+  attempts  試行回数 (一時的な失敗は自動で再試行する)
+  log       manim の標準出力・標準エラーを保存したログファイル
+  output    出力した動画のパスと sha1
+  extra_outputs  追加テーマ・追加の解像度で書き出した動画のパス -> sha1
+
+品質・テーマ・render mode・字幕の焼き込み有無・追加テーマ・追加の解像度も記録し、
+--resume では、前回失敗したシーン・出力が消えたか書き換わったシーン・これらの設定が
+違うシーンだけを再レンダリングする。
+"""
+
+import os
+import json
+import time
+import hashlib
+
+MANIFEST_NAME = "render_manifest.json"
+
+# ログにこれらが含まれる失敗は一時的とみなして再試行する
+# (メモリ不足・ffmpeg のパイプ切れ・Windows のファイルロックなど)
+TRANSIENT_PATTERNS = [
+    "MemoryError",
+    "BrokenPipeError",
+    "Broken pipe",
+    "Resource temporarily unavailable",
+    "Cannot allocate memory",
+    "PermissionError",
+    "TimeoutError",
+    "Connection reset",
+    "being used by another process",
+]
+# ログの末尾だけを見る (トレースバックは最後に出る)
+LOG_TAIL_BYTES = 16384
+# 出力に影響する設定 (--resume で前回と比べる)
+SETTING_KEYS = ("quality", "theme", "render_mode", "soft_subtitles", "variants", "extras")
+
+
+def manifest_path_for(project_dir):
+    return os.path.join(project_dir, "media", MANIFEST_NAME)
+
+
+def log_path_for(project_dir, scene_name):
+    return os.path.join(project_dir, "media", "logs", f"{scene_name}.log")
+
+
+def load_manifest(project_dir):
+    path = manifest_path_for(project_dir)
+    if not os.path.exists(path):
+        return {"scenes": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(project_dir, manifest):
+    path = manifest_path_for(project_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    manifest["updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_log_tail(log_path, max_bytes=LOG_TAIL_BYTES):
+    if not log_path or not os.path.exists(log_path):
+        return ""
+    with open(log_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - max_bytes))
+        return f.read().decode("utf-8", errors="replace")
+
+
+def is_transient(record):
+    """再試行すれば通る可能性のある失敗か"""
+    if record["status"] == "MISSING_FILE":
+        return True
+    # シグナルで落ちた (OOM killer など)
+    if record.get("returncode") is not None and record["returncode"] < 0:
+        return True
+    tail = read_log_tail(record.get("log"))
+    return any(pattern in tail for pattern in TRANSIENT_PATTERNS)
+
+
+def render_settings(quality, theme=None, render_mode=None, soft_subtitles=False, variants=None, extras=None):
+    """マニフェストに記録する設定 (追加テーマ・追加の解像度は順序を問わない)"""
+    return {
+        "quality": quality,
+        "theme": theme,
+        "render_mode": render_mode,
+        "soft_subtitles": bool(soft_subtitles),
+        "variants": sorted(variants or []),
+        "extras": sorted(extras or []),
+    }
+
+
+def _unchanged(path, sha1):
+    return bool(path) and os.path.exists(path) and file_sha1(path) == sha1
+
+
+def is_up_to_date(record, settings):
+    """前回の結果がそのまま使えるか (成功済み・同じ設定・出力が手つかず)"""
+    if not record or record.get("status") != "SUCCESS":
+        return False
+    # 設定を記録していない古いエントリは既定値 (None / False / []) とみなす
+    if any((record.get(key) or None) != (settings.get(key) or None) for key in SETTING_KEYS):
+        return False
+    if not _unchanged(record.get("output"), record.get("sha1")):
+        return False
+    return all(_unchanged(path, sha1) for path, sha1 in (record.get("extra_outputs") or {}).items())
+
+
+def scenes_to_resume(manifest, scenes, settings):
+    """前回の実行から再レンダリングが必要なシーン"""
+    records = manifest.get("scenes", {})
+    return [scene for scene in scenes if not is_up_to_date(records.get(scene), settings)]
@@ -0,0 +1,306 @@
+"""
+シーン尺の静的な見積もり (ast, manim の import なし)
+==================================================
+
+Scene の construct を ast でたどり、レンダリングせずに動画の長さを見積もる。
+
+  self.play(...)        run_time= (なければアニメーションの run_time= の最大値、それもなければ 1 秒)
+  self.wait(...)        引数 (なければ 1 秒)
+  show_subtitle(...)    audio_map.json の音声の長さ + フェードと余韻
+                        (AUDIO_MAP か scene.audio_map を引く字幕ヘルパー。音声が見つからなければ
+                         ヘルパー自身の既定の長さ (duration= 引数や wait_time = 2.0 など))
+  self.<method>(...)    シーンのメソッドやモジュールの関数は、中の play / wait を数える
+  for _ in range(N)     N がリテラルなら N 回分 (それ以外は 1 回分)
+
+if の両方の枝を数えるなど、あくまで見積もりなので実際の尺とは多少ずれる。
+値はセグメント (play / wait / 字幕 1 つ) ごとの秒数のリストで返し、フレーム数は
+manim と同じくセグメントごとに切り上げて数える。
+
+シーン直前のコメントにある "目標 25s" のような注記は目標尺として読み取る。
+"""
+
+import re
+import ast
+import math
+import difflib
+
+# play / wait の既定の長さ (秒)
+DEFAULT_RUN_TIME = 1.0
+DEFAULT_WAIT = 1.0
+# 音声がない字幕の既定の長さ (ヘルパーから既定値が読み取れないときだけ使う)
+DEFAULT_SUBTITLE = 3.0
+# show_subtitle のファジーマッチと同じ設定 (しきい値はヘルパーの比較から読み取れればそちらを使う)
+MATCH_WINDOW = 5
+MATCH_THRESHOLD = 0.4
+# 音声マップを引く名前 (AUDIO_MAP[...] / scene.audio_map)
+AUDIO_MAP_NAMES = {"AUDIO_MAP", "audio_map"}
+# ヘルパー関数・メソッドをたどる深さの上限
+MAX_DEPTH = 8
+
+TARGET_PATTERN = re.compile(r"目標\s*(\d+(?:\.\d+)?)\s*(?:s|秒)")
+
+
+def count_frames(segments, fps):
+    """セグメントごとに切り上げたフレーム数の合計"""
+    return sum(math.ceil(seconds * fps - 1e-9) for seconds in segments if seconds > 0)
+
+
+def find_target(lines, lineno):
+    """クラス定義の直前のコメントから "目標 Ns" を探す (lines は 0 始まり、lineno は 1 始まり)"""
+    i = lineno - 2
+    while i >= 0:
+        line = lines[i].strip()
+        if line and not line.startswith(("#", "@")):
+            break
+        match = TARGET_PATTERN.search(line)
+        if match:
+            return float(match.group(1))
+        i -= 1
+    return None
+
+
+class RuntimeEstimator:
+    """1 ファイル分の ast からシーンごとのセグメントを見積もる"""
+
+    def __init__(self, tree, audio_map=None):
+        self.audio_map = audio_map or {}
+        self.classes = {n.name: n for n in tree.body if isinstance(n, ast.ClassDef)}
+        self.functions = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+        # モジュールレベルの数値・文字列定数 (RUN_TIME = 2 など)
+        self.constants = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                value = self.value(node.value, {})
+                if value is not None:
+                    self.constants[node.targets[0].id] = value
+
+    def estimate(self, class_name, chain):
+        """シーンのセグメントのリストと、音声が見つからなかった字幕の数"""
+        self.methods = {}
+        for name in reversed([class_name] + [c for c in chain if c in self.classes]):
+            for node in self.classes[name].body:
+                if isinstance(node, ast.FunctionDef):
+                    self.methods[node.name] = node
+        self.scene_key = class_name.split("_")[0]
+        self.speech_index = 0
+        self.unmatched = 0
+
+        segments = []
+        if "construct" in self.methods:
+            segments = self.walk(self.methods["construct"].body, "self", {}, 0)
+        return segments, self.unmatched
+
+    # --- 値の解決 ---
+
+    def value(self, node, bindings):
+        """数値・文字列リテラル、束縛済みの名前、その四則演算なら値を返す"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) and not isinstance(node.value, bool):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id in bindings:
+                return bindings[node.id]
+            return self.constants.get(node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = self.value(node.operand, bindings)
+            return -operand if isinstance(operand, (int, float)) else None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div)):
+            left, right = self.value(node.left, bindings), self.value(node.right, bindings)
+            if not (isinstance(left, (int, float)) and isinstance(right, (int, float))):
+                return None
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            return left / right if right else None
+        return None
+
+    def number(self, node, bindings):
+        value = self.value(node, bindings) if node is not None else None
+        return float(value) if isinstance(value, (int, float)) else None
+
+    def bind(self, func, call, bindings):
+        """呼び出しの引数を関数の引数名に対応づける (解決できない値は None)"""
+        params = func.args.args
+        defaults = dict(zip([p.arg for p in params[len(params) - len(func.args.defaults):]], func.args.defaults))
+        result = {p.arg: self.value(defaults[p.arg], {}) if p.arg in defaults else None for p in params}
+        offset = 1 if params and params[0].arg == "self" else 0
+        for param, arg in zip(params[offset:], call.args):
+            result[param.arg] = self.value(arg, bindings)
+        for kw in call.keywords:
+            if kw.arg in result:
+                result[kw.arg] = self.value(kw.value, bindings)
+        return result
+
+    # --- たどる ---
+
+    def walk(self, body, receiver, bindings, depth):
+        segments = []
+        for stmt in body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            if isinstance(stmt, ast.For):
+                repeat = self.loop_count(stmt.iter, bindings)
+                for _ in range(repeat):
+                    segments.extend(self.walk(stmt.body, receiver, bindings, depth))
+                segments.extend(self.walk(stmt.orelse, receiver, bindings, depth))
+                continue
+            if isinstance(stmt, (ast.If, ast.While, ast.With, ast.Try)):
+                for field in ("body", "orelse", "handlers", "finalbody"):
+                    for child in getattr(stmt, field, []):
+                        inner = child.body if isinstance(child, ast.ExceptHandler) else [child]
+                        segments.extend(self.walk(inner, receiver, bindings, depth))
+                if isinstance(stmt, ast.If):
+                    segments.extend(self.walk_calls(stmt.test, receiver, bindings, depth))
+                continue
+            segments.extend(self.walk_calls(stmt, receiver, bindings, depth))
+        return segments
+
+    def loop_count(self, node, bindings):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+            values = [self.number(arg, bindings) for arg in node.args]
+            if values and all(v is not None for v in values):
+                return max(0, len(range(*[int(v) for v in values])))
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return len(node.elts)
+        return 1
+
+    def walk_calls(self, node, receiver, bindings, depth):
+        calls = [n for n in ast.walk(node) if isinstance(n, ast.Call)]
+        calls.sort(key=lambda n: (n.lineno, n.col_offset))
+        segments = []
+        for call in calls:
+            segments.extend(self.call(call, receiver, bindings, depth))
+        return segments
+
+    def call(self, call, receiver, bindings, depth):
+        func = call.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == receiver:
+            if func.attr == "play":
+                return [self.play_time(call, bindings)]
+            if func.attr == "wait":
+                arg = call.args[0] if call.args else next((kw.value for kw in call.keywords if kw.arg == "duration"), None)
+                duration = self.number(arg, bindings)
+                return [duration if duration is not None else DEFAULT_WAIT]
+            if receiver == "self" and func.attr in self.methods and depth < MAX_DEPTH:
+                method = self.methods[func.attr]
+                return self.walk(method.body, "self", self.bind(method, call, bindings), depth + 1)
+            return []
+
+        if isinstance(func, ast.Name) and func.id in self.functions and depth < MAX_DEPTH:
+            helper = self.functions[func.id]
+            # シーンを受け取る引数の名前 (show_subtitle(self, ...) の scene)
+            scene_param = None
+            for param, arg in zip(helper.args.args, call.args):
+                if isinstance(arg, ast.Name) and arg.id == receiver:
+                    scene_param = param.arg
+            if scene_param is None:
+                return []
+            helper_bindings = self.bind(helper, call, bindings)
+            helper_bindings.pop(scene_param, None)
+            if self.is_timeline_subtitle(helper):
+                return [self.subtitle_time(helper, helper_bindings)]
+            return self.walk(helper.body, scene_param, helper_bindings, depth + 1)
+        return []
+
+    def play_time(self, call, bindings):
+        for kw in call.keywords:
+            if kw.arg == "run_time":
+                run_time = self.number(kw.value, bindings)
+                return run_time if run_time is not None else DEFAULT_RUN_TIME
+        # run_time= がなければアニメーションのうち最も長いもの
+        times = []
+        for arg in call.args:
+            if isinstance(arg, ast.Call):
+                for kw in arg.keywords:
+                    if kw.arg == "run_time":
+                        times.append(self.number(kw.value, bindings))
+        times = [t for t in times if t is not None]
+        return max(times) if times else DEFAULT_RUN_TIME
+
+    # --- 字幕 ---
+
+    def is_timeline_subtitle(self, func):
+        """AudioTimeline.hold_time で音声の長さだけ待つ字幕ヘルパーか"""
+        return any(isinstance(n, ast.Attribute) and n.attr == "hold_time" for n in ast.walk(func))
+
+    def subtitle_time(self, func, bindings):
+        """hold_time(scene, start + フェード + 音声 + 余韻) の定数部分 + 音声の長さ"""
+        hold = next(n for n in ast.walk(func)
+                    if isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and n.func.attr == "hold_time")
+        end = hold.args[-1]
+        if isinstance(end, ast.Name):
+            # end = timeline.frame_ceil(start + ...) のように変数に入れてから渡す場合
+            end = next((n.value for n in ast.walk(func) if isinstance(n, ast.Assign)
+                        and any(isinstance(t, ast.Name) and t.id == end.id for t in n.targets)), end)
+        fixed = sum(n.value for n in ast.walk(end)
+                    if isinstance(n, ast.Constant) and isinstance(n.value, (int, float)))
+
+        speech = None
+        if self.uses_audio_map(func) and isinstance(bindings.get("text"), str):
+            windowed = any((isinstance(n, ast.Name) and n.id == "speech_index")
+                           or (isinstance(n, ast.Attribute) and n.attr == "speech_index") for n in ast.walk(func))
+            speech = self.match_audio(bindings["text"], windowed, self.match_threshold(func))
+        if speech is None:
+            self.unmatched += 1
+            speech = self.default_speech(func, end, bindings)
+        return fixed + speech
+
+    def uses_audio_map(self, func):
+        """AUDIO_MAP[...] や scene.audio_map から音声を引いているか"""
+        for n in ast.walk(func):
+            if isinstance(n, ast.Name) and n.id in AUDIO_MAP_NAMES:
+                return True
+            if isinstance(n, ast.Attribute) and n.attr in AUDIO_MAP_NAMES:
+                return True
+        return False
+
+    def match_threshold(self, func):
+        """"ratio > 0.6" のような比較のしきい値 (なければ MATCH_THRESHOLD)"""
+        for n in ast.walk(func):
+            if (isinstance(n, ast.Compare) and isinstance(n.left, ast.Name) and "ratio" in n.left.id
+                    and len(n.ops) == 1 and isinstance(n.ops[0], (ast.Gt, ast.GtE))
+                    and isinstance(n.comparators[0], ast.Constant)
+                    and isinstance(n.comparators[0].value, (int, float))):
+                return float(n.comparators[0].value)
+        return MATCH_THRESHOLD
+
+    def default_speech(self, func, end, bindings):
+        """音声がないときの長さ。終わりの式に出てくる変数 (wait_time) の最初の代入か引数の既定値"""
+        params = {p.arg for p in func.args.args}
+        for name in [n.id for n in ast.walk(end) if isinstance(n, ast.Name) and n.id != "start"]:
+            if name in params:
+                value = self.number(ast.Name(id=name), bindings)
+                if value is not None:
+                    return value
+                continue
+            assigns = sorted((n for n in ast.walk(func) if isinstance(n, ast.Assign)
+                              and any(isinstance(t, ast.Name) and t.id == name for t in n.targets)),
+                             key=lambda n: n.lineno)
+            if assigns:
+                value = self.number(assigns[0].value, bindings)
+                if value is not None:
+                    return value
+        return DEFAULT_SUBTITLE
+
+    def match_audio(self, text, windowed=True, threshold=MATCH_THRESHOLD):
+        """字幕ヘルパーと同じく最も似た音声を選ぶ
+
+        windowed なら show_subtitle と同じく直前の一致位置から 5 件の中、そうでなければシーンの全件から。
+        """
+        audio_list = self.audio_map.get(self.scene_key)
+        if not audio_list:
+            return None
+        start = self.speech_index if windowed else 0
+        candidates = audio_list[start:start + MATCH_WINDOW] if windowed else audio_list
+        best, best_ratio, best_offset = None, 0.0, 0
+        for i, cand in enumerate(candidates):
+            ratio = difflib.SequenceMatcher(None, text, cand["text"]).ratio()
+            if ratio > best_ratio:
+                best, best_ratio, best_offset = cand, ratio, i
+        if best is None or best_ratio <= threshold:
+            return None
+        if windowed:
+            self.speech_index = start + best_offset + 1
+        return float(best["duration"])
@@ -0,0 +1,193 @@
+"""
+Scene クラスの静的な発見 (ast, manim の import なし)
+===================================================
+
+animation.py を ast で解析し、ファイル内のクラス階層をたどって
+レンダリング対象の Scene クラスを見つける。
+
+  - 複数行にわたる class 定義や、ローカルの基底クラス (BaseScene など) 経由の継承も拾う
+  - 基底クラスとしてのみ使われるクラスと construct を持たないクラスは除く
+  - VGroup / VMobject を継承した補助クラス (StackedRectangle など) は対象外
+
+各シーンについて ソース順・基底クラス・推定尺 (runtime_estimate.py で play / wait /
+字幕の音声の長さを合計したもの) を返すので、スケジューラーは長いシーンから先に投入できる。
+CLI では尺をミリ秒とフレーム数で表示し、"目標 25s" の注記から外れたシーンを報告する。
+
+結果は animation.py と audio_map.json の mtime とサイズをキーに
+projects/<project>/media/scene_index.json にキャッシュする。
+
+Usage:
+  python tools/scene_index.py <project_name>
+  python tools/scene_index.py <project_name> -q final --tolerance 0.2
+"""
+
+import os
+import ast
+import sys
+import json
+import argparse
+
+from audio_index import map_path_for
+from render_presets import get_preset
+from runtime_estimate import RuntimeEstimator, count_frames, find_target
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+
+INDEX_VERSION = 3
+INDEX_NAME = "scene_index.json"
+
+# manim の Scene 系の基底クラス (ファイル内で定義されていないもの)
+MANIM_SCENE_BASES = {
+    "Scene", "MovingCameraScene", "ThreeDScene", "ZoomedScene", "VectorScene",
+    "LinearTransformationScene", "SpecialThreeDScene",
+}
+# 目標尺からのずれがこの割合を超えたら報告する
+TARGET_TOLERANCE = 0.1
+# フレーム数を数える既定の品質 (render_parallel.py の既定と同じ)
+DEFAULT_QUALITY = "-qm"
+
+
+def base_names(node):
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            yield base.id
+        elif isinstance(base, ast.Attribute):
+            yield base.attr
+
+
+def analyze_source(source, audio_map=None):
+    """ソースからレンダリング対象の Scene の情報をソース順に返す"""
+    tree = ast.parse(source)
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    estimator = RuntimeEstimator(tree, audio_map)
+    lines = source.splitlines()
+
+    def chain(name, seen=()):
+        """ファイル内のクラス階層を根までたどった基底クラス名の列"""
+        result = []
+        for base in base_names(classes[name]):
+            result.append(base)
+            if base in classes and base not in seen:
+                result.extend(chain(base, seen + (name,)))
+        return result
+
+    def has_construct(name):
+        return any(isinstance(n, ast.FunctionDef) and n.name == "construct" for n in classes[name].body)
+
+    used_as_base = {base for node in classes.values() for base in base_names(node)}
+    scenes = []
+    for name, node in classes.items():
+        ancestors = chain(name)
+        if not any(a in MANIM_SCENE_BASES or (a not in classes and a.endswith("Scene")) for a in ancestors):
+            continue
+        if name in used_as_base:
+            continue
+        # construct はクラス自身か、ファイル内の基底クラスにあればよい
+        if not any(c in classes and has_construct(c) for c in [name] + ancestors):
+            continue
+        segments, unmatched = estimator.estimate(name, ancestors)
+        scenes.append({
+            "name": name,
+            "lineno": node.lineno,
+            "bases": list(base_names(node)),
+            "chain": ancestors,
+            "estimated_runtime": round(sum(segments), 3),
+            "segments": [round(seconds, 4) for seconds in segments],
+            "unmatched_subtitles": unmatched,
+            "target": find_target(lines, node.lineno),
+        })
+    return scenes
+
+
+def index_path_for(file_path):
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), "media", INDEX_NAME)
+
+
+def _stat_key(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def load_audio_durations(project_dir):
+    """audio_map.json をそのまま読む (音声ファイルの存在確認はしない)"""
+    map_path = map_path_for(project_dir)
+    if not os.path.exists(map_path):
+        return {}
+    with open(map_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def discover_scenes(file_path, use_cache=True):
+    """animation.py の Scene 情報のリスト (mtime が変わっていなければキャッシュを使う)"""
+    if not os.path.exists(file_path):
+        return []
+
+    project_dir = os.path.dirname(os.path.abspath(file_path))
+    key = {"file": _stat_key(file_path), "audio_map": _stat_key(map_path_for(project_dir))}
+    cache_path = index_path_for(file_path)
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == INDEX_VERSION and cached.get("key") == key:
+            return cached["scenes"]
+
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        scenes = analyze_source(f.read(), load_audio_durations(project_dir))
+
+    if use_cache:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "key": key, "scenes": scenes}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return scenes
+
+
+def off_target(scene, tolerance=TARGET_TOLERANCE):
+    """目標尺からの相対的なずれ (許容範囲内か目標がなければ None)"""
+    if not scene.get("target"):
+        return None
+    deviation = (scene["estimated_runtime"] - scene["target"]) / scene["target"]
+    return deviation if abs(deviation) > tolerance else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the Scene classes of a project and estimate their runtime without importing manim")
+    parser.add_argument("project_name", help="Name of the project folder in 'projects/'")
+    parser.add_argument("--quality", "-q", default=DEFAULT_QUALITY, help="Preset used to count frames (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=TARGET_TOLERANCE,
+                        help="Allowed relative deviation from the '目標 Ns' annotations (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not write media/scene_index.json")
+    args = parser.parse_args()
+
+    fps = get_preset(args.quality)["fps"]
+    file_path = os.path.join(PROJECTS_DIR, args.project_name, "animation.py")
+    scenes = discover_scenes(file_path, use_cache=not args.no_cache)
+
+    print(f"{'line':>5}  {'scene':<32} {'ms':>8} {'frames':>7} {'target':>8}")
+    flagged = []
+    for scene in scenes:
+        target = f"{scene['target']:.0f}s" if scene.get("target") else "-"
+        deviation = off_target(scene, args.tolerance)
+        note = ""
+        if deviation is not None:
+            flagged.append(scene["name"])
+            note = f"  OFF TARGET {deviation:+.0%}"
+        if scene["unmatched_subtitles"]:
+            note += f"  ({scene['unmatched_subtitles']} subtitles without audio)"
+        print(f"{scene['lineno']:>5}  {scene['name']:<32} {scene['estimated_runtime'] * 1000:>8.0f} "
+              f"{count_frames(scene['segments'], fps):>7} {target:>8}{note}")
+
+    total = sum(s["estimated_runtime"] for s in scenes)
+    total_frames = sum(count_frames(s["segments"], fps) for s in scenes)
+    print(f"{len(scenes)} scenes, {total * 1000:.0f}ms, {total_frames} frames @ {fps}fps")
+    if flagged:
+        print(f"Off target ({len(flagged)}): {flagged}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+台本 (script.md) の構造化 IR と差分
+===================================
+
+script.md をシーン・セリフ・話者・安定したセリフ ID からなる IR に変換し、
+projects/<project>/media/script_ir.json に保存する。
+
+再実行時は前回の IR と突き合わせて ID を引き継ぐ:
+  1. 話者と本文が完全一致するセリフは同じ ID
+  2. 残りは同じ話者で類似度が EDIT_THRESHOLD 以上なら「編集」として同じ ID
+  3. それ以外は新しい ID (「追加」)
+その上でシーンごとに inserted / edited / moved / removed を求めるので、
+音声合成やレンダリングは変わったセリフ・シーンだけを対象にできる。
+
+対応する書式:
+  ### Scene 01: タイトル        ## Scene 01: タイトル        Scene 1（導入）
+  - **めたん**: セリフ          > **シュウ**: セリフ          めたん: セリフ
+
+話者は KNOWN_SPEAKERS にある名前だけを拾う (**図解**: や **地図アニメーション**: のような
+演出指示は話者ではないので音声にしない)。新しいキャラクターは KNOWN_SPEAKERS に追加する。
+
+Usage:
+  python tools/script_ir.py <project_name>          # 差分を表示して IR を保存
+  python tools/script_ir.py <project_name> --dry-run
+"""
+
+import os
+import re
+import json
+import difflib
+import hashlib
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+
+IR_VERSION = 1
+IR_NAME = "script_ir.json"
+
+# 見出し: "### Scene 01: ..." / "Scene 1（導入）"
+SCENE_PATTERN = re.compile(r'^(#*)\s*Scene\s*(\d+)[\s:：_]*(.*)$')
+# Scene 以外の見出し (キャラクター設定・対応表など)
+HEADING_PATTERN = re.compile(r'^(#+)\s')
+# セリフ: "- **Name**: Text" / "> **Name**: Text"
+DIALOGUE_PATTERN = re.compile(r'^\s*(?:[-*>]\s*)+\*\*(.+?)\*\*\s*[:：]\s*(.*)$')
+# 装飾なしのセリフ: "Name: Text"
+PLAIN_DIALOGUE_PATTERN = re.compile(r'^\s*([^\s:：*#>-][^:：]{0,15}?)\s*[:：]\s*(.+)$')
+# カッコ書き（笑）などを除去
+PAREN_PATTERN = re.compile(r'（.*?）|\(.*?\)')
+
+# 台本に登場する話者 (generate_audio.py の speaker_ids と diffusion_model のキャラクター)
+KNOWN_SPEAKERS = {"ずんだもん", "めたん", "四国めたん", "つむぎ", "春日部つむぎ", "シュウ", "ミク"}
+# 表記ゆれ -> 話者名
+SPEAKER_ALIASES = {"メタん": "めたん"}
+
+# 類似度がこれ以上なら「編集」とみなして ID を引き継ぐ
+EDIT_THRESHOLD = 0.6
+
+
+def scene_key_for(number):
+    """シーン番号から正規化したキーを作る ("1" -> "Scene01")"""
+    return f"Scene{int(number):02d}"
+
+
+def clean_text(text):
+    return PAREN_PATTERN.sub('', text).strip()
+
+
+def parse_lines(content):
+    """台本本文をシーンのリストに変換する (ID はまだ振らない)
+
+    Scene 見出しの外 (冒頭の設定やキャラクター表など) のセリフ風の行は無視する。
+    """
+    scenes = []
+    by_key = {}
+    current = None
+    current_level = 0
+
+    for lineno, line in enumerate(content.split('\n'), start=1):
+        scene_match = SCENE_PATTERN.match(line)
+        if scene_match:
+            key = scene_key_for(scene_match.group(2))
+            # 見出し記号なしの "Scene 1" はどの見出しでも閉じる
+            current_level = len(scene_match.group(1)) or 99
+            current = by_key.get(key)
+            if current is None:
+                current = {"key": key, "title": scene_match.group(3).strip(), "lines": []}
+                by_key[key] = current
+                scenes.append(current)
+            continue
+
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            # 同じかより上位の見出しでシーンを閉じる
+            if len(heading_match.group(1)) <= current_level:
+                current = None
+            continue
+
+        if current is None:
+            continue
+
+        diag_match = DIALOGUE_PATTERN.match(line) or PLAIN_DIALOGUE_PATTERN.match(line)
+        if not diag_match:
+            continue
+        speaker = diag_match.group(1).strip()
+        speaker = SPEAKER_ALIASES.get(speaker, speaker)
+        if speaker not in KNOWN_SPEAKERS:
+            # 演出指示 (**図解**: など) や用語の説明
+            continue
+
+        text = clean_text(diag_match.group(2))
+        if not text:
+            continue
+
+        current["lines"].append({"speaker": speaker, "text": text, "source_line": lineno})
+
+    return scenes
+
+
+def line_hash(scene_key, speaker, text):
+    digest = hashlib.sha1(f"{speaker}\t{text}".encode("utf-8")).hexdigest()
+    return f"{scene_key}-{digest[:8]}"
+
+
+def assign_ids(scene_key, lines, previous_lines):
+    """前回のセリフから ID を引き継ぎ、新しいセリフには新規 ID を振る"""
+    used = set()
+    remaining_old = list(previous_lines)
+
+    # 1. 完全一致
+    for line in lines:
+        for old in remaining_old:
+            if old["speaker"] == line["speaker"] and old["text"] == line["text"]:
+                line["id"] = old["id"]
+                used.add(old["id"])
+                remaining_old.remove(old)
+                break
+
+    # 2. 編集 (同じ話者で類似度の高いものから対応づける)
+    candidates = []
+    for i, line in enumerate(lines):
+        if "id" in line:
+            continue
+        for old in remaining_old:
+            if old["speaker"] != line["speaker"]:
+                continue
+            ratio = difflib.SequenceMatcher(None, line["text"], old["text"]).ratio()
+            if ratio >= EDIT_THRESHOLD:
+                candidates.append((ratio, i, old["id"]))
+    for ratio, i, old_id in sorted(candidates, key=lambda c: -c[0]):
+        if "id" in lines[i] or old_id in used:
+            continue
+        lines[i]["id"] = old_id
+        used.add(old_id)
+
+    # 3. 新規
+    for line in lines:
+        if "id" in line:
+            continue
+        base = line_hash(scene_key, line["speaker"], line["text"])
+        new_id = base
+        n = 2
+        while new_id in used:
+            new_id = f"{base}-{n}"
+            n += 1
+        line["id"] = new_id
+        used.add(new_id)
+
+    return lines
+
+
+def build_ir(content, previous=None):
+    """台本本文から IR を作る (previous があれば ID を引き継ぐ)"""
+    previous_scenes = {s["key"]: s["lines"] for s in (previous or {}).get("scenes", [])}
+    scenes = parse_lines(content)
+    for scene in scenes:
+        assign_ids(scene["key"], scene["lines"], previous_scenes.get(scene["key"], []))
+    return {
+        "version": IR_VERSION,
+        "source_sha1": hashlib.sha1(content.encode("utf-8")).hexdigest(),
+        "scenes": scenes,
+    }
+
+
+def diff_ir(previous, current):
+    """2 つの IR の差分をシーンごとに返す (変化のないシーンは含まない)"""
+    old_scenes = {s["key"]: s for s in (previous or {}).get("scenes", [])}
+    new_scenes = {s["key"]: s for s in current["scenes"]}
+    changes = {}
+
+    for key in list(new_scenes) + [k for k in old_scenes if k not in new_scenes]:
+        old_lines = old_scenes[key]["lines"] if key in old_scenes else []
+        new_lines = new_scenes[key]["lines"] if key in new_scenes else []
+        old_by_id = {l["id"]: l for l in old_lines}
+        new_ids = [l["id"] for l in new_lines]
+
+        inserted = [i for i in new_ids if i not in old_by_id]
+        removed = [l["id"] for l in old_lines if l["id"] not in set(new_ids)]
+        edited = [l["id"] for l in new_lines if l["id"] in old_by_id
+                  and (old_by_id[l["id"]]["text"], old_by_id[l["id"]]["speaker"]) != (l["text"], l["speaker"])]
+
+        # 共通の ID の並びで最長一致に入らなかったものを「移動」とする
+        old_common = [l["id"] for l in old_lines if l["id"] in set(new_ids)]
+        new_common = [i for i in new_ids if i in old_by_id]
+        kept = set()
+        for block in difflib.SequenceMatcher(None, old_common, new_common, autojunk=False).get_matching_blocks():
+            kept.update(new_common[block.b:block.b + block.size])
+        moved = [i for i in new_common if i not in kept]
+
+        if inserted or removed or edited or moved:
+            changes[key] = {"inserted": inserted, "edited": edited, "moved": moved, "removed": removed}
+
+    return changes
+
+
+def changed_line_ids(changes):
+    """音声の再生成が必要なセリフ ID (追加・編集)"""
+    ids = set()
+    for change in changes.values():
+        ids.update(change["inserted"])
+        ids.update(change["edited"])
+    return ids
+
+
+def ir_path_for(project_dir):
+    return os.path.join(project_dir, "media", IR_NAME)
+
+
+def load_ir(project_dir):
+    path = ir_path_for(project_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        ir = json.load(f)
+    if ir.get("version") != IR_VERSION:
+        return None
+    return ir
+
+
+def save_ir(project_dir, ir):
+    path = ir_path_for(project_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ir, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def with_audio_only(ir, audio_map):
+    """audio_map に音声があるセリフだけを残した IR
+
+    合成に失敗したセリフを保存しておくと、次回はそのセリフが差分にならず、
+    --changed-only でシーンが再レンダリングされない。落としたセリフは次回「追加」として扱われる。
+    """
+    synthesized = {entry.get("id") for entries in audio_map.values() for entry in entries}
+    scenes = []
+    dropped = False
+    for scene in ir["scenes"]:
+        lines = [line for line in scene["lines"] if line["id"] in synthesized]
+        dropped = dropped or len(lines) != len(scene["lines"])
+        scenes.append({**scene, "lines": lines})
+    if not dropped:
+        return ir
+    # 本文のハッシュが前回と一致すると IR が作り直されないので外す
+    return {**ir, "source_sha1": None, "scenes": scenes}
+
+
+def parse_script_ir(script_path, previous=None):
+    """script.md を IR に変換する。本文が前回と同じなら前回の IR をそのまま返す"""
+    with open(script_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if previous and previous.get("source_sha1") == hashlib.sha1(content.encode("utf-8")).hexdigest():
+        return previous
+    return build_ir(content, previous)
+
+
+def update_project_ir(project_dir, save=True):
+    """プロジェクトの IR を更新し、(新しい IR, 差分) を返す"""
+    previous = load_ir(project_dir)
+    current = parse_script_ir(os.path.join(project_dir, "script.md"), previous)
+    changes = diff_ir(previous, current)
+    if save and current is not previous:
+        save_ir(project_dir, current)
+    return current, changes
+
+
+def print_changes(changes):
+    if not changes:
+        print("No changes since the last run.")
+        return
+    for key, change in changes.items():
+        summary = ", ".join(f"{kind} {len(ids)}" for kind, ids in change.items() if ids)
+        print(f"  {key}: {summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse script.md into a structured IR and diff it against the last run")
+    parser.add_argument("project_name", help="Name of the project folder in 'projects/'")
+    parser.add_argument("--dry-run", action="store_true", help="Show the diff without saving the IR")
+    args = parser.parse_args()
+
+    project_dir = os.path.join(PROJECTS_DIR, args.project_name)
+    if not os.path.exists(os.path.join(project_dir, "script.md")):
+        print(f"Script not found: {os.path.join(project_dir, 'script.md')}")
+        return
+
+    current, changes = update_project_ir(project_dir, save=not args.dry_run)
+    n_lines = sum(len(s["lines"]) for s in current["scenes"])
+    print(f"{len(current['scenes'])} scenes, {n_lines} lines")
+    print_changes(changes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+パラメトリックな図形ジェネレーター
+==================================
+
+歯車・星形・ルーンの輪・円弧に沿った矢印を、頂点配列から numpy でまとめて作る。
+ベジェ点列はパラメーターの組ごとにキャッシュし、同じ図形は配列のコピーだけで作れる。
+
+  Gear        歯車 (歯元・歯先の半径と歯の幅を指定できる)
+  StarShape   星形 (manim の Star と同じ形を、頂点配列から直接作る)
+  ArcArrow    円弧に沿った矢印 (円弧と先端の三角形)
+  rune_ring   文字を円周上に並べた輪 (Text は 1 回だけ作り、グリフを配置する)
+
+回転する歯車は spin() でアップデーターを付ける。アップデーターは毎フレーム形を作り直さず、
+基準の点列を累積角で回転させるだけなので、誤差も溜まらない。回転中に shift / move_to された
+歯車は移動先を中心に回り続け、拡大縮小など形が変わったときはその形を新しい基準にする。
+
+Usage (animation.py):
+  from shapes import Gear, rune_ring
+
+  gear = Gear(12, inner_radius=0.8).scale(0.5)
+  gear.spin(PI / 2)        # 毎秒 90 度
+  self.wait(2)
+  gear.stop_spin()
+"""
+
+import functools
+
+import numpy as np
+from manim import VGroup, VMobject, Text, TAU, WHITE
+
+from asset_cache import memoize_mobject
+
+
+def _closed_polygon_points(vertices):
+    """閉じた折れ線の頂点 (k, 3) から、直線の 3 次ベジェの点列 (4k, 3) を作る"""
+    start = vertices
+    end = np.roll(vertices, -1, axis=0)
+    delta = end - start
+    return np.stack([start, start + delta / 3, start + 2 * delta / 3, end], axis=1).reshape(-1, 3)
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+def _polar(radii, angles):
+    return np.column_stack([radii * np.cos(angles), radii * np.sin(angles), np.zeros_like(angles)])
+
+
+@functools.lru_cache(maxsize=256)
+def gear_points(n_teeth, outer_radius=1.0, inner_radius=0.75, tooth_ratio=0.5):
+    """歯車の輪郭のベジェ点列
+
+    1 つの歯は 歯元 -> 歯先 (立ち上がり) -> 歯先 (歯の幅 tooth_ratio) -> 次の歯元 の順に並ぶ。
+    """
+    pitch = TAU / n_teeth
+    flank = (1 - tooth_ratio) / 2
+    offsets = np.array([0.0, flank, flank + tooth_ratio]) * pitch
+    angles = (np.arange(n_teeth)[:, None] * pitch + offsets).reshape(-1)
+    radii = np.tile([inner_radius, outer_radius, outer_radius], n_teeth)
+    return _readonly(_closed_polygon_points(_polar(radii, angles)))
+
+
+@functools.lru_cache(maxsize=256)
+def star_points(n=5, outer_radius=1.0, inner_radius=None, start_angle=TAU / 4, density=2):
+    """星形の輪郭のベジェ点列 (inner_radius を省略すると manim の Star と同じく正星形の交点に合わせる)"""
+    if inner_radius is None:
+        inner_angle = TAU / (2 * n)
+        outer_angle = TAU * density / n
+        inverse_x = 1 - np.tan(inner_angle) * ((np.cos(outer_angle) - 1) / np.sin(outer_angle))
+        inner_radius = outer_radius / (np.cos(inner_angle) * inverse_x)
+    angles = start_angle + np.arange(2 * n) * (TAU / (2 * n))
+    radii = np.tile([outer_radius, inner_radius], n)
+    return _readonly(_closed_polygon_points(_polar(radii, angles)))
+
+
+@functools.lru_cache(maxsize=256)
+def arc_points(radius, start_angle, angle, num_segments=8):
+    """円弧のベジェ点列 (各区間は 4/3 tan(θ/4) の制御点で近似)"""
+    step = angle / num_segments
+    theta = start_angle + np.arange(num_segments) * step
+    handle = 4 / 3 * np.tan(step / 4) * radius
+    p0 = _polar(np.full(num_segments, radius), theta)
+    p3 = _polar(np.full(num_segments, radius), theta + step)
+    t0 = np.column_stack([-np.sin(theta), np.cos(theta), np.zeros(num_segments)])
+    t3 = np.column_stack([-np.sin(theta + step), np.cos(theta + step), np.zeros(num_segments)])
+    return _readonly(np.stack([p0, p0 + handle * t0, p3 - handle * t3, p3], axis=1).reshape(-1, 3))
+
+
+class _CachedShape(VMobject):
+    """キャッシュ済みの点列をコピーして持つ VMobject"""
+
+    def set_cached_points(self, points):
+        self.points = np.array(points)
+        return self
+
+
+class Gear(_CachedShape):
+    """歯車。spin() で回転アップデーターを付けられる"""
+
+    def __init__(self, n_teeth=8, outer_radius=1.0, inner_radius=0.75, tooth_ratio=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.n_teeth = n_teeth
+        self.set_cached_points(gear_points(n_teeth, outer_radius, inner_radius, tooth_ratio))
+
+    def spin(self, angular_velocity, about_point=None):
+        """毎秒 angular_velocity (rad) で回す (about_point を省略すると歯車の中心で回る)
+
+        前のフレームで書いた点列から平行移動されていれば回転の中心も一緒に動かし、
+        それ以外の変更 (拡大縮小など) があればその時点の点列を基準に回転をやり直す。
+        """
+        self.stop_spin()
+        state = {"written": None}
+
+        def rebase(mob):
+            center = mob.get_center() if about_point is None else np.asarray(about_point, dtype=float)
+            state.update(center=center, basis=mob.points - center, angle=0.0)
+
+        def update(mob, dt):
+            written = state["written"]
+            if written is None or written.shape != mob.points.shape:
+                rebase(mob)
+            else:
+                delta = mob.points - written
+                if np.allclose(delta, delta[0]):
+                    state["center"] = state["center"] + delta[0]
+                else:
+                    rebase(mob)
+            state["angle"] += angular_velocity * dt
+            c, s = np.cos(state["angle"]), np.sin(state["angle"])
+            rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+            mob.points = state["basis"] @ rotation.T + state["center"]
+            state["written"] = mob.points.copy()
+
+        self._spin_updater = update
+        self.add_updater(update)
+        return self
+
+    def stop_spin(self):
+        updater = getattr(self, "_spin_updater", None)
+        if updater is not None:
+            self.remove_updater(updater)
+            self._spin_updater = None
+        return self
+
+
+class StarShape(_CachedShape):
+    """星形 (manim の Star と同じ引数)"""
+
+    def __init__(self, n=5, outer_radius=1.0, inner_radius=None, start_angle=TAU / 4, density=2, **kwargs):
+        super().__init__(**kwargs)
+        self.set_cached_points(star_points(n, outer_radius, inner_radius, start_angle, density))
+
+
+class ArcArrow(VGroup):
+    """中心 ORIGIN・半径 radius の円弧に沿った矢印 (start_angle から angle だけ進む)"""
+
+    def __init__(self, radius=1.0, start_angle=0.0, angle=TAU / 4, tip_length=0.2, tip_width=None,
+                 color=WHITE, stroke_width=4, num_segments=8, **kwargs):
+        super().__init__(**kwargs)
+        tip_width = tip_length if tip_width is None else tip_width
+        # 先端の分だけ円弧を短くする
+        tip_angle = np.sign(angle) * min(tip_length / radius, abs(angle))
+        self.arc = _CachedShape(stroke_color=color, stroke_width=stroke_width).set_cached_points(
+            arc_points(radius, start_angle, angle - tip_angle, num_segments))
+
+        end_angle = start_angle + angle
+        base_angle = end_angle - tip_angle
+        tip_point = _polar(np.array([radius]), np.array([end_angle]))[0]
+        base = _polar(np.array([radius]), np.array([base_angle]))[0]
+        normal = base / np.linalg.norm(base)
+        corners = np.array([tip_point, base + normal * tip_width / 2, base - normal * tip_width / 2])
+        self.tip = _CachedShape(fill_color=color, fill_opacity=1, stroke_width=0).set_cached_points(
+            _closed_polygon_points(corners))
+        self.add(self.arc, self.tip)
+
+
+@memoize_mobject
+def rune_ring(text, radius=1.35, font="Consolas", color=WHITE, scale=0.5, upright=True):
+    """文字を円周上に等間隔で並べる (最初の文字が角度 0、反時計回り)
+
+    Text を 1 回だけ作り、そのグリフを動かすので、文字ごとに Text を作るより速い。
+    upright=False なら各文字を円の接線方向に回す。
+    """
+    glyphs = Text(text, font=font, color=color).scale(scale)
+    count = len(glyphs)
+    angles = np.arange(count) * TAU / count
+    positions = _polar(np.full(count, radius), angles)
+    for glyph, angle, position in zip(glyphs, angles, positions):
+        if not upright:
+            glyph.rotate(angle - TAU / 4)
+        glyph.move_to(position)
+    return glyphs
@@ -0,0 +1,399 @@
+"""
+字幕の吹き出しのスプライトキャッシュ (subtitle atlas)
+====================================================
+
+字幕のセリフは script.md と animation.py で前もってわかっているのに、シーンの construct の中で
+1 つずつ Text を組み立ててラスタライズしている。レンダリングの前に全セリフの吹き出しを
+画像にしておき、show_subtitle はその画像を重ねるだけにする。
+
+  事前生成  script.md のセリフと、animation.py の show_subtitle(...) の文字列リテラルを集める。
+            プロジェクトの get_subtitle で組み立てた吹き出し (角丸の背景・話者名・改行した本文) を
+            出力解像度の透明なカメラで描き、吹き出しの矩形で切り抜く。セリフごとにプロセスを
+            分けて並列に描く
+  キャッシュ  media/subtitles/<key>.npy (RGBA) と、位置・大きさを書いた media/subtitles/index.json。
+              key は話者・本文・話者の色・解像度と、get_subtitle のソース・テーマの配色・
+              subtitle_layout.py のハッシュなので、どれかを変えると作り直しになる
+  レンダリング  SubtitleAtlas.get() がキャッシュにあるセリフを、get_subtitle と同じ位置に
+                画素等倍の ImageMobject として返す (.npy は読み取り専用でメモリマップし、コピーしない)。
+                キャッシュにないセリフ・追加テーマ (VIBE_THEME_VARIANTS) や追加の解像度
+                (VIBE_EXTRA_OUTPUTS) を書き出すとき、dirty mode (VIBE_RENDER_MODE=dirty。画像は
+                矩形のクリップで描けず、字幕のフェードのたびに全体を描き直すことになる) では
+                None を返すので、これまで通り Text で組み立てる
+  位置      manim は画像の角を画素座標にして int で切り捨て、角の間の距離に合わせて画像を
+            縮尺し直す。角が画素の中心 (+0.5) に来るように中心を記録するので、切り捨てても
+            大きさ・位置は切り抜いた画像と一致し、縮尺し直し (ぼやけ) は起きない
+
+render_parallel.py は SubtitleAtlas を使うプロジェクトでは、シーンのレンダリングの前に
+この事前生成を自動で行う (--soft-subtitles・dirty mode のときは行わない)。
+
+Usage (animation.py):
+  from subtitle_atlas import SubtitleAtlas
+
+  SUBTITLE_ATLAS = SubtitleAtlas(os.path.dirname(os.path.abspath(__file__)), get_subtitle, THEME)
+
+  sub = SUBTITLE_ATLAS.get(speaker, text, speaker_color)
+  if sub is None:
+      sub = get_subtitle(speaker, text, speaker_color)
+
+Usage (事前生成):
+  python tools/subtitle_atlas.py api_basics_yt                 # -qm
+  python tools/subtitle_atlas.py api_basics_yt -q preview final --theme dark
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import hashlib
+import inspect
+import argparse
+import importlib.util
+import multiprocessing
+
+import numpy as np
+
+from render_presets import RENDER_MODE_ENV, get_preset
+from script_ir import parse_lines
+from themes import THEME_ENV, VARIANTS_ENV
+from multi_output import OUTPUTS_ENV
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+ATLAS_DIRNAME = os.path.join("media", "subtitles")
+INDEX_NAME = "index.json"
+ATLAS_VERSION = 2
+# animation.py で吹き出しを出すヘルパー (話者, 本文, 話者の色 の順に引数を取る)
+SUBTITLE_FUNC = "show_subtitle"
+# 切り抜きに足す余白 (px, 線とアンチエイリアスの分)
+CROP_MARGIN = 2
+LAYOUT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "subtitle_layout.py")
+
+
+def atlas_dir_for(project_dir):
+    return os.path.join(project_dir, ATLAS_DIRNAME)
+
+
+def load_index(project_dir):
+    path = os.path.join(atlas_dir_for(project_dir), INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    return index.get("sprites", {}) if index.get("version") == ATLAS_VERSION else {}
+
+
+def save_index(project_dir, sprites):
+    path = os.path.join(atlas_dir_for(project_dir), INDEX_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": ATLAS_VERSION, "sprites": sprites}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class SubtitleAtlas:
+    """プロジェクトの吹き出しのキャッシュ (get_subtitle と THEME で見た目が決まる)"""
+
+    def __init__(self, project_dir, builder, theme=None):
+        self.project_dir = project_dir
+        self.builder = builder
+        self.theme = theme
+        self._signature = None
+        self._index = None
+        self._pixels = {}
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self):
+        """吹き出しの見た目を決めるもののハッシュ"""
+        if self._signature is None:
+            digest = hashlib.sha1(inspect.getsource(self.builder).encode("utf-8"))
+            if self.theme is not None:
+                digest.update(json.dumps([self.theme.name, self.theme.palette], sort_keys=True).encode("utf-8"))
+            with open(LAYOUT_SOURCE, "rb") as f:
+                digest.update(f.read())
+            self._signature = digest.hexdigest()
+        return self._signature
+
+    def key(self, speaker, text, color, pixel_width, pixel_height):
+        payload = [ATLAS_VERSION, self.signature(), speaker, text,
+                   None if color is None else str(color), pixel_width, pixel_height]
+        return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()[:20]
+
+    def enabled(self):
+        # 追加テーマは色の差し替え、追加の解像度は描き直しなので画像にはできない。
+        # dirty mode は画像が掛かると矩形だけの描き直しができない
+        return (not os.environ.get(VARIANTS_ENV) and not os.environ.get(OUTPUTS_ENV)
+                and os.environ.get(RENDER_MODE_ENV) != "dirty")
+
+    def get(self, speaker, text, color=None):
+        """キャッシュにある吹き出しの ImageMobject (なければ None)"""
+        if not self.enabled():
+            return None
+        from manim import config
+        from image_assets import shared_image_class
+
+        if self._index is None:
+            self._index = load_index(self.project_dir)
+        entry = self._index.get(self.key(speaker, text, color, config.pixel_width, config.pixel_height))
+        path = None if entry is None else os.path.join(atlas_dir_for(self.project_dir), entry["file"])
+        if path is None or not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        pixels = self._pixels.get(path)
+        if pixels is None:
+            pixels = self._pixels[path] = np.load(path, mmap_mode="r")
+        self.hits += 1
+        # scale_to_resolution を出力の縦の画素数にすると画素等倍で表示される
+        image = shared_image_class()(pixels, scale_to_resolution=config.pixel_height)
+        return image.move_to([entry["center"][0], entry["center"][1], 0])
+
+
+# --- 事前生成 ---
+
+def _literal(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _color_ref(node):
+    """話者の色の引数 ("#ff0000" かモジュールの定数名)。わからなければ None"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return {"value": node.value}
+    if isinstance(node, ast.Name):
+        return {"name": node.id}
+    return None
+
+
+def collect_lines(project_dir):
+    """(話者, 本文, 話者の色) の一覧。animation.py のリテラルと script.md のセリフを合わせる"""
+    with open(os.path.join(project_dir, "animation.py"), "r", encoding="utf-8-sig") as f:
+        tree = ast.parse(f.read())
+
+    lines = []
+    speaker_colors = {}
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == SUBTITLE_FUNC):
+            continue
+        # show_subtitle(scene, speaker, text, speaker_color, ...)
+        args = list(node.args[1:])
+        speaker = _literal(args[0]) if args else None
+        text = _literal(args[1]) if len(args) > 1 else None
+        if speaker is None or text is None:
+            continue
+        color_node = args[2] if len(args) > 2 else next(
+            (kw.value for kw in node.keywords if kw.arg == "speaker_color"), None)
+        color = _color_ref(color_node) if color_node is not None else {"default": True}
+        if color is None:
+            continue
+        speaker_colors.setdefault(speaker, color)
+        lines.append((speaker, text, color))
+
+    # 台本だけにあるセリフは、animation.py で同じ話者に使っている色で作る
+    script_path = os.path.join(project_dir, "script.md")
+    if os.path.exists(script_path):
+        with open(script_path, "r", encoding="utf-8") as f:
+            scenes = parse_lines(f.read())
+        for scene in scenes:
+            for line in scene["lines"]:
+                color = speaker_colors.get(line["speaker"])
+                if color is not None:
+                    lines.append((line["speaker"], line["text"], color))
+
+    unique = {}
+    for speaker, text, color in lines:
+        unique.setdefault((speaker, text, json.dumps(color, sort_keys=True)), (speaker, text, color))
+    return list(unique.values())
+
+
+_worker = {}
+
+
+def _init_worker(project_dir, width, height, theme, known):
+    """プロセスごとに 1 回だけ、出力解像度を設定して animation.py を読み込む"""
+    if theme:
+        os.environ[THEME_ENV] = theme
+    os.environ.pop(VARIANTS_ENV, None)
+    from manim import config
+
+    config.pixel_width = width
+    config.pixel_height = height
+    config.frame_width = config.frame_height * width / height
+    spec = importlib.util.spec_from_file_location("animation", os.path.join(project_dir, "animation.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    atlas = getattr(module, "SUBTITLE_ATLAS", None)
+    if atlas is None:
+        raise RuntimeError(f"{project_dir}/animation.py does not define SUBTITLE_ATLAS")
+    _worker.update(module=module, atlas=atlas, width=width, height=height, known=known)
+
+
+def resolve_color(module, color, builder):
+    """話者の色の値。モジュールにない名前 (construct 内の変数など) なら KeyError
+
+    色を省いた呼び出しは、show_subtitle と同じく get_subtitle の既定値を使う。
+    """
+    if "value" in color:
+        return color["value"]
+    if "name" in color:
+        if not hasattr(module, color["name"]):
+            raise KeyError(color["name"])
+        return getattr(module, color["name"])
+    params = list(inspect.signature(builder).parameters.values())
+    if len(params) < 3 or params[2].default is inspect.Parameter.empty:
+        raise KeyError("speaker_color")
+    return params[2].default
+
+
+def pixel_center(x0, y0, w, h, width, height, frame_width, frame_height, frame_center=(0.0, 0.0)):
+    """左上が画素 (x0, y0) に来る w x h 画素の画像の中心 (manim の座標)
+
+    角を画素の中心 (+0.5) に置く。manim が角の画素座標を int で切り捨てても、浮動小数の誤差で
+    1 画素ずれたり、角の間の距離が 1 画素短くなって画像が縮尺し直されたりしない。
+    """
+    sx, sy = width / frame_width, height / frame_height
+    px = x0 + 0.5 + w / 2
+    py = y0 + 0.5 + h / 2
+    return (px - width / 2) / sx + frame_center[0], (height / 2 - py) / sy + frame_center[1]
+
+
+def rasterize(bubble, width, height):
+    """吹き出しを透明なカメラで描き、(切り抜いた RGBA, 中心の座標) を返す"""
+    from manim import Camera, config
+
+    camera = Camera(pixel_width=width, pixel_height=height, frame_width=config.frame_width,
+                    frame_height=config.frame_height, background_opacity=0)
+    camera.capture_mobject(bubble)
+    pixels = camera.pixel_array
+
+    # 吹き出しの外接矩形 (+ 余白) をピクセルにする
+    sx, sy = width / camera.frame_width, height / camera.frame_height
+    cx, cy = camera.frame_center[0], camera.frame_center[1]
+    left, right = bubble.get_left()[0], bubble.get_right()[0]
+    top, bottom = bubble.get_top()[1], bubble.get_bottom()[1]
+    x0 = max(0, int(np.floor((left - cx) * sx + width / 2)) - CROP_MARGIN)
+    x1 = min(width, int(np.ceil((right - cx) * sx + width / 2)) + CROP_MARGIN)
+    y0 = max(0, int(np.floor((cy - top) * sy + height / 2)) - CROP_MARGIN)
+    y1 = min(height, int(np.ceil((cy - bottom) * sy + height / 2)) + CROP_MARGIN)
+    crop = pixels[y0:y1, x0:x1].astype(np.float32)
+
+    # Cairo の画素は乗算済みアルファなので、ImageMobject のストレートアルファに戻す
+    alpha = crop[:, :, 3:4]
+    crop[:, :, :3] = np.where(alpha > 0, crop[:, :, :3] * 255.0 / np.maximum(alpha, 1), 0)
+    sprite = np.clip(np.round(crop), 0, 255).astype(np.uint8)
+
+    center = pixel_center(x0, y0, x1 - x0, y1 - y0, width, height,
+                          camera.frame_width, camera.frame_height, (cx, cy))
+    return sprite, center
+
+
+def _render_line(args):
+    """1 つのセリフの吹き出しを描いて .npy に書き出し、(key, 索引の項目) を返す
+
+    作成済みなら項目は None、話者の色がわからなければ (None, None)。
+    """
+    speaker, text, color_ref = args
+    module, atlas = _worker["module"], _worker["atlas"]
+    width, height = _worker["width"], _worker["height"]
+    try:
+        color = resolve_color(module, color_ref, atlas.builder)
+    except KeyError:
+        return None, None
+    key = atlas.key(speaker, text, color, width, height)
+    if key in _worker["known"]:
+        return key, None
+
+    bubble = atlas.builder(speaker, text, color)
+    sprite, center = rasterize(bubble, width, height)
+    path = os.path.join(atlas_dir_for(atlas.project_dir), f"{key}.npy")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, sprite)
+    os.replace(tmp_path, path)
+    return key, {
+        "file": f"{key}.npy",
+        "center": [float(center[0]), float(center[1])],
+        "resolution": [width, height],
+        "theme": atlas.theme.name if atlas.theme is not None else None,
+        "speaker": speaker,
+        "text": text,
+    }
+
+
+def uses_atlas(project_dir):
+    """animation.py が SubtitleAtlas を使っているか"""
+    path = os.path.join(project_dir, "animation.py")
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return "SubtitleAtlas(" in f.read()
+
+
+def build_atlas(project_name, qualities, theme=None, processes=None):
+    """プロジェクトの全セリフの吹き出しをプリセットごとに並列で描いてキャッシュする"""
+    project_dir = os.path.join(PROJECTS_DIR, project_name)
+    lines = collect_lines(project_dir)
+    if not lines:
+        return 0
+    atlas_dir = atlas_dir_for(project_dir)
+    os.makedirs(atlas_dir, exist_ok=True)
+    sprites = load_index(project_dir)
+    # 索引にあってファイルも残っているものは描き直さない
+    known = frozenset(key for key, entry in sprites.items() if os.path.exists(os.path.join(atlas_dir, entry["file"])))
+    built = 0
+
+    for quality in qualities:
+        preset = get_preset(quality)
+        width, height = preset["width"], preset["height"]
+        start = time.time()
+        with multiprocessing.Pool(processes=processes or os.cpu_count() or 1, initializer=_init_worker,
+                                  initargs=(project_dir, width, height, theme, known)) as pool:
+            results = pool.map(_render_line, lines, chunksize=8)
+
+        keys = set()
+        rendered = 0
+        for key, entry in results:
+            if key is None:
+                continue
+            keys.add(key)
+            if entry is not None:
+                sprites[key] = entry
+                rendered += 1
+        # 同じ解像度・テーマで使われなくなった吹き出しは消す (ほかのテーマの分は残す)
+        themes = {sprites[key].get("theme") for key in keys if key in sprites}
+        for key, entry in list(sprites.items()):
+            if entry["resolution"] == [width, height] and entry.get("theme") in themes and key not in keys:
+                del sprites[key]
+                stale = os.path.join(atlas_dir, entry["file"])
+                if os.path.exists(stale):
+                    os.remove(stale)
+        built += rendered
+        print(f"Subtitle atlas ({preset['name']}): {len(lines)} lines, {rendered} rendered "
+              f"in {time.time() - start:.1f}s -> {atlas_dir}")
+
+    save_index(project_dir, sprites)
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render every subtitle bubble of a project into a sprite cache")
+    parser.add_argument("project_name", help="Name of the project directory in projects/")
+    parser.add_argument("-q", "--quality", nargs="+", default=["-qm"],
+                        help="Presets to build for (default: -qm)")
+    parser.add_argument("--theme", help="Theme in tools/themes.json (default: the project's own)")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    project_dir = os.path.join(PROJECTS_DIR, args.project_name)
+    if not uses_atlas(project_dir):
+        print(f"Error: {project_dir}/animation.py does not use SubtitleAtlas")
+        sys.exit(1)
+    build_atlas(args.project_name, args.quality, args.theme, args.jobs)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,289 @@
+"""
+字幕の改行レイアウト
+====================
+
+字幕の本文を、実際のグリフの送り幅で測って改行する。Text を試しに作って幅を測ることはしない。
+
+  送り幅    フォントファイルから文字ごとの送り幅 (em 単位) を 1 回だけ読み、フォントサイズごとの
+            表 (GlyphMetrics) にキャッシュする。manim の Text の 1em は font_size / 72 になる。
+            フォントファイルや PIL がない環境では、全角 1em・半角は文字種ごとの概算幅を使う
+  禁則      行頭に句読点・閉じ括弧・小書きの仮名・長音符を置かず、行末に開き括弧を置かない。
+            英単語と数字の並び ("API", "2.0") は途中で切らない
+  行数      幅に収まる最小の行数にし、各行の幅がそろうように改行位置を選ぶ。
+            句読点・空白の直後で切れるなら多少の幅の差があってもそちらを選ぶ
+
+幅の上限は max_chars (全角何文字分か) で指定する。同じ引数のレイアウトはキャッシュする。
+
+Usage (animation.py):
+  from subtitle_layout import wrap_text
+
+  line = Text(wrap_text(text, font_size=24), font="Noto Sans JP", font_size=24, line_spacing=1.2)
+"""
+
+import os
+import re
+import math
+import functools
+import unicodedata
+
+DEFAULT_FONT = "Noto Sans JP"
+# manim の Text の font_size 1 あたりの em の大きさ (manim の単位)
+EM_PER_FONT_SIZE = 1 / 72
+# 送り幅を測るときのフォントの大きさ (px)
+MEASURE_SIZE = 1000
+
+# 行頭に置かない文字 (句読点・閉じ括弧・小書きの仮名・長音符・繰り返し記号)
+NO_START = set(
+    "、。，．,.・：:；;？?！!ー－〜～…‥」』）)］]｝}〉》】〕”’%％"
+    "ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ々ゝゞヽヾ"
+)
+# 行末に置かない文字 (開き括弧)
+NO_END = set("「『（(［[｛{〈《【〔“‘")
+# この直後で切るのが自然な文字
+SOFT_BREAK = set("、。，,．！？!?」』）) 　")
+# 句読点の直後以外で切るときのコスト (em^2)。前後 4 文字ほどの幅の差までは句読点で切る方を選ぶ
+BREAK_PENALTY = 40.0
+# 幅からはみ出した分のコスト (em あたり)
+OVERFLOW_PENALTY = 1000.0
+# 最小の行数で収まらないときに試す追加の行数
+MAX_EXTRA_LINES = 2
+# 英単語・数字の並び (途中で切らない)
+WORD_PATTERN = re.compile(r"[A-Za-z0-9]+(?:[-_.'’][A-Za-z0-9]+)*")
+SPACES = (" ", "\u3000")
+
+# フォントを探すディレクトリ (Windows / macOS / Linux)
+FONT_DIRS = [
+    os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+    os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts"),
+    os.path.expanduser("~/Library/Fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+]
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+# フォント名 -> ファイル名の接頭辞 (空白を除いた小文字)
+FONT_FILE_PREFIXES = {
+    "Noto Sans JP": ("notosansjp", "notosanscjkjp", "notosanscjk"),
+}
+
+# フォント名 -> em 単位の送り幅の表
+_em_tables = {}
+# フォント名 -> PIL のフォント (見つからなければ None)
+_faces = {}
+
+
+def find_font_file(font):
+    """フォント名に合うフォントファイル (Regular を優先)。見つからなければ None"""
+    prefixes = FONT_FILE_PREFIXES.get(font, (font.replace(" ", "").lower(),))
+    matches = []
+    for directory in FONT_DIRS:
+        if not directory or not os.path.isdir(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                name = filename.lower().replace(" ", "").replace("-", "").replace("_", "")
+                if name.endswith(FONT_EXTENSIONS) and name.startswith(prefixes):
+                    matches.append(os.path.join(root, filename))
+    if not matches:
+        return None
+    return min(matches, key=lambda path: ("regular" not in path.lower() and "variable" not in path.lower(), path))
+
+
+def load_face(font):
+    """送り幅を測る PIL のフォント (PIL かフォントファイルがなければ None)"""
+    if font not in _faces:
+        face = None
+        path = find_font_file(font)
+        if path is not None:
+            try:
+                from PIL import ImageFont
+                face = ImageFont.truetype(path, MEASURE_SIZE)
+            except (ImportError, OSError):
+                face = None
+        if face is None:
+            print(f"subtitle_layout: no font file for '{font}', using estimated glyph widths")
+        _faces[font] = face
+    return _faces[font]
+
+
+def estimated_advance(char):
+    """フォントがないときの送り幅の概算 (em)"""
+    if unicodedata.east_asian_width(char) in ("W", "F", "A"):
+        return 1.0
+    if char == " ":
+        return 0.25
+    if char.isupper() or char.isdigit():
+        return 0.62
+    if char.islower():
+        return 0.52
+    return 0.35
+
+
+def em_advance(font, char):
+    """1 文字の送り幅 (em)。フォントごとの表にキャッシュする"""
+    table = _em_tables.setdefault(font, {})
+    advance = table.get(char)
+    if advance is None:
+        face = load_face(font)
+        advance = face.getlength(char) / MEASURE_SIZE if face is not None else estimated_advance(char)
+        table[char] = advance
+    return advance
+
+
+class GlyphMetrics:
+    """フォント・フォントサイズごとの送り幅の表 (manim の単位)"""
+
+    def __init__(self, font=DEFAULT_FONT, font_size=24):
+        self.font = font
+        self.font_size = font_size
+        self.em = font_size * EM_PER_FONT_SIZE
+        self.advances = {}
+
+    def advance(self, char):
+        width = self.advances.get(char)
+        if width is None:
+            width = self.advances[char] = em_advance(self.font, char) * self.em
+        return width
+
+    def width(self, text):
+        return sum(self.advance(char) for char in text)
+
+
+@functools.lru_cache(maxsize=None)
+def metrics(font=DEFAULT_FONT, font_size=24):
+    return GlyphMetrics(font, font_size)
+
+
+def text_width(text, font_size=24, font=DEFAULT_FONT):
+    """1 行の幅 (manim の単位)"""
+    return metrics(font, font_size).width(text)
+
+
+def atoms(text):
+    """改行の単位 (英単語・数字の並びは 1 つ、それ以外は 1 文字ずつ)"""
+    result = []
+    pos = 0
+    while pos < len(text):
+        match = WORD_PATTERN.match(text, pos)
+        end = match.end() if match else pos + 1
+        result.append(text[pos:end])
+        pos = end
+    return result
+
+
+def can_break(before, after):
+    """before と after の間で改行してよいか (禁則)"""
+    if after in SPACES:
+        # 空白の前ではなく後ろで切る
+        return False
+    return after[0] not in NO_START and before[-1] not in NO_END
+
+
+def is_soft_break(units, j):
+    """units[j] の前が句読点・空白の直後か (英単語どうしの間の空白は除く)"""
+    if units[j - 1][-1] not in SOFT_BREAK:
+        return False
+    if units[j - 1] in SPACES and j >= 2:
+        return not (WORD_PATTERN.match(units[j - 2]) and WORD_PATTERN.match(units[j]))
+    return True
+
+
+def _break_lines(units, widths, breaks, max_width, lines, em):
+    """units を lines 行に分ける最小コストの改行位置 (DP)。(コスト, はみ出し, 改行位置) を返す"""
+    n = len(units)
+    prefix = [0.0]
+    for width in widths:
+        prefix.append(prefix[-1] + width)
+
+    def line_cost(i, j):
+        # 行頭・行末の空白は幅に含めない
+        start, end = i, j
+        while start < end and units[start] in SPACES:
+            start += 1
+        while end > start and units[end - 1] in SPACES:
+            end -= 1
+        width = prefix[end] - prefix[start]
+        overflow = max(0.0, width - max_width)
+        cost = (width / em) ** 2 + OVERFLOW_PENALTY * overflow / em
+        if j < n and not is_soft_break(units, j):
+            cost += BREAK_PENALTY
+        return cost, overflow
+
+    starts = [0] + breaks
+    # best[k][j]: 先頭から j 番目の単位の前までを k 行にしたときの (コスト, はみ出し, 直前の改行位置)
+    best = [{0: (0.0, 0.0, None)}]
+    for k in range(1, lines + 1):
+        row = {}
+        ends = [n] if k == lines else breaks
+        for j in ends:
+            for i in starts:
+                if i >= j or i not in best[k - 1]:
+                    continue
+                # 幅を大きく超える行は調べない
+                if prefix[j] - prefix[i] > max_width * 2 and k < lines:
+                    continue
+                cost, overflow = line_cost(i, j)
+                previous = best[k - 1][i]
+                candidate = (previous[0] + cost, previous[1] + overflow, i)
+                if j not in row or (candidate[1], candidate[0]) < (row[j][1], row[j][0]):
+                    row[j] = candidate
+        best.append(row)
+
+    if n not in best[lines]:
+        return None
+    cost, overflow, _ = best[lines][n]
+    positions = []
+    j = n
+    for k in range(lines, 0, -1):
+        i = best[k][j][2]
+        if i > 0:
+            positions.append(i)
+        j = i
+    return cost, overflow, positions[::-1]
+
+
+@functools.lru_cache(maxsize=4096)
+def layout_lines(text, max_width, font_size=24, font=DEFAULT_FONT):
+    """text を幅 max_width (manim の単位) に収まる行に分ける (改行文字はそのまま残す)"""
+    table = metrics(font, font_size)
+    result = []
+    for paragraph in text.split("\n"):
+        units = atoms(paragraph)
+        widths = [table.width(unit) for unit in units]
+        total = sum(widths)
+        if total <= max_width or len(units) < 2:
+            result.append(paragraph)
+            continue
+
+        breaks = [k for k in range(1, len(units)) if can_break(units[k - 1], units[k])]
+        if not breaks:
+            result.append(paragraph)
+            continue
+        chosen = None
+        # 改行できる位置が足りなければ、すべての位置で切った行数までしか試せない
+        most = len(breaks) + 1
+        fewest = min(max(2, math.ceil(total / max_width)), most)
+        for lines in range(fewest, min(fewest + MAX_EXTRA_LINES, most) + 1):
+            candidate = _break_lines(units, widths, breaks, max_width, lines, table.em)
+            if candidate is None:
+                continue
+            if chosen is None or candidate[1] < chosen[1]:
+                chosen = candidate
+            if candidate[1] == 0:
+                break
+        if chosen is None:
+            result.append(paragraph)
+            continue
+        bounds = [0] + chosen[2] + [len(units)]
+        for i, j in zip(bounds, bounds[1:]):
+            result.append("".join(units[i:j]).strip(" \u3000"))
+    return tuple(result)
+
+
+def wrap_text(text, max_chars=28, font_size=24, font=DEFAULT_FONT):
+    """幅が全角 max_chars 文字分に収まるように、禁則を守ってバランスよく改行する"""
+    max_width = max_chars * font_size * EM_PER_FONT_SIZE
+    return "\n".join(layout_lines(text, max_width, font_size, font))
@@ -0,0 +1,289 @@
+"""
+字幕トラックの書き出し (SRT / WebVTT / ASS)
+==========================================
+
+show_subtitle はセリフごとに話者・本文・表示区間 (音声の開始からその長さ + 余韻まで) を
+AudioTimeline に記録する (<SceneName>.timeline.json の "cues")。
+render_parallel.py はシーンの動画の隣に <SceneName>.srt / .vtt / .ass を書き出し、
+結合時は各シーンの尺だけずらしてつなげた outputs/<project>.srt / .vtt / .ass も書き出す。
+
+  SRT     話者名を <font color> で色付けした「話者: 本文」
+  WebVTT  話者は <v 話者> の声タグ
+  ASS     話者ごとのスタイル (色) と Name 欄。字幕の焼き込みや再生側のスタイル調整に使う
+
+soft subtitles (VIBE_SOFT_SUBTITLES=1 / render_parallel.py --soft-subtitles) では
+字幕の Text を作らず、トラックの記録と待ち時間だけを行う。シーンの尺は字幕を焼き込む場合と同じになる。
+
+字幕の本文はレンダリング時のものが記録されるが、各字幕には台本のセリフ ID (音声と対応した
+もの) も入る。誤字は script.md を直してから書き出し直せば (--script / render_parallel.py
+--refresh-subtitles)、ID で今の台本の本文・話者に差し替わるので再レンダリングはいらない。
+ID のない字幕 (音声なし) は、シーンの字幕とセリフの数が同じときだけ順番で対応させる。
+
+Usage:
+  python tools/subtitle_track.py <SceneName>.timeline.json            # 隣に .srt / .vtt / .ass
+  python tools/subtitle_track.py <SceneName>.timeline.json -o out/Scene01
+  python tools/subtitle_track.py <SceneName>.subtitles.json --script projects/<project>/script.md
+"""
+
+import os
+import json
+import argparse
+import subprocess
+
+from render_presets import SUBTITLES_ENV
+from script_ir import load_ir, parse_script_ir
+
+SUBTITLE_FORMATS = ("srt", "vtt", "ass")
+# 結合時に使う、シーンごとの字幕と尺 (<SceneName>.subtitles.json)
+CUES_SUFFIX = ".subtitles.json"
+# ASS の基準解像度とフォント (get_subtitle と同じフォント)
+ASS_RESOLUTION = (1920, 1080)
+ASS_FONT = "Noto Sans JP"
+ASS_FONT_SIZE = 48
+
+
+def soft_subtitles():
+    """字幕を焼き込まず、トラックだけを記録するか"""
+    return os.environ.get(SUBTITLES_ENV, "") not in ("", "0")
+
+
+def shift_cues(cues, offset):
+    return [dict(cue, start=cue["start"] + offset, end=cue["end"] + offset) for cue in cues]
+
+
+def _clock(t, separator=",", digits=3):
+    """秒を HH:MM:SS,mmm (digits 桁の小数) にする"""
+    scale = 10 ** digits
+    total = int(round(max(t, 0.0) * scale))
+    seconds, fraction = divmod(total, scale)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{fraction:0{digits}d}"
+
+
+def format_srt(cues):
+    blocks = []
+    for index, cue in enumerate(cues, 1):
+        speaker = cue["speaker"]
+        if cue.get("color"):
+            speaker = f'<font color="{cue["color"]}">{speaker}</font>'
+        blocks.append(f"{index}\n{_clock(cue['start'])} --> {_clock(cue['end'])}\n{speaker}: {cue['text']}\n")
+    return "\n".join(blocks)
+
+
+def _vtt_escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def format_vtt(cues):
+    blocks = ["WEBVTT\n"]
+    for cue in cues:
+        blocks.append(f"{_clock(cue['start'], '.')} --> {_clock(cue['end'], '.')}\n"
+                      f"<v {_vtt_escape(cue['speaker'])}>{_vtt_escape(cue['text'])}\n")
+    return "\n".join(blocks)
+
+
+def _ass_color(color):
+    """#RRGGBB を ASS の &H00BBGGRR にする (不明な値は白)"""
+    value = (color or "").lstrip("#")
+    if len(value) < 6:
+        value = "FFFFFF"
+    red, green, blue = value[0:2], value[2:4], value[4:6]
+    return f"&H00{blue}{green}{red}".upper()
+
+
+def _ass_text(text):
+    return text.replace("\\", "\\\\").replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def format_ass(cues, resolution=ASS_RESOLUTION):
+    width, height = resolution
+    speakers = list(dict.fromkeys(cue["speaker"] for cue in cues))
+    colors = {cue["speaker"]: cue.get("color") for cue in cues}
+    styles = [(f"Speaker{i + 1}", colors[s]) for i, s in enumerate(speakers)]
+    style_of = {s: f"Speaker{i + 1}" for i, s in enumerate(speakers)}
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+    ]
+    for name, color in styles:
+        # 話者の色は名前に付け、本文は白
+        lines.append(f"Style: {name},{ASS_FONT},{ASS_FONT_SIZE},&H00FFFFFF,{_ass_color(color)},&H00000000,"
+                     f"&H99000000,0,0,0,0,100,100,0,0,3,2,0,2,80,80,60,1")
+    lines += [
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for cue in cues:
+        style = style_of[cue["speaker"]]
+        start = _clock(cue["start"], ".", 2)[1:]
+        end = _clock(cue["end"], ".", 2)[1:]
+        speaker = f"{{\\b1\\c{_ass_color(cue.get('color'))}}}{_ass_text(cue['speaker'])}{{\\r}}"
+        lines.append(f"Dialogue: 0,{start},{end},{style},{_ass_text(cue['speaker'])},0,0,0,,"
+                     f"{speaker}\\N{_ass_text(cue['text'])}")
+    return "\n".join(lines) + "\n"
+
+
+FORMATTERS = {"srt": format_srt, "vtt": format_vtt, "ass": format_ass}
+
+
+def _write(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_tracks(cues, base_path, formats=SUBTITLE_FORMATS):
+    """base_path.srt / .vtt / .ass を書き出し、そのパスを返す"""
+    paths = []
+    for fmt in formats:
+        path = f"{base_path}.{fmt}"
+        _write(path, FORMATTERS[fmt](cues))
+        paths.append(path)
+    return paths
+
+
+def export_scene(timeline_path, video_path):
+    """シーンのタイムラインの字幕を動画の隣に書き出す
+
+    字幕がなければ、前のレンダリングで書き出した字幕ファイルを消す (結合時に古い字幕を使わない)。
+    """
+    base_path = os.path.splitext(video_path)[0]
+    cues = []
+    if os.path.exists(timeline_path):
+        with open(timeline_path, "r", encoding="utf-8") as f:
+            timeline = json.load(f)
+        cues = timeline.get("cues") or []
+    if not cues:
+        for path in [base_path + CUES_SUFFIX] + [f"{base_path}.{fmt}" for fmt in SUBTITLE_FORMATS]:
+            if os.path.exists(path):
+                os.remove(path)
+        return []
+    _write(base_path + CUES_SUFFIX, json.dumps(
+        {"duration": timeline["duration"], "cues": cues}, indent=2, ensure_ascii=False))
+    return write_tracks(cues, base_path)
+
+
+def script_lines(project_dir):
+    """今の script.md のシーンキー -> セリフ (ID は保存済みの IR から引き継ぐ。IR は保存しない)"""
+    ir = parse_script_ir(os.path.join(project_dir, "script.md"), load_ir(project_dir))
+    return {scene["key"]: scene["lines"] for scene in ir["scenes"]}
+
+
+def refresh_cues(cues, lines):
+    """字幕の本文・話者を台本のセリフで差し替え、(新しい字幕, 変わった数) を返す"""
+    by_id = {line["id"]: line for line in lines}
+    by_position = len(cues) == len(lines)
+    refreshed = []
+    changed = 0
+    for i, cue in enumerate(cues):
+        line = by_id.get(cue["id"]) if "id" in cue else (lines[i] if by_position else None)
+        if line is not None and (line["text"], line["speaker"]) != (cue["text"], cue["speaker"]):
+            cue = dict(cue, text=line["text"], speaker=line["speaker"])
+            changed += 1
+        refreshed.append(cue)
+    return refreshed, changed
+
+
+def scene_key_of(path):
+    """<SceneName>.subtitles.json / .mp4 のシーンキー (Scene01_Intro -> Scene01)"""
+    name = os.path.basename(path)
+    for suffix in (CUES_SUFFIX, ".timeline.json", ".mp4"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.split("_")[0]
+
+
+def refresh_scene(video_path, lines_by_scene):
+    """動画の隣の字幕を今の台本で書き出し直し、変わった字幕の数を返す"""
+    base_path = os.path.splitext(video_path)[0]
+    cues_path = base_path + CUES_SUFFIX
+    if not os.path.exists(cues_path):
+        return 0
+    with open(cues_path, "r", encoding="utf-8") as f:
+        track = json.load(f)
+    cues, changed = refresh_cues(track["cues"], lines_by_scene.get(scene_key_of(video_path), []))
+    if changed:
+        track["cues"] = cues
+        _write(cues_path, json.dumps(track, indent=2, ensure_ascii=False))
+        write_tracks(cues, base_path)
+    return changed
+
+
+def probe_duration(video_path):
+    """ffprobe で動画の尺 (秒) を得る"""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+           "-of", "default=noprint_wrappers=1:nokey=1", video_path]
+    return float(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip())
+
+
+def merge_scenes(videos):
+    """結合する動画の順に、各シーンの字幕を前のシーンの尺だけずらしてつなげる
+
+    字幕のあるシーンはタイムラインに記録した尺、ないシーンは ffprobe で測った尺を使う。
+    """
+    if not any(os.path.exists(os.path.splitext(v)[0] + CUES_SUFFIX) for v in videos):
+        return []
+    cues = []
+    offset = 0.0
+    for video in videos:
+        cues_path = os.path.splitext(video)[0] + CUES_SUFFIX
+        if os.path.exists(cues_path):
+            with open(cues_path, "r", encoding="utf-8") as f:
+                track = json.load(f)
+            cues += shift_cues(track["cues"], offset)
+            offset += track["duration"]
+        else:
+            offset += probe_duration(video)
+    return cues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the subtitle cues of a scene timeline as SRT/WebVTT/ASS")
+    parser.add_argument("timeline", help="<SceneName>.timeline.json written during render (or <SceneName>.subtitles.json)")
+    parser.add_argument("-o", "--output", help="Output path without extension (default: next to the timeline)")
+    parser.add_argument("--formats", nargs="+", choices=SUBTITLE_FORMATS, default=list(SUBTITLE_FORMATS))
+    parser.add_argument("--script", help="script.md whose current lines replace the recorded text (fix typos without re-rendering)")
+    args = parser.parse_args()
+
+    with open(args.timeline, "r", encoding="utf-8") as f:
+        cues = json.load(f).get("cues") or []
+    if not cues:
+        print("Timeline has no subtitle cues.")
+        return
+    if args.script:
+        lines_by_scene = script_lines(os.path.dirname(os.path.abspath(args.script)))
+        cues, changed = refresh_cues(cues, lines_by_scene.get(scene_key_of(args.timeline), []))
+        print(f"Refreshed {changed} cues from {args.script}")
+        if changed and args.timeline.endswith(CUES_SUFFIX):
+            # 結合時に使う字幕も差し替える
+            with open(args.timeline, "r", encoding="utf-8") as f:
+                track = json.load(f)
+            _write(args.timeline, json.dumps(dict(track, cues=cues), indent=2, ensure_ascii=False))
+    base_path = args.output
+    if base_path is None:
+        for suffix in (".timeline.json", CUES_SUFFIX):
+            if args.timeline.endswith(suffix):
+                base_path = args.timeline[:-len(suffix)]
+                break
+        else:
+            base_path = os.path.splitext(args.timeline)[0]
+    for path in write_tracks(cues, base_path, args.formats):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+実行時テーマ
+============
+
+tools/themes.json のテーマを animation.py から参照する。配色はレンダリング時に
+環境変数で選ぶので、ダーク版・ライト版を作るのにソースを書き換える必要はない。
+
+  THEME = get_theme("light")          # VIBE_THEME が未設定ならこのテーマ
+  BG_COLOR = THEME.BG_COLOR
+  ...
+  def construct(self):
+      THEME.apply(self)               # 背景色の設定 + 追加テーマの書き出し
+
+VIBE_THEME_VARIANTS=dark,... を指定すると、ThemeVariants が同じ construct の各フレームを
+色だけ差し替えて描き直し、<SceneName>.<theme>.mp4 として ffmpeg に流し込む。
+形状の計算 (construct / アニメーション補間) は 1 回だけで、テーマごとに増えるのは
+Cairo での描画とエンコードだけになる。
+
+色の差し替えは「ベーステーマのパレットの色 -> 追加テーマの同じキーの色」の対応で行う。
+同じ色を複数のキーで使っている場合は themes.json で先に書いたキーが優先される。
+
+Usage:
+  python tools/themes.py                # テーマ一覧
+  VIBE_THEME=dark manim -qm projects/api_basics_yt/animation.py Scene01_Intro
+"""
+
+import os
+import json
+import subprocess
+
+import numpy as np
+
+from render_presets import current_preset, encoder_args, DEFAULT_ENCODER
+
+THEMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes.json")
+
+# render_parallel.py から渡される環境変数
+THEME_ENV = "VIBE_THEME"
+VARIANTS_ENV = "VIBE_THEME_VARIANTS"
+
+# 色を持つ VMobject の属性
+RGBA_ATTRS = ("fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+
+_themes = None
+
+
+def load_themes(path=THEMES_PATH):
+    global _themes
+    if _themes is None:
+        with open(path, "r", encoding="utf-8") as f:
+            _themes = json.load(f)
+    return _themes
+
+
+class Theme:
+    """テーマ名とパレット (定数名 -> 16 進カラー)。パレットのキーは属性として参照できる"""
+
+    def __init__(self, name, palette, description=""):
+        self.name = name
+        self.palette = dict(palette)
+        self.description = description
+
+    def __getattr__(self, key):
+        palette = self.__dict__.get("palette", {})
+        if key in palette:
+            return palette[key]
+        raise AttributeError(f"Theme '{self.__dict__.get('name')}' has no color '{key}'")
+
+    def __getitem__(self, key):
+        return self.palette[key]
+
+    def __contains__(self, key):
+        return key in self.palette
+
+    def get(self, key, default=None):
+        return self.palette.get(key, default)
+
+    def apply(self, scene):
+        """シーンの背景色を設定し、追加テーマがあれば書き出しを開始する"""
+        background = self.get("BG_COLOR") or self.get("BG")
+        if background is not None:
+            scene.camera.background_color = background
+        return ThemeVariants.attach(scene, self)
+
+
+def get_theme(default, **overrides):
+    """VIBE_THEME (未設定なら default) のテーマを返す。overrides はプロジェクト固有の色"""
+    name = os.environ.get(THEME_ENV) or default
+    themes = load_themes()
+    if name not in themes:
+        raise KeyError(f"Unknown theme '{name}'. Available: {', '.join(themes)}")
+    theme = themes[name]
+    palette = dict(theme.get("palette", {}))
+    # 既定のテーマのときだけプロジェクト固有の色で上書きする
+    if name == default:
+        palette.update(overrides)
+    return Theme(name, palette, theme.get("description", ""))
+
+
+def variant_names():
+    """VIBE_THEME_VARIANTS に指定された追加テーマ名のリスト"""
+    value = os.environ.get(VARIANTS_ENV, "")
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def variant_path_for(video_path, theme_name):
+    """ベースの動画パスから追加テーマの動画パスを得る (Scene01.mp4 -> Scene01.dark.mp4)"""
+    return f"{os.path.splitext(video_path)[0]}.{theme_name}.mp4"
+
+
+def _color_key(hex_color):
+    value = hex_color.lstrip("#")
+    return int(value[:6], 16)
+
+
+def color_mapping(base, variant):
+    """ベースの色 (24bit 整数) -> 追加テーマの RGB (0-1) の対応表"""
+    mapping = {}
+    for key, color in base.palette.items():
+        if key not in variant.palette:
+            continue
+        src = _color_key(color)
+        if src in mapping:
+            continue
+        dst = _color_key(variant.palette[key])
+        mapping[src] = np.array([(dst >> 16) & 0xFF, (dst >> 8) & 0xFF, dst & 0xFF]) / 255.0
+    return mapping
+
+
+def recolor(mobjects, mapping):
+    """mobject の色を mapping に従って置き換え、元に戻すための (mobject, 属性, 配列) を返す"""
+    saved = []
+    for mob in mobjects:
+        for attr in RGBA_ATTRS:
+            rgbas = getattr(mob, attr, None)
+            if rgbas is None or len(rgbas) == 0:
+                continue
+            keys = (np.round(rgbas[:, :3] * 255).astype(np.int64) * [1 << 16, 1 << 8, 1]).sum(axis=1)
+            new_rgbas = None
+            for key in np.unique(keys):
+                if key not in mapping:
+                    continue
+                if new_rgbas is None:
+                    new_rgbas = rgbas.copy()
+                new_rgbas[keys == key, :3] = mapping[key]
+            if new_rgbas is not None:
+                saved.append((mob, attr, rgbas))
+                setattr(mob, attr, new_rgbas)
+    return saved
+
+
+def restore(saved):
+    for mob, attr, rgbas in saved:
+        setattr(mob, attr, rgbas)
+
+
+class ThemeVariants:
+    """シーンのフレームを追加テーマの色で描き直し、テーマごとの ffmpeg に書き出す"""
+
+    def __init__(self, scene, base, variants):
+        self.scene = scene
+        self.base = base
+        self.variants = variants
+        self.mappings = {v.name: color_mapping(base, v) for v in variants}
+        self.writers = {}
+
+    @classmethod
+    def attach(cls, scene, base):
+        """VIBE_THEME_VARIANTS があればレンダラーの add_frame / tear_down に書き出しを差し込む"""
+        existing = getattr(scene, "theme_variants", None)
+        if existing is not None:
+            return existing
+
+        themes = load_themes()
+        names = [n for n in variant_names() if n != base.name]
+        unknown = [n for n in names if n not in themes]
+        if unknown:
+            raise KeyError(f"Unknown theme variant(s): {', '.join(unknown)}")
+        movie_path = getattr(scene.renderer.file_writer, "movie_file_path", None)
+        if not names or not movie_path:
+            return None
+
+        from manim import config
+
+        variants = [Theme(n, themes[n].get("palette", {}), themes[n].get("description", "")) for n in names]
+        self = cls(scene, base, variants)
+        scene.theme_variants = self
+
+        # キャッシュ済みの play はフレームを描かず add_frame を通らないので、テーマ違いの動画が欠ける
+        config.disable_caching = True
+
+        renderer = scene.renderer
+        original_add_frame = renderer.add_frame
+        original_tear_down = scene.tear_down
+
+        def add_frame(frame, num_frames=1):
+            original_add_frame(frame, num_frames)
+            if not renderer.skip_animations:
+                self.write_frames(num_frames)
+
+        def tear_down():
+            original_tear_down()
+            self.close()
+
+        renderer.add_frame = add_frame
+        scene.tear_down = tear_down
+        return self
+
+    def open_writer(self, theme_name, width, height):
+        movie_path = str(self.scene.renderer.file_writer.movie_file_path)
+        # ベースと同じプリセットのエンコード設定を使う
+        preset = current_preset() or DEFAULT_ENCODER
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}",
+            "-r", str(self.scene.camera.frame_rate), "-i", "-",
+            "-an", *encoder_args(preset),
+            variant_path_for(movie_path, theme_name),
+        ]
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write_frames(self, num_frames):
+        """現在のシーンを各テーマの色で描画し、num_frames 回書き出す"""
+        scene = self.scene
+        camera = scene.camera
+        mobjects = list(scene.mobjects) + [m for m in scene.foreground_mobjects if m not in scene.mobjects]
+        family = [sub for mob in mobjects for sub in mob.get_family()]
+        background = camera.background_color
+        base_pixels = camera.pixel_array.copy()
+
+        for variant in self.variants:
+            saved = recolor(family, self.mappings[variant.name])
+            try:
+                variant_bg = variant.get("BG_COLOR") or variant.get("BG")
+                if variant_bg is not None:
+                    camera.background_color = variant_bg
+                camera.reset()
+                camera.capture_mobjects(mobjects)
+                frame = camera.pixel_array
+            finally:
+                restore(saved)
+                camera.background_color = background
+
+            writer = self.writers.get(variant.name)
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = self.open_writer(variant.name, width, height)
+                self.writers[variant.name] = writer
+            data = np.ascontiguousarray(frame).tobytes()
+            for _ in range(num_frames):
+                writer.stdin.write(data)
+
+        # 次の freeze_current_frame などがベースの描画結果を使えるように戻す
+        camera.set_pixel_array(base_pixels)
+
+    def close(self):
+        for name, writer in self.writers.items():
+            writer.stdin.close()
+            if writer.wait() != 0:
+                print(f"Warning: encoding the '{name}' theme variant failed")
+        self.writers = {}
+
+
+def main():
+    for name, theme in load_themes().items():
+        print(f"{name:<10} {theme.get('description', '')}")
+
+
+if __name__ == "__main__":
+    main()